@@ -0,0 +1,101 @@
+"""Decode benchmark for the transport codecs.
+
+Builds synthetic payloads shaped like the hot endpoints (spendHistory, jobs,
+pocketmoney and the family statement) and reports the decode time and the
+memory allocated per decode for every installed codec, with and without the
+typed schemas.
+
+Usage: python benchmarks/codec_decode.py [iterations]
+"""
+import json
+import sys
+import time
+import tracemalloc
+
+from pyroostermoney.codec import CODECS
+from pyroostermoney.schema import SCHEMAS
+
+def _spend_history(count=15):
+    return [{
+        "actionUserId": 1, "amount": -1.5, "balance": 10.0, "currency": "GBP",
+        "description": "Card payment", "descriptionExtension": "Shop",
+        "guardianProfileImage": "https://images.example/p.png", "id": i,
+        "message": "", "resourceImageURL": "https://images.example/r.png",
+        "time": "2023-12-01T10:00:00.000+0000", "transactionSource": "CARD",
+        "type": "CARD_PAYMENT", "userId": 1, "declines": None,
+        "merchant": {"name": "Shop", "category": "5411", "address": "1 High Street"},
+        "tags": ["a", "b"], "links": {"self": f"/transactions/{i}"}
+    } for i in range(count)]
+
+def _jobs(count=20):
+    job = {
+        "allowancePeriodId": 1, "currency": "GBP", "description": "Tidy room",
+        "dueAnyDay": False, "dueDate": "2023-12-01", "expiryProcessed": False,
+        "finalRewardAmount": 1.0, "imageUrl": "https://images.example/j.png",
+        "locked": False, "masterJobId": 1, "reopened": False, "rewardAmount": 1.0,
+        "scheduledJobId": 1, "state": 1, "timeOfDay": 12, "title": "Tidy room",
+        "type": 0, "history": [{"state": 1, "time": "2023-12-01T10:00:00"}] * 3,
+        "createdBy": {"userId": 1, "name": "Parent"}
+    }
+    return {"TODO": [job] * count, "AWAITING_APPROVAL": [job] * (count // 2)}
+
+def _pocket_money():
+    pot = {"display": True, "colour": "#fff", "order": 1}
+    return {
+        "potSettings": {"savePot": pot, "goalPot": pot, "spendPot": pot, "givePot": pot},
+        "safeTotal": 10.0, "saveGoalAmount": 2000, "allocatedToGoals": 1.0,
+        "walletTotal": 5.0, "giveAmount": 1.0, "availablePocketMoney": 16.0,
+        "pocketMoneyAmount": 2.0, "goals": [{"title": "Bike", "amount": 100}] * 5,
+        "customPots": [{"customPotId": "x", "availableBalance": {"amount": 1},
+                        "customLedgerMetadata": {"title": "Pot"}, "updated": None}] * 3
+    }
+
+def _statement(count=50):
+    return [{
+        "reason": "Boost", "transactionType": "BOOST",
+        "creditAmount": {"amount": 100, "currency": "GBP", "precision": 2},
+        "debitAmount": {"amount": 0, "currency": "GBP", "precision": 2},
+        "reference": "ABC123", "created": "2023-12-01T10:00:00", "metadata": {"a": 1}
+    } for _ in range(count)]
+
+PAYLOADS = {
+    "get_child_spend_history": _spend_history(),
+    "get_child_allowance_period_jobs": _jobs(),
+    "get_child_pocket_money": _pocket_money(),
+    "get_family_account_statement": _statement()
+}
+
+def _measure(codec, data, schema, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        codec.decode(data, schema)
+    elapsed = (time.perf_counter() - start) / iterations
+    tracemalloc.start()
+    result = codec.decode(data, schema)
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return elapsed, allocated
+
+def main():
+    """Runs the benchmark."""
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    codecs = []
+    for codec in CODECS.values():
+        try:
+            codecs.append(codec())
+        except ImportError:
+            print(f"{codec.name} not installed, skipping")
+    for endpoint, payload in PAYLOADS.items():
+        data = json.dumps(payload).encode("utf-8")
+        print(f"{endpoint} ({len(data)} bytes)")
+        for codec in codecs:
+            for schema in (None, SCHEMAS[endpoint]):
+                if schema is not None and codec.name != "msgspec":
+                    continue
+                elapsed, allocated = _measure(codec, data, schema, iterations)
+                label = codec.name + (" typed" if schema is not None else "")
+                print(f"  {label:<14} {elapsed*1e6:8.1f} us {allocated:8d} bytes")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+"""Helpers shared by the benchmarks."""
+from datetime import datetime, timedelta
+
+from aiohttp import web
+
+import pyroostermoney.api
+from pyroostermoney.api import RoosterSession
+
+async def start_fake_api(handler) -> web.AppRunner:
+    """Serves every request with handler on a free port and points the API at it."""
+    app = web.Application()
+    app.router.add_route("*", "/{tail:.*}", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    pyroostermoney.api.BASE_URL = f"http://127.0.0.1:{runner.addresses[0][1]}"
+    return runner
+
+def logged_in_session(**kwargs) -> RoosterSession:
+    """Returns a session that is logged in without a login request."""
+    session = RoosterSession(reconcile_delay=None, **kwargs)
+    session._session = { # pylint: disable=protected-access
+        "access_token": "token",
+        "token_type": "Bearer",
+        "expiry_time": datetime.now() + timedelta(hours=1),
+        "security_code": "code"
+    }
+    session._logged_in = True # pylint: disable=protected-access
+    return session
@@ -0,0 +1,144 @@
+"""Stress test for concurrent mutations.
+
+Starts a local fake API and fires concurrent pot boosts, pot transfers and
+security token requests from two sessions at once. The fake API checks
+every request for corruption:
+- the body belongs to the child and family in the URL,
+- the boost reason matches its amount,
+- the Authorization header belongs to the family in the URL,
+- securitytoken is only sent where it was asked for.
+
+Usage: python benchmarks/concurrent_mutations.py [requests per session]
+"""
+import asyncio
+import json
+import sys
+import time
+from datetime import datetime, timedelta
+
+from aiohttp import web
+
+import pyroostermoney.api
+from pyroostermoney.api import RoosterSession
+from pyroostermoney.child.account import ChildAccount
+from pyroostermoney.child.money_pot import Pot
+from pyroostermoney.const import URLS
+from pyroostermoney.enum import PotLedgerTypes
+
+FAMILIES = (1, 2)
+CHILDREN = (1, 2, 3)
+
+class FakeApi:
+    """Validates every request it receives."""
+
+    def __init__(self) -> None:
+        self.requests = 0
+        self.errors: list[str] = []
+
+    def _check(self, request: web.Request, body: dict | None):
+        family_id = request.match_info.get("family_id")
+        user_id = int(request.match_info["user_id"])
+        if family_id is not None:
+            if request.headers.get("Authorization") != f"Bearer family-{family_id}":
+                self.errors.append(f"{request.path}: wrong Authorization header")
+        if request.path.endswith("/pin") != ("securitytoken" in request.headers):
+            self.errors.append(f"{request.path}: unexpected securitytoken header")
+        if body is None:
+            return
+        if "reason" in body and body["reason"] != f"boost {body['amount']['amount']}":
+            self.errors.append(f"{request.path}: boost reason does not match its amount")
+        if "childUserId" in body and (body["childUserId"] != user_id or
+                                      str(body["familyId"]) != family_id):
+            self.errors.append(f"{request.path}: transfer body for another child")
+
+    async def handle(self, request: web.Request) -> web.Response:
+        """Validates a request and replies with an empty body."""
+        self.requests += 1
+        raw = await request.read()
+        self._check(request, json.loads(raw) if raw else None)
+        await asyncio.sleep(0.001)
+        return web.json_response({})
+
+    async def start(self) -> web.AppRunner:
+        """Starts the fake API on a free port."""
+        app = web.Application()
+        app.router.add_route(
+            "PUT", "/api/v1/families/{family_id}/children/{user_id}/{rest:.*}", self.handle)
+        app.router.add_route(
+            "GET", "/api/parent/child/{user_id}/cards/{card_id}/pin", self.handle)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = runner.addresses[0][1]
+        pyroostermoney.api.BASE_URL = f"http://127.0.0.1:{port}"
+        return runner
+
+def _session(family_id: int) -> RoosterSession:
+    """Returns a logged in session for a family."""
+    session = RoosterSession(reconcile_delay=None)
+    session.family_id = family_id
+    session.family_balance = 1_000_000.0
+    session._session = { # pylint: disable=protected-access
+        "access_token": f"family-{family_id}",
+        "token_type": "Bearer",
+        "expiry_time": datetime.now() + timedelta(hours=1),
+        "security_code": f"code-{family_id}"
+    }
+    session._logged_in = True # pylint: disable=protected-access
+    session._headers["Authorization"] = f"Bearer family-{family_id}" # pylint: disable=protected-access
+    return session
+
+def _child(session: RoosterSession, user_id: int) -> ChildAccount:
+    """Returns a child with a spend and savings pot."""
+    child = ChildAccount(user_id, session)
+    child.pots = [Pot(name=ledger_type.name, ledger=None, pot_id=f"{ledger_type.name}_POT",
+                      image=None, enabled=True, value=1_000_000.0, session=session, child=child,
+                      ledger_type=ledger_type)
+                  for ledger_type in (PotLedgerTypes.SAVE, PotLedgerTypes.SPEND)]
+    return child
+
+def _operations(session: RoosterSession, count: int) -> list:
+    """Returns count mixed writes and security token reads for a session."""
+    children = [_child(session, user_id) for user_id in CHILDREN]
+    operations = []
+    for i in range(count):
+        child = children[i % len(children)]
+        if i % 3 == 0:
+            operations.append(child.pots[0].add_to_pot(i / 100, f"boost {i}"))
+        elif i % 3 == 1:
+            operations.append(child.pot_money_transfer(PotLedgerTypes.SPEND,
+                                                       PotLedgerTypes.SAVE,
+                                                       i / 100,
+                                                       refresh=False))
+        else:
+            operations.append(session.request_handler(
+                URLS.get("get_child_card_pin").format(user_id=child.user_id, card_id="c"),
+                add_security_token=True))
+    return operations
+
+async def main(count: int = 300):
+    """Runs the stress test."""
+    api = FakeApi()
+    runner = await api.start()
+    try:
+        sessions = [_session(family_id) for family_id in FAMILIES]
+        operations = [op for session in sessions for op in _operations(session, count)]
+        start = time.perf_counter()
+        results = await asyncio.gather(*operations, return_exceptions=True)
+        elapsed = time.perf_counter() - start
+        for session in sessions:
+            await session.close()
+    finally:
+        await runner.cleanup()
+    failures = [r for r in results if isinstance(r, Exception)]
+    print(f"{api.requests} requests in {elapsed:.2f}s, "
+          f"{len(failures)} failed, {len(api.errors)} corrupted")
+    for error in api.errors[:10]:
+        print(f"    {error}")
+    for failure in failures[:10]:
+        print(f"    {failure!r}")
+    return 1 if api.errors or failures else 0
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 300)))
@@ -0,0 +1,67 @@
+"""Tail latency of GETs with and without hedging.
+
+Starts a local fake API where a small share of responses are slow, then
+sends GETs to one endpoint and compares the latency percentiles of plain
+requests with hedged requests.
+
+Usage: python benchmarks/hedged_requests.py [requests]
+"""
+import asyncio
+import random
+import sys
+import time
+
+from aiohttp import web
+
+from common import logged_in_session, start_fake_api
+from pyroostermoney.hedging import HedgingPolicy
+
+FAST = 0.005
+SLOW = 0.25
+SLOW_SHARE = 0.03
+
+async def _handle(_request: web.Request) -> web.Response:
+    """Replies after FAST seconds, or SLOW seconds for SLOW_SHARE of the requests."""
+    await asyncio.sleep(SLOW if random.random() < SLOW_SHARE else FAST)
+    return web.json_response({})
+
+def _percentile(values: list[float], percentile: float) -> float:
+    """Returns a percentile of values."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percentile / 100))]
+
+async def _run(count: int, hedging: HedgingPolicy | None) -> list[float]:
+    """Sends count GETs, four at a time, returns their latencies."""
+    session = logged_in_session(hedging=hedging)
+    latencies = []
+
+    async def _get(i: int):
+        start = time.perf_counter()
+        await session.request_handler(f"api/parent/child/{i}")
+        latencies.append(time.perf_counter() - start)
+
+    for i in range(0, count, 4):
+        await asyncio.gather(*[_get(j) for j in range(i, min(count, i + 4))])
+    await session.close()
+    return latencies
+
+async def main(count: int = 2000):
+    """Runs the benchmark."""
+    random.seed(1)
+    runner = await start_fake_api(_handle)
+    try:
+        plain = await _run(count, None)
+        hedging = HedgingPolicy(percentile=90, budget=0.1)
+        hedged = await _run(count, hedging)
+    finally:
+        await runner.cleanup()
+    for name, latencies in (("plain", plain), ("hedged", hedged)):
+        print(f"{name:>6}: p50 {_percentile(latencies, 50)*1000:.1f}ms, "
+              f"p99 {_percentile(latencies, 99)*1000:.1f}ms, "
+              f"max {max(latencies)*1000:.1f}ms")
+    stats = hedging.stats()
+    print(f"hedged {stats['hedged']} of {stats['requests']} requests "
+          f"({stats['hedge_rate']:.1%}), the hedge won {stats['win_rate']:.0%}")
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000))
@@ -0,0 +1,103 @@
+"""Import time and cold start benchmark.
+
+Runs fresh interpreters to report:
+- the cumulative `-X importtime` cost of `import pyroostermoney` and of
+  `from pyroostermoney import RoosterMoney`, with the slowest modules,
+- the time from interpreter spawn to the first HTTP request reaching a
+  local stub server during RoosterMoney.create.
+
+Usage: python benchmarks/import_time.py [runs]
+"""
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+STATEMENTS = {
+    "import pyroostermoney": "import pyroostermoney",
+    "import RoosterMoney": "from pyroostermoney import RoosterMoney",
+    "import aiohttp": "import aiohttp"
+}
+
+COLD_START = """
+import asyncio
+import pyroostermoney.api
+pyroostermoney.api.BASE_URL = {base_url!r}
+from pyroostermoney import RoosterMoney
+try:
+    asyncio.run(RoosterMoney.create("user", "password"))
+except Exception:
+    pass
+"""
+
+_ENV = dict(os.environ, PYTHONPATH=os.pathsep.join(
+    [os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+     os.environ.get("PYTHONPATH", "")]))
+
+def _import_time(statement: str) -> tuple[int, list[tuple[int, str]]]:
+    """Returns the total cumulative import time (us) and the slowest modules."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", statement],
+                            capture_output=True, text=True, env=_ENV, check=True)
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        modules.append((int(cumulative), name.rstrip()))
+    # top level imports are the ones that are not indented
+    total = sum(c for c, name in modules if not name.startswith("  "))
+    return total, sorted(modules, reverse=True)[:5]
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """Records the arrival time of the first request."""
+
+    first_request: float | None = None
+
+    def _reply(self):
+        if _StubHandler.first_request is None:
+            _StubHandler.first_request = time.perf_counter()
+        body = json.dumps({}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST = do_PUT = _reply
+
+    def log_message(self, *args): # pylint: disable=arguments-differ
+        pass
+
+def _cold_start(base_url: str) -> float:
+    """Returns the seconds from interpreter spawn to the first request."""
+    _StubHandler.first_request = None
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", COLD_START.format(base_url=base_url)],
+                   capture_output=True, env=_ENV, check=False)
+    if _StubHandler.first_request is None:
+        raise RuntimeError("No request reached the stub server")
+    return _StubHandler.first_request - start
+
+def main(runs: int = 5):
+    """Runs the benchmark."""
+    for label, statement in STATEMENTS.items():
+        results = [_import_time(statement) for _ in range(runs)]
+        best = min(results, key=lambda x: x[0])
+        print(f"{label:<24} {best[0] / 1000:8.1f} ms (best of {runs})")
+        for cumulative, name in best[1]:
+            print(f"    {cumulative / 1000:8.1f} ms {name.strip()}")
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        base_url = f"http://127.0.0.1:{server.server_address[1]}"
+        times = [_cold_start(base_url) for _ in range(runs)]
+    finally:
+        server.shutdown()
+    print(f"{'cold start to request':<24} {min(times) * 1000:8.1f} ms (best of {runs})")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
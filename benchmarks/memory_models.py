@@ -0,0 +1,77 @@
+"""Memory benchmark for the slotted model classes.
+
+Builds 100k transactions and 100k jobs with the slotted models and with
+equivalent dict backed classes, then reports the memory held by each
+using tracemalloc.
+
+Usage: python benchmarks/memory_models.py [count]
+"""
+import sys
+import tracemalloc
+from datetime import datetime
+
+from pyroostermoney.child.jobs import Job
+from pyroostermoney.child.transaction import Transaction
+
+def _dict_backed(cls):
+    """Returns a dict backed copy of a slotted model class."""
+    return type(f"Dict{cls.__name__}", (), {"__init__": cls.__init__})
+
+def _transaction(cls, i):
+    return cls(action_user=1,
+               amount=-1.5,
+               new_balance=10.0,
+               description="Card payment",
+               extended_description="",
+               guardian_profile_image="",
+               transaction_id=i,
+               message="",
+               resource_image="",
+               transaction_timestamp="2023-12-01T10:00:00",
+               source="CARD",
+               transaction_type="CARD_PAYMENT",
+               user_id=1)
+
+def _job(cls, i):
+    return cls(allowance_period_id=1,
+               currency="GBP",
+               description="Tidy room",
+               due_any_day=False,
+               due_date=datetime(2023, 12, 1),
+               expiry_processed=False,
+               final_reward_amount=1.0,
+               image_url="",
+               locked=False,
+               master_job_id=i,
+               reopened=False,
+               reward_amount=1.0,
+               scheduled_job_id=i,
+               state=None,
+               time_of_day=12,
+               title="Tidy room",
+               job_type=0,
+               schedule_type=None,
+               session=None)
+
+def measure(factory, cls, count) -> int:
+    """Returns the bytes held by count instances."""
+    tracemalloc.start()
+    items = [factory(cls, i) for i in range(count)]
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del items
+    return current
+
+def main():
+    """Runs the benchmark."""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    for name, factory, cls in (("Transaction", _transaction, Transaction),
+                               ("Job", _job, Job)):
+        slotted = measure(factory, cls, count)
+        dict_backed = measure(factory, _dict_backed(cls), count)
+        print(f"{name:<12} x{count}: slots {slotted/1024/1024:8.2f} MiB, "
+              f"dict {dict_backed/1024/1024:8.2f} MiB, "
+              f"saved {100 - slotted*100/dict_backed:5.1f}%")
+
+if __name__ == "__main__":
+    main()
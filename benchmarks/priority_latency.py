@@ -0,0 +1,73 @@
+"""Interactive write latency during a background refresh wave.
+
+Starts a local fake API answering every request after a fixed delay, then
+sends a wave of background GETs while a few interactive writes (pot boosts)
+are made. Compares the write latency of one shared pool of connections
+with the same number of connections split into priority classes.
+
+Usage: python benchmarks/priority_latency.py [background requests]
+"""
+import asyncio
+import statistics
+import sys
+import time
+
+from aiohttp import web
+
+from common import logged_in_session, start_fake_api
+from pyroostermoney.api import RoosterSession
+from pyroostermoney.enum import RequestPriority
+from pyroostermoney.priority import RequestScheduler, background_requests, request_priority
+
+DELAY = 0.02
+WRITES = 10
+SHARES = {
+    RequestPriority.INTERACTIVE_WRITE: 4,
+    RequestPriority.INTERACTIVE_READ: 4,
+    RequestPriority.BACKGROUND: 4
+}
+
+async def _handle(_request: web.Request) -> web.Response:
+    """Replies with an empty body after DELAY."""
+    await asyncio.sleep(DELAY)
+    return web.json_response({})
+
+async def _write(session: RoosterSession, priority: RequestPriority) -> float:
+    """Sends an interactive write, returns its latency."""
+    start = time.perf_counter()
+    with request_priority(priority):
+        await session.request_handler("api/v1/families/1/children/1/pots/p/boost",
+                                      body={}, method="PUT")
+    return time.perf_counter() - start
+
+async def _run(scheduler: RequestScheduler, write_priority: RequestPriority, count: int):
+    """Runs the background wave and the writes, returns the write latencies."""
+    session = logged_in_session(request_scheduler=scheduler)
+    with background_requests():
+        wave = [asyncio.create_task(session.request_handler(f"api/parent/child/{i}"))
+                for i in range(count)]
+    writes = []
+    for _ in range(WRITES):
+        # spread the writes over the time the wave takes with the full pool
+        await asyncio.sleep(DELAY * count / sum(SHARES.values()) / WRITES)
+        writes.append(asyncio.create_task(_write(session, write_priority)))
+    latencies = await asyncio.gather(*writes)
+    await asyncio.gather(*wave)
+    await session.close()
+    return latencies
+
+async def main(count: int = 400):
+    """Runs the benchmark."""
+    runner = await start_fake_api(_handle)
+    try:
+        shared = await _run(RequestScheduler({RequestPriority.BACKGROUND: sum(SHARES.values())}),
+                            RequestPriority.BACKGROUND, count)
+        split = await _run(RequestScheduler(SHARES), RequestPriority.INTERACTIVE_WRITE, count)
+    finally:
+        await runner.cleanup()
+    for name, latencies in (("shared pool", shared), ("priority classes", split)):
+        print(f"{name:>17}: write latency median {statistics.median(latencies)*1000:.1f}ms, "
+              f"max {max(latencies)*1000:.1f}ms")
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 400))
@@ -1,4 +1,30 @@
-"""Python Rooster Money module."""
-from .roostermoney import RoosterMoney
-from .exceptions import InvalidAuthError, AuthenticationExpired, NotLoggedIn
-from .events import EventSource, EventType
+"""Python Rooster Money module.
+
+Public names are imported on first attribute access (PEP 562), so
+`import pyroostermoney` stays cheap for short lived processes. aiohttp is
+only imported once the first request is sent.
+"""
+from typing import TYPE_CHECKING
+
+from .lazy import lazy_exports
+
+_EXPORTS = {
+    "RoosterMoney": ".roostermoney",
+    "SyncRoosterMoney": ".sync",
+    "InvalidAuthError": ".exceptions",
+    "AuthenticationExpired": ".exceptions",
+    "NotLoggedIn": ".exceptions",
+    "EventsMissed": ".exceptions",
+    "EventSource": ".events",
+    "EventType": ".events"
+}
+
+__all__ = list(_EXPORTS)
+
+if TYPE_CHECKING:
+    from .roostermoney import RoosterMoney
+    from .sync import SyncRoosterMoney
+    from .exceptions import InvalidAuthError, AuthenticationExpired, NotLoggedIn, EventsMissed
+    from .events import EventSource, EventType
+
+__getattr__, __dir__ = lazy_exports(__name__, _EXPORTS)
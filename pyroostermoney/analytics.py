@@ -0,0 +1,266 @@
+"""Spend analytics over child transactions.
+
+Transactions are packed into columnar arrays once and then aggregated in
+bulk. NumPy is used when it is installed, otherwise the columns are held in
+array.array and aggregated with plain Python loops.
+
+Spend is the absolute value of every negative, non-declined amount.
+"""
+# pylint: disable=invalid-name
+# pylint: disable=too-many-instance-attributes
+# pylint: disable=too-many-locals
+# pylint: disable=too-few-public-methods
+import math
+from array import array
+from collections.abc import Iterable
+from datetime import date, datetime, timezone
+
+try:
+    import numpy as np
+except ImportError: # pragma: no cover
+    np = None
+
+from .child.transaction import Transaction
+
+DAY = 86400
+PERIODS = ("day", "week")
+
+def _to_epoch(value) -> float:
+    """Converts a transaction timestamp to epoch seconds (nan if unknown)."""
+    if value is None:
+        return float("nan")
+    if isinstance(value, (int, float)):
+        # millisecond timestamps
+        return value / 1000 if value > 1e11 else float(value)
+    if isinstance(value, datetime):
+        return value.timestamp()
+    try:
+        parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return float("nan")
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+def _to_float(value) -> float:
+    """Converts an amount to float (nan if unknown)."""
+    return float("nan") if value is None else float(value)
+
+def _bucket(epoch: float, period: str) -> int:
+    """Returns the day number of the start of the period holding epoch."""
+    day = int(epoch // DAY)
+    if period == "week":
+        # 1970-01-01 was a Thursday, shift so weeks start on Monday
+        return day - ((day + 3) % 7)
+    return day
+
+def _day_to_date(day: int) -> date:
+    """Converts a day number to a date."""
+    return datetime.fromtimestamp(day * DAY, tz=timezone.utc).date()
+
+def _iter_transactions(sources) -> Iterable[tuple[int, Transaction]]:
+    """Yields (user_id, transaction) for every transaction held by the sources."""
+    for source in sources:
+        if hasattr(source, "children"):
+            yield from _iter_transactions(source.children)
+        elif hasattr(source, "declined_transactions"):
+            for transaction in source.transactions:
+                yield source.user_id, transaction
+            for transaction in source.declined_transactions:
+                yield source.user_id, transaction
+        elif isinstance(source, Iterable):
+            yield from _iter_transactions(source)
+        else:
+            raise TypeError(f"Unsupported transaction source {type(source)}")
+
+class _Categories:
+    """Maps category values to integer codes."""
+
+    def __init__(self) -> None:
+        self.values: list = []
+        self._codes: dict = {}
+
+    def code(self, value) -> int:
+        """Returns the code for a value, assigning a new one if needed."""
+        code = self._codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self._codes[value] = code
+            self.values.append(value)
+        return code
+
+class TransactionFrame:
+    """Columnar transactions of one or more children."""
+
+    def __init__(self) -> None:
+        self.user_id = array("q")
+        self.timestamp = array("d")
+        self.amount = array("d")
+        self.balance = array("d")
+        self.declined = array("b")
+        self.transaction_type = array("l")
+        self.source = array("l")
+        self.description = array("l")
+        self.categories = {
+            "transaction_type": _Categories(),
+            "source": _Categories(),
+            "description": _Categories()
+        }
+
+    def __len__(self) -> int:
+        return len(self.user_id)
+
+    @classmethod
+    def from_accounts(cls, *sources) -> 'TransactionFrame':
+        """Builds a frame from ChildAccounts, RoosterMoney instances or iterables of either.
+        Both transactions and declined_transactions are included."""
+        frame = cls()
+        for user_id, transaction in _iter_transactions(sources):
+            frame.append(user_id, transaction)
+        return frame
+
+    @classmethod
+    def from_transactions(cls,
+                          transactions: Iterable[Transaction],
+                          user_id: int | None = None) -> 'TransactionFrame':
+        """Builds a frame from transactions.
+        user_id overrides the user ID held by each transaction."""
+        frame = cls()
+        for transaction in transactions:
+            frame.append(user_id if user_id is not None else transaction.user_id,
+                         transaction)
+        return frame
+
+    def append(self, user_id: int, transaction: Transaction):
+        """Appends a single transaction."""
+        self.user_id.append(int(user_id or 0))
+        self.timestamp.append(_to_epoch(transaction.transaction_timestamp))
+        self.amount.append(_to_float(transaction.amount))
+        self.balance.append(_to_float(transaction.new_balance))
+        self.declined.append(1 if transaction.declined else 0)
+        self.transaction_type.append(
+            self.categories["transaction_type"].code(transaction.transaction_type))
+        self.source.append(self.categories["source"].code(transaction.source))
+        self.description.append(self.categories["description"].code(transaction.description))
+
+    def _column(self, name: str):
+        """Returns a column as a numpy array when numpy is available."""
+        column = getattr(self, name)
+        if np is None:
+            return column
+        return np.frombuffer(column, dtype=column.typecode)
+
+    def _spend(self):
+        """Returns the spend column."""
+        if np is not None:
+            amount = self._column("amount")
+            valid = (self._column("declined") == 0) & (amount < 0)
+            return np.where(valid, -amount, 0.0)
+        return array("d", [-a if a < 0 and d == 0 else 0.0
+                           for a, d in zip(self.amount, self.declined)])
+
+    def _group_sum(self, keys: list, weights) -> dict[tuple, float]:
+        """Sums weights grouped by the given key columns."""
+        if len(self) == 0:
+            return {}
+        if np is not None:
+            stacked = np.stack([np.asarray(k, dtype=np.int64) for k in keys], axis=1)
+            groups, inverse = np.unique(stacked, axis=0, return_inverse=True)
+            sums = np.bincount(inverse.ravel(), weights=weights, minlength=len(groups))
+            return {tuple(int(x) for x in group): float(total)
+                    for group, total in zip(groups, sums)}
+        output: dict[tuple, float] = {}
+        for i, weight in enumerate(weights):
+            key = tuple(k[i] for k in keys)
+            output[key] = output.get(key, 0.0) + weight
+        return output
+
+    def _buckets(self, period: str):
+        """Returns the period bucket column, transactions without a timestamp are -1."""
+        if period not in PERIODS:
+            raise ValueError(f"period must be one of {PERIODS}")
+        if np is not None:
+            timestamp = self._column("timestamp")
+            known = ~np.isnan(timestamp)
+            day = np.where(known, np.floor(np.nan_to_num(timestamp) / DAY), -1).astype(np.int64)
+            if period == "week":
+                day = np.where(known, day - ((day + 3) % 7), -1)
+            return day
+        return array("q", [_bucket(t, period) if not math.isnan(t) else -1
+                            for t in self.timestamp])
+
+    def spend_per_period(self, period: str = "day") -> dict[int, dict[date, float]]:
+        """Returns spend per child per day or week (keyed by the first day of the period)."""
+        output: dict[int, dict[date, float]] = {}
+        grouped = self._group_sum([self.user_id, self._buckets(period)], self._spend())
+        for (user_id, bucket), total in sorted(grouped.items()):
+            if bucket < 0:
+                continue
+            output.setdefault(user_id, {})[_day_to_date(bucket)] = total
+        return output
+
+    def running_balance(self) -> dict[int, list[tuple[float, float]]]:
+        """Returns (epoch, balance) pairs per child in time order.
+        The balance is the cumulative sum of non-declined amounts, anchored to the
+        balance reported with the earliest transaction when available."""
+        output = {}
+        if np is not None:
+            user_ids = self._column("user_id")
+            timestamp = self._column("timestamp")
+            settled = self._column("declined") == 0
+            amount = self._column("amount")
+            balance = self._column("balance")
+            for user_id in np.unique(user_ids):
+                mask = (user_ids == user_id) & settled & ~np.isnan(timestamp)
+                order = np.argsort(timestamp[mask], kind="stable")
+                times = timestamp[mask][order]
+                amounts = np.nan_to_num(amount[mask][order])
+                if len(amounts) == 0:
+                    continue
+                start = balance[mask][order][0] - amounts[0]
+                start = 0.0 if np.isnan(start) else start
+                totals = start + np.cumsum(amounts)
+                output[int(user_id)] = list(zip(times.tolist(), totals.tolist()))
+            return output
+        rows: dict[int, list] = {}
+        for i, user_id in enumerate(self.user_id):
+            if self.declined[i] == 0 and not math.isnan(self.timestamp[i]):
+                rows.setdefault(user_id, []).append(
+                    (self.timestamp[i], self.amount[i], self.balance[i]))
+        for user_id, user_rows in rows.items():
+            user_rows.sort(key=lambda x: x[0])
+            first = user_rows[0]
+            total = first[2] - first[1] if not math.isnan(first[2]) else 0.0
+            output[user_id] = []
+            for epoch, amount, _ in user_rows:
+                total += amount if not math.isnan(amount) else 0.0
+                output[user_id].append((epoch, total))
+        return output
+
+    def decline_ratio(self) -> dict[int, float]:
+        """Returns the ratio of declined transactions per child."""
+        totals = self._group_sum([self.user_id], [1.0] * len(self) if np is None
+                                 else np.ones(len(self)))
+        declines = self._group_sum([self.user_id], self.declined if np is None
+                                   else self._column("declined").astype(np.float64))
+        return {key[0]: declines.get(key, 0.0) / total for key, total in totals.items()}
+
+    def category_breakdown(self, by: str = "transaction_type") -> dict[int, dict[str, float]]:
+        """Returns spend per child per transaction_type or source."""
+        if by not in ("transaction_type", "source"):
+            raise ValueError("by must be transaction_type or source")
+        categories = self.categories[by].values
+        output: dict[int, dict[str, float]] = {}
+        for (user_id, code), total in self._group_sum([self.user_id, getattr(self, by)],
+                                                      self._spend()).items():
+            output.setdefault(user_id, {})[categories[code]] = total
+        return output
+
+    def top_descriptions(self, count: int = 5) -> list[tuple[str, int, float]]:
+        """Returns the (description, transactions, spend) with the highest spend."""
+        spend = self._group_sum([self.description], self._spend())
+        counts = self._group_sum([self.description], [1.0] * len(self) if np is None
+                                 else np.ones(len(self)))
+        values = self.categories["description"].values
+        ranked = sorted(spend.items(), key=lambda x: x[1], reverse=True)[:count]
+        return [(values[key[0]], int(counts[key]), total) for key, total in ranked]
@@ -6,57 +6,174 @@
 import logging
 import base64
 import asyncio
+import time
 from datetime import datetime, timedelta
 
-import aiohttp
-
-from .const import HEADERS, BASE_URL, LOGIN_BODY, URLS, OAUTH_TOKEN_URL
-from .exceptions import InvalidAuthError, NotLoggedIn, AuthenticationExpired
-from .events import Events
+from .const import HEADERS, BASE_URL, URLS, OAUTH_TOKEN_URL
+from .bodies import login_body
+from .exceptions import (
+    InvalidAuthError,
+    NotLoggedIn,
+    AuthenticationExpired,
+    CircuitOpen,
+    DeadlineExceeded
+)
+from .events import Events, EventSource, DEFAULT_JOURNAL_SIZE
+from .codec import JsonCodec, get_codec
+from .token_store import TokenStore, TOKEN_STORE_ERRORS
+from .reconcile import Reconciler, DEFAULT_RECONCILE_DELAY, FAMILY_ACCOUNT
+from .breaker import CircuitBreakers, endpoint as url_endpoint
+from .priority import RequestScheduler
+from .hedging import HedgingPolicy
+from .tasks import remaining_time
+from .profiling import record_request, record_wait, capture, merge
 
 _LOGGER = logging.getLogger(__name__)
 
+DEFAULT_REQUEST_TIMEOUT = 30.0
+CONNECTION_RESET_RETRY_DELAY = 5
+# endpoints that send credentials, never cached, served stale or hedged
+AUTH_ENDPOINTS = ("login",)
+
+def _aiohttp():
+    """Imports aiohttp on first use, keeping it out of the package import time."""
+    import aiohttp # pylint: disable=import-outside-toplevel
+    return aiohttp
+
 class RoosterSession:
     """The main Rooster Session."""
 
-    def __init__(self) -> None:
+    def __init__(self,
+                 event_journal_size: int = DEFAULT_JOURNAL_SIZE,
+                 event_journal_path: str | None = None,
+                 codec: JsonCodec | str | None = None,
+                 token_store: TokenStore | None = None,
+                 reconcile_delay: float | None = DEFAULT_RECONCILE_DELAY,
+                 request_timeout: float = DEFAULT_REQUEST_TIMEOUT,
+                 breakers: CircuitBreakers | None = None,
+                 request_scheduler: RequestScheduler | None = None,
+                 hedging: HedgingPolicy | None = None) -> None:
         self._username = ""
         self._password = ""
         self._session = None
-        self._headers = HEADERS
+        self._client = None
+        self._client_loop: asyncio.AbstractEventLoop = None
+        # copied so the Authorization header of one session never leaks into another
+        self._headers = dict(HEADERS)
         self._logged_in = False
         self._logging_in = asyncio.Lock()
-        self.events = Events()
+        self.events = Events(journal_size=event_journal_size,
+                             journal_path=event_journal_path)
         # below is stored here because other services (like money pots) rely on this
         self.family_id = None
         self.family_balance = None
+        self.codec = codec if isinstance(codec, JsonCodec) else get_codec(codec)
+        self.token_store = token_store
+        self.reconciler = Reconciler(self, reconcile_delay)
+        self.request_timeout = request_timeout
+        self.breakers = breakers if breakers is not None else CircuitBreakers()
+        self.request_scheduler = (request_scheduler if request_scheduler is not None
+                                  else RequestScheduler())
+        self.hedging = hedging
+        # url -> last successful GET response, served while the endpoint is failing
+        self._last_good: dict[str, dict] = {}
+        # url -> when it started being served from _last_good
+        self.stale: dict[str, datetime] = {}
+
+    def _http(self):
+        """Returns the pooled HTTP client session, keeping connections alive between requests.
+        A new one is created if it was closed or belongs to another event loop."""
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client.closed or self._client_loop is not loop:
+            if self._client is not None and not self._client.closed:
+                self._discard_client()
+            self._client = _aiohttp().ClientSession()
+            self._client_loop = loop
+        return self._client
+
+    def _discard_client(self):
+        """Closes a client session left on another event loop. It is closed on its own loop
+        if that loop still runs, otherwise its connector is detached as it cannot be
+        awaited from here."""
+        if self._client_loop.is_running() and not self._client_loop.is_closed():
+            asyncio.run_coroutine_threadsafe(self._client.close(), self._client_loop)
+        else:
+            self._client.detach()
+
+    async def close(self):
+        """Cancels pending reconciliations, closes the pooled HTTP client session and
+        writes out the event journal."""
+        self.reconciler.cancel()
+        await asyncio.to_thread(self.events.close)
+        if self._client is not None and not self._client.closed:
+            if self._client_loop is asyncio.get_running_loop():
+                await self._client.close()
+            else:
+                self._discard_client()
+        self._client = None
+        self._client_loop = None
+
+    def adjust_family_balance(self, delta: float):
+        """Optimistically applies a change to the family balance.
+        The family account is reconciled in the background."""
+        if self.family_balance is None:
+            return
+        old = self.family_balance
+        self.family_balance = round(old + delta, 2)
+        self.reconciler.apply(EventSource.FAMILY_ACCOUNT, None, FAMILY_ACCOUNT, {
+            "balance": {"old": old, "new": self.family_balance}
+        })
 
     async def _send_request(self,
                       url,
                       body: dict = None,
                       auth=None,
-                      method="GET"):
-        """Handles sending HTTP requests"""
-        async with aiohttp.ClientSession() as session:
-            async with session.request(method=method,
-                                       url=f"{BASE_URL}/{url}",
-                                       json=body,
-                                       auth=auth,
-                                       headers=self._headers) as response:
-                output = {
-                    "status": response.status,
-                    "response": {}
-                }
-                if response.status == 401:
-                    raise PermissionError("Unauthorized session")
-                if response.status == 403:
-                    raise PermissionError("Access denied.")
-                if response.status == 204:
-                    return output
-                if response.status >= 200 and response.status < 204:
-                    output["response"] = await response.json()
-                    return output
-                return output
+                      method="GET",
+                      schema=None,
+                      headers: dict | None = None):
+        """Handles sending HTTP requests.
+        headers are added to the session headers for this request only.
+        The request times out after request_timeout, or earlier if the deadline is closer."""
+        timeout = self.request_timeout
+        remaining = remaining_time()
+        if remaining is not None and remaining <= 0:
+            raise DeadlineExceeded(sent=False)
+        bounded = remaining is not None and remaining < timeout
+        if bounded:
+            timeout = remaining
+        try:
+            return await self._send(url, body, auth, method, schema, headers, timeout)
+        except asyncio.TimeoutError as exc:
+            if bounded:
+                raise DeadlineExceeded() from exc
+            raise
+
+    async def _send(self, url, body, auth, method, schema, headers, timeout: float):
+        """Sends a HTTP request and parses the response."""
+        started = time.perf_counter()
+        raw = b""
+        async with self._http().request(method=method,
+                                        url=f"{BASE_URL}/{url}",
+                                        data=self.codec.encode(body) if body is not None else None,
+                                        auth=auth,
+                                        headers={**self._headers, **(headers or {})},
+                                        timeout=_aiohttp().ClientTimeout(total=timeout)
+                                        ) as response:
+            output = {
+                "status": response.status,
+                "response": {}
+            }
+            if response.status == 401:
+                raise PermissionError("Unauthorized session")
+            if response.status == 403:
+                raise PermissionError("Access denied.")
+            if 200 <= response.status < 204:
+                raw = await response.read()
+        received = time.perf_counter()
+        if len(raw) > 0:
+            output["response"] = self.codec.decode(raw, schema)
+        record_request(received - started, time.perf_counter() - received, len(raw))
+        return output
 
     def _parse_login(self, login_response, token):
         """Parses a login response"""
@@ -69,15 +186,55 @@ class RoosterSession:
         access_token = login_response.get("access_token")
 
         self._headers["Authorization"] = f"{token_type} {access_token}"
+        refresh_expires_in = login_response.get("refresh_expires_in")
         return {
                 "access_token": access_token,
                 "refresh_token": login_response.get("refresh_token"),
                 "token_type": token_type,
                 "expiry_time": datetime.now() + timedelta(0,
                                                           login_response.get("expires_in")),
+                "refresh_expiry_time": (datetime.now() + timedelta(0, refresh_expires_in)
+                                        if refresh_expires_in is not None else None),
                 "security_code": token
             }
 
+    async def _load_stored_token(self) -> bool:
+        """Restores the session from the token store, returns True if a token was found.
+        A token that cannot be read is removed, so the session logs in with the password."""
+        if self.token_store is None or self._session is not None:
+            return False
+        try:
+            token = await self.token_store.load(self._username)
+        except TOKEN_STORE_ERRORS as exc:
+            _LOGGER.warning("Unable to read stored session token, logging in again: %s", exc)
+            try:
+                await self.token_store.delete(self._username)
+            except TOKEN_STORE_ERRORS as delete_exc:
+                _LOGGER.warning("Unable to remove stored session token: %s", delete_exc)
+            return False
+        if token is None or token.get("access_token") is None:
+            return False
+        self._session = token
+        self._logged_in = True
+        self._headers["Authorization"] = f"{token['token_type']} {token['access_token']}"
+        return True
+
+    async def _save_token(self):
+        """Persists the current session in the token store."""
+        if self.token_store is None or self._session is None:
+            return
+        try:
+            await self.token_store.save(self._username, self._session)
+        except TOKEN_STORE_ERRORS as exc:
+            _LOGGER.warning("Unable to persist session token: %s", exc)
+
+    def _can_refresh(self) -> bool:
+        """Returns True if the refresh token of the current session may still be valid."""
+        if self._session is None or self._session.get("refresh_token") is None:
+            return False
+        refresh_expiry = self._session.get("refresh_expiry_time")
+        return refresh_expiry is None or refresh_expiry > datetime.now()
+
     async def _session_start(self, username, password):
         """Logs into RoosterMoney and starts a new active session."""
         if self._logging_in.locked():
@@ -89,25 +246,33 @@ class RoosterSession:
         async with self._logging_in:
             self._username = username
             self._password = password
+            if await self._load_stored_token():
+                _LOGGER.debug("Restored session from token store.")
             if self._session is not None:
                 if self._session.get("expiry_time") > datetime.now():
                     _LOGGER.debug("Not logging in again, session already active.")
                     return True
+                if self._can_refresh() and await self._refresh():
+                    _LOGGER.debug("Not logging in again, session refreshed.")
+                    return True
+                self._session = None
+                self._logged_in = False
 
-            req_body = LOGIN_BODY
-            req_body["username"] = self._username
-            req_body["password"] = self._password
-            auth = aiohttp.BasicAuth(self._username, self._password)
+            req_body = login_body(self._username, self._password)
+            auth = _aiohttp().BasicAuth(self._username, self._password)
 
             if "Authorization" in self._headers:
                 self._headers.pop("Authorization")
 
             login_response = await self.request_handler(url=URLS.get("login"),
                                                                 body=req_body,
-                                                                auth=auth)
+                                                                auth=auth,
+                                                                method="POST")
 
             if login_response["status"] == 401:
                 raise InvalidAuthError(self._username, login_response["status"])
+            if not 200 <= login_response["status"] < 300:
+                raise ConnectionError(f"Login failed with HTTP {login_response['status']}")
 
             login_response = login_response["response"]
             token = base64.b64encode(str(self._password[::-1]).encode('utf-8')).decode('utf-8')
@@ -115,23 +280,33 @@ class RoosterSession:
             self._session = self._parse_login(login_response, token)
 
             self._logged_in = True
+            await self._save_token()
+
+        return True
 
+    async def _refresh(self) -> bool:
+        """Exchanges the refresh token for a new access token, returns True on success."""
+        form = _aiohttp().FormData()
+        form.add_field("audience", "rooster-app")
+        form.add_field("grant_type", "refresh_token")
+        form.add_field("client_id", "rooster-app")
+        form.add_field("refresh_token", self._session.get("refresh_token"))
+        try:
+            async with self._http().post(OAUTH_TOKEN_URL, data=form) as request:
+                data = self.codec.decode(await request.read())
+                self._session = self._parse_login(data, self._session.get("security_code"))
+        except (ConnectionError, _aiohttp().ClientError, ValueError, TypeError) as exc:
+            _LOGGER.debug("Unable to refresh session: %s", exc)
+            return False
+        await self._save_token()
         return True
 
     async def refresh_token(self):
         """Refresh the current access token when the session expires."""
-        async with aiohttp.ClientSession() as session:
-            form = aiohttp.FormData()
-            form.add_field("audience", "rooster-app")
-            form.add_field("grant_type", "refresh_token")
-            form.add_field("client_id", "rooster-app")
-            form.add_field("refresh_token", self._session.get("refresh_token"))
-            try:
-                async with session.post(OAUTH_TOKEN_URL, data=form) as request:
-                    data = await request.json()
-                    self._session = self._parse_login(data, self._session.get("security_code"))
-            except ConnectionError:
-                await self._session_start(self._username, self._password)
+        if not await self._refresh():
+            self._session = None
+            self._logged_in = False
+            await self._session_start(self._username, self._password)
 
     async def _internal_request_handler(self,
                                         url,
@@ -139,7 +314,8 @@ class RoosterSession:
                                         auth=None,
                                         method="GET",
                                         login_request=False,
-                                        add_security_token=False):
+                                        add_security_token=False,
+                                        schema=None):
         """Handles all incoming requests to make sure that the session is active."""
 
         if self._session is None and self._logged_in:
@@ -161,12 +337,12 @@ class RoosterSession:
         if self._session["expiry_time"] < datetime.now():
             raise AuthenticationExpired()
 
+        headers = None
         if add_security_token:
-            self._headers["securitytoken"] = self._session["security_code"]
-        elif "securitytoken" in self._headers:
-            self._headers.pop("securitytoken")
+            headers = {"securitytoken": self._session["security_code"]}
 
-        return await self._send_request(url=url, body=body, auth=auth, method=method.upper())
+        return await self._send_request(url=url, body=body, auth=auth, method=method.upper(),
+                                        schema=schema, headers=headers)
 
     async def request_handler(self,
                                         url,
@@ -174,34 +350,141 @@ class RoosterSession:
                                         auth=None,
                                         method="GET",
                                         login_request=False,
-                                        add_security_token=False):
-        """Public calls for the private _internal_request_handler."""
+                                        add_security_token=False,
+                                        schema=None):
+        """Public calls for the private _internal_request_handler.
+        schema is an optional type from pyroostermoney.schema used for typed decoding.
+        Requests go through the circuit breaker of their endpoint. When a GET fails, times
+        out or its breaker is open, the last successful response of that URL is returned
+        with stale set, the error is raised if there is none. Auth endpoints are never
+        served stale.
+        Requests wait for a free slot in their priority class of request_scheduler.
+        GETs are hedged if a hedging policy is set."""
         _LOGGER.debug("Sending %s HTTP request to %s", method, url)
+        breaker = self.breakers.get(url)
+        if not breaker.allow():
+            return self._stale_response(url, method, CircuitOpen(breaker.name,
+                                                                 breaker.retry_after))
+        try:
+            response = await self._dispatch(breaker.name,
+                                            url=url,
+                                            body=body,
+                                            auth=auth,
+                                            method=method,
+                                            login_request=login_request,
+                                            add_security_token=add_security_token,
+                                            schema=schema)
+        except DeadlineExceeded as exc:
+            # the endpoint was not given its full timeout, not its failure
+            breaker.release()
+            return self._stale_response(url, method, exc)
+        except (asyncio.TimeoutError, _aiohttp().ClientError) as exc:
+            breaker.record_failure()
+            return self._stale_response(url, method, exc)
+        except BaseException:
+            breaker.release()
+            raise
+        if response["status"] >= 500:
+            breaker.record_failure()
+            return self._stale_response(url, method, None, response)
+        breaker.record_success()
+        if self._cacheable(url, method) and response["status"] < 300:
+            self._last_good[url] = response
+            self.stale.pop(url, None)
+        return response
+
+    async def _scheduled(self, endpoint: str, **kwargs):
+        """Sends a single attempt of a request once its priority class has a free slot,
+        recording its latency. The slot is only held while the request is sent."""
+        queued = time.perf_counter()
+        async with self.request_scheduler.slot(kwargs["method"]):
+            start = time.perf_counter()
+            record_wait(start - queued)
+            response = await self._internal_request_handler(**kwargs)
+        if self.hedging is not None and response["status"] < 500:
+            self.hedging.record(endpoint, time.perf_counter() - start)
+        return response
+
+    async def _dispatch(self, endpoint: str, **kwargs):
+        """Sends a request. A GET still running after the hedging delay of its endpoint is
+        sent again, the first copy to succeed is returned and the other cancelled.
+        Auth requests, and requests carrying credentials (which are sent as a POST
+        whatever their method), are never hedged."""
+        if (self.hedging is None or kwargs["method"].upper() != "GET"
+            or endpoint in AUTH_ENDPOINTS or kwargs["auth"] is not None
+            or kwargs["login_request"]):
+            return await self._request(endpoint, **kwargs)
+        delay = self.hedging.delay(endpoint)
+        if delay is None:
+            return await self._request(endpoint, **kwargs)
+        primary = asyncio.create_task(self._captured(endpoint, **kwargs))
+        tasks = [primary]
+        try:
+            done, pending = await asyncio.wait(tasks, timeout=delay)
+            if (len(done) == 0 and self.request_scheduler.has_capacity(kwargs["method"])
+                and self.hedging.take()):
+                _LOGGER.debug("Hedging slow request to %s", kwargs["url"])
+                tasks.append(asyncio.create_task(self._captured(endpoint, **kwargs)))
+            pending = set(tasks)
+            while len(pending) > 0:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in tasks:
+                    if task in done and task.exception() is None:
+                        response, recorded = task.result()
+                        merge(recorded)
+                        if task is not primary:
+                            self.hedging.won += 1
+                            record_wait(delay)
+                        return response
+            return primary.result()[0]
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def _captured(self, endpoint: str, **kwargs):
+        """Sends a copy of a hedged request, returning its response and what it recorded
+        for profiling, which is only charged if this copy wins."""
+        with capture() as recorded:
+            response = await self._request(endpoint, **kwargs)
+        return response, recorded
+
+    @staticmethod
+    def _cacheable(url, method) -> bool:
+        """Returns True if the response of a request may be served stale later."""
+        return method.upper() == "GET" and url_endpoint(url) not in AUTH_ENDPOINTS
+
+    def _stale_response(self, url, method, exc: BaseException | None, response=None):
+        """Returns the last successful response of a GET marked as stale.
+        Without one the error is raised, or the failed response returned."""
+        last_good = self._last_good.get(url) if self._cacheable(url, method) else None
+        if last_good is None:
+            if exc is not None:
+                raise exc
+            return response
+        _LOGGER.debug("Serving stale response for %s: %s", url, exc or response["status"])
+        self.stale.setdefault(url, datetime.now())
+        return {**last_good, "stale": True}
+
+    async def _request(self, endpoint: str, **kwargs):
+        """Sends a request, refreshing an expired session and retrying a reset connection once.
+        The refresh (which may log in again through request_handler) and the retry delay
+        run without holding a slot, so they cannot wait on the slots of the requests
+        waiting for them."""
         try:
-            return await self._internal_request_handler(
-                url=url,
-                body=body,
-                auth=auth,
-                method=method,
-                login_request=login_request,
-                add_security_token=add_security_token
-            )
+            return await self._scheduled(endpoint, **kwargs)
         except AuthenticationExpired:
             await self.refresh_token()
-            return await self._internal_request_handler(
-                url=url,
-                body=body,
-                auth=auth,
-                method=method,
-                login_request=login_request
-            )
+            return await self._scheduled(endpoint, **kwargs)
         except NotLoggedIn as exc:
             raise NotLoggedIn() from exc
-        except aiohttp.ClientOSError as exc:
-            # silent exc handler
-            if exc.errno == 104: # connection reset by peer
-                _LOGGER.debug("Connection reset by peer - retrying request.")
-                asyncio.sleep(5)
-                await self.request_handler(**locals())
-            else:
-                raise aiohttp.ClientOSError from exc
+        except _aiohttp().ClientOSError as exc:
+            if exc.errno != 104: # connection reset by peer
+                raise
+            _LOGGER.debug("Connection reset by peer - retrying request.")
+            remaining = remaining_time()
+            delay = (CONNECTION_RESET_RETRY_DELAY if remaining is None
+                     else max(0, min(CONNECTION_RESET_RETRY_DELAY, remaining)))
+            await asyncio.sleep(delay)
+            record_wait(delay)
+            return await self._scheduled(endpoint, **kwargs)
@@ -0,0 +1,131 @@
+"""Batched mutations.
+
+Writes are queued on a MutationBatch and sent concurrently when the batch
+runs. The resources touched by the writes are then refreshed once per
+child, instead of after every write.
+
+Usage:
+    async with rooster.batch() as batch:
+        for child in rooster.children:
+            batch.add_to_pot(child.pots[0], 1.0, "Weekly boost")
+    print(batch.results)
+"""
+# pylint: disable=too-many-arguments
+import logging
+from collections.abc import Awaitable, Callable
+
+from .child.account import ChildAccount
+from .child.money_pot import Pot
+from .child.standing_order import StandingOrder
+from .enum import PotLedgerTypes
+from .reconcile import PROFILE, FAMILY_ACCOUNT, refresh_resource
+from .tasks import gather_limited, DEFAULT_MAX_CONCURRENCY
+
+_LOGGER = logging.getLogger(__name__)
+
+class MutationBatch:
+    """A queue of writes across children, run concurrently with one refresh at the end."""
+
+    def __init__(self, session, max_concurrency: int = DEFAULT_MAX_CONCURRENCY) -> None:
+        self._session = session
+        self._max_concurrency = max_concurrency
+        self._operations: list[tuple[str, ChildAccount, tuple[str, ...], Callable]] = []
+        self.results: list[dict] = []
+
+    def __len__(self) -> int:
+        return len(self._operations)
+
+    async def __aenter__(self) -> 'MutationBatch':
+        return self
+
+    async def __aexit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            await self.run()
+        else:
+            self._operations.clear()
+
+    def _queue(self,
+               operation: str,
+               child: ChildAccount,
+               touched: tuple[str, ...],
+               func: Callable[[], Awaitable]):
+        """Queues a write, touched lists the resources it changes."""
+        self._operations.append((operation, child, touched, func))
+
+    def _pot_child(self, pot: Pot) -> ChildAccount:
+        """Returns the child owning a pot."""
+        return self._session.get_child_account(pot.user_id)
+
+    def add_to_pot(self, pot: Pot, value: float, reason: str = ""):
+        """Queues adding money to a pot from the family account."""
+        self._queue("add_to_pot", self._pot_child(pot), ("pots", FAMILY_ACCOUNT),
+                    lambda: pot.add_to_pot(value, reason))
+
+    def remove_from_pot(self, pot: Pot, value: float, reason: str = ""):
+        """Queues removing money from a pot."""
+        self._queue("remove_from_pot", self._pot_child(pot), ("pots", FAMILY_ACCOUNT),
+                    lambda: pot.remove_from_pot(value, reason))
+
+    def pot_money_transfer(self,
+                           child: ChildAccount,
+                           source: PotLedgerTypes,
+                           destination: PotLedgerTypes,
+                           amount: float,
+                           to_custom_pot_id: str | None = None,
+                           from_custom_pot_id: str | None = None):
+        """Queues a transfer between two pots of a child."""
+        self._queue("pot_money_transfer", child, ("pots",),
+                    lambda: child.pot_money_transfer(source,
+                                                     destination,
+                                                     amount,
+                                                     to_custom_pot_id,
+                                                     from_custom_pot_id,
+                                                     refresh=False))
+
+    def create_standing_order(self, child: ChildAccount, standing_order: StandingOrder):
+        """Queues creating a standing order."""
+        self._queue("create_standing_order", child, ("standing_orders",),
+                    lambda: child.create_standing_order(standing_order, refresh=False))
+
+    def delete_standing_order(self, child: ChildAccount, standing_order: StandingOrder):
+        """Queues deleting a standing order."""
+        self._queue("delete_standing_order", child, ("standing_orders",),
+                    lambda: child.delete_standing_order(standing_order, refresh=False))
+
+    def update_allowance(self, child: ChildAccount, paused: bool = False, amount: float = 0.0):
+        """Queues updating the allowance of a child."""
+        self._queue("update_allowance", child, (PROFILE,),
+                    lambda: child.update_allowance(paused, amount, refresh=False))
+
+    async def run(self) -> list[dict]:
+        """Sends every queued write, then refreshes the touched resources once.
+        A failed write does not stop the others. Returns a result dict per write."""
+        operations = self._operations
+        self._operations = []
+        responses = await gather_limited([func() for _, _, _, func in operations],
+                                         self._max_concurrency)
+        refresh: dict[tuple, ChildAccount] = {}
+        results = []
+        for (operation, child, touched, _), response in zip(operations, responses):
+            success = not isinstance(response, Exception) and response is not False
+            if isinstance(response, Exception):
+                _LOGGER.warning("Batched %s failed: %s", operation, response)
+            for resource in touched:
+                # the family account is shared, only refresh it once
+                key = (None, resource) if resource == FAMILY_ACCOUNT else (child.user_id, resource)
+                refresh[key] = child
+            results.append({
+                "operation": operation,
+                "user_id": child.user_id,
+                "success": success,
+                "error": response if isinstance(response, Exception) else None
+            })
+        refreshed = await gather_limited(
+            [refresh_resource(self._session, child, resource)
+             for (_, resource), child in refresh.items()],
+            self._max_concurrency)
+        for result in refreshed:
+            if isinstance(result, Exception):
+                _LOGGER.error("Unable to refresh after batch: %s", result)
+        self.results.extend(results)
+        return results
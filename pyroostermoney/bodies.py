@@ -0,0 +1,84 @@
+"""Request body builders.
+
+The body templates in const are shared by every session and must never be
+modified. Each builder returns a new, fully independent body so concurrent
+requests and multiple sessions in one process cannot corrupt each other.
+"""
+# pylint: disable=too-many-arguments
+from copy import deepcopy
+
+from .const import (
+    BOOST_BODY,
+    CREATE_MASTER_JOB_BODY,
+    CREATE_PAYMENT_BODY,
+    LOGIN_BODY,
+    TRANSFER_BODY
+)
+
+def login_body(username: str, password: str) -> dict:
+    """Returns the body of a login request."""
+    body = deepcopy(LOGIN_BODY)
+    body["username"] = username
+    body["password"] = password
+    return body
+
+def boost_body(value: float, reason: str = "") -> dict:
+    """Returns the body of a pot money action, value is in GBP."""
+    body = deepcopy(BOOST_BODY)
+    body["amount"]["amount"] = round(value*100)
+    body["reason"] = reason
+    return body
+
+def transfer_body(user_id: int,
+                  family_id: int,
+                  source: str,
+                  destination: str,
+                  amount: float,
+                  to_custom_pot_id: str | None = None,
+                  from_custom_pot_id: str | None = None) -> dict:
+    """Returns the body of a pot transfer, amount is in GBP."""
+    body = deepcopy(TRANSFER_BODY)
+    body["childUserId"] = user_id
+    body["familyId"] = family_id
+    body["destinationLedgerType"] = destination
+    body["sourceLedgerType"] = source
+    body["transferAmount"]["amount"] = round(amount*100)
+    if from_custom_pot_id is not None:
+        body["fromCustomPotId"] = from_custom_pot_id
+    if to_custom_pot_id is not None:
+        body["toCustomPotId"] = to_custom_pot_id
+    return body
+
+def master_job_body(user_ids: list[int],
+                    guardian_id: int,
+                    description: str,
+                    title: str,
+                    image: str,
+                    reward_amount: float,
+                    schedule_info: dict) -> dict:
+    """Returns the body of a master job creation."""
+    body = deepcopy(CREATE_MASTER_JOB_BODY)
+    body["childUserIds"] = list(user_ids)
+    body["masterJob"]["createdByGuardianId"] = guardian_id
+    body["masterJob"]["description"] = description
+    body["masterJob"]["imageUrl"] = image
+    body["masterJob"]["rewardAmount"] = reward_amount
+    body["masterJob"]["scheduleInfo"] = deepcopy(schedule_info)
+    body["masterJob"]["title"] = title
+    return body
+
+def payment_body(value: float,
+                 card_number,
+                 expiry_month,
+                 expiry_year,
+                 security_code,
+                 holder_name) -> dict:
+    """Returns the body of a family account top up payment."""
+    body = deepcopy(CREATE_PAYMENT_BODY)
+    body["amount"]["value"] = value*100
+    body["paymentMethod"]["encryptedCardNumber"] = card_number
+    body["paymentMethod"]["encryptedExpiryMonth"] = expiry_month
+    body["paymentMethod"]["encryptedExpiryYear"] = expiry_year
+    body["paymentMethod"]["encryptedSecurityCode"] = security_code
+    body["paymentMethod"]["holderName"] = holder_name
+    return body
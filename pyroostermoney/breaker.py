@@ -0,0 +1,114 @@
+"""Per endpoint circuit breakers.
+
+Every URL template in const.URLS gets its own breaker. After
+failure_threshold consecutive failures (timeouts, connection errors or 5xx
+responses) the breaker opens and requests to that endpoint fail straight
+away, so a degraded endpoint cannot stall the others. After reset_timeout
+a single trial request is let through (half open): success closes the
+breaker, failure opens it again.
+"""
+import re
+import time
+from functools import lru_cache
+
+from .const import URLS
+from .enum import BreakerState
+
+DEFAULT_FAILURE_THRESHOLD = 3
+DEFAULT_RESET_TIMEOUT = 30.0
+
+# URLS name -> pattern matching the URLs built from its template
+_ENDPOINTS = [
+    (name, re.compile(re.sub(r"\\\{\w+\\\}", r"[^/?&]+", re.escape(template))))
+    for name, template in URLS.items()
+]
+
+@lru_cache(maxsize=1024)
+def endpoint(url: str) -> str:
+    """Returns the URLS name of the template a URL was built from,
+    or the URL without its query for URLs that are not in URLS."""
+    for name, pattern in _ENDPOINTS:
+        if pattern.fullmatch(url):
+            return name
+    return url.split("?", 1)[0]
+
+class CircuitBreaker:
+    """The circuit breaker of a single endpoint."""
+
+    def __init__(self,
+                 name: str,
+                 failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+                 reset_timeout: float = DEFAULT_RESET_TIMEOUT) -> None:
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self._opened_at: float | None = None
+        self._trial = False
+
+    @property
+    def state(self) -> BreakerState:
+        """The current state of the breaker."""
+        if self._opened_at is None:
+            return BreakerState.CLOSED
+        if self.retry_after > 0:
+            return BreakerState.OPEN
+        return BreakerState.HALF_OPEN
+
+    @property
+    def retry_after(self) -> float:
+        """Seconds until an open breaker lets a trial request through."""
+        if self._opened_at is None:
+            return 0
+        return max(0, self._opened_at + self.reset_timeout - time.monotonic())
+
+    def allow(self) -> bool:
+        """Returns True if a request may be sent, only one trial request is allowed
+        at a time while half open."""
+        state = self.state
+        if state == BreakerState.CLOSED:
+            return True
+        if state == BreakerState.HALF_OPEN and not self._trial:
+            self._trial = True
+            return True
+        return False
+
+    def record_success(self):
+        """Closes the breaker."""
+        self.failures = 0
+        self._opened_at = None
+        self._trial = False
+
+    def record_failure(self):
+        """Counts a failure, opening the breaker at the threshold or after a failed trial."""
+        self.failures += 1
+        if self._trial or self.failures >= self.failure_threshold:
+            self._opened_at = time.monotonic()
+        self._trial = False
+
+    def release(self):
+        """Gives up a trial request that ended without a result for the endpoint."""
+        self._trial = False
+
+class CircuitBreakers:
+    """The circuit breakers of a session, one per endpoint."""
+
+    def __init__(self,
+                 failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+                 reset_timeout: float = DEFAULT_RESET_TIMEOUT) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._breakers: dict[str, CircuitBreaker] = {}
+
+    def get(self, url: str) -> CircuitBreaker:
+        """Returns the breaker of the endpoint a URL belongs to."""
+        name = endpoint(url)
+        breaker = self._breakers.get(name)
+        if breaker is None:
+            breaker = CircuitBreaker(name, self.failure_threshold, self.reset_timeout)
+            self._breakers[name] = breaker
+        return breaker
+
+    def states(self) -> dict[str, BreakerState]:
+        """Returns the state of every breaker used so far."""
+        return {name: breaker.state for name, breaker in self._breakers.items()}
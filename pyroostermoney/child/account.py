@@ -0,0 +1,547 @@
+"""Defines some standard values for a Natwest Rooster Money child."""
+# pylint: disable=too-many-instance-attributes
+# pylint: disable=too-many-arguments
+# pylint: disable=too-many-public-methods
+import logging
+from collections.abc import Sequence
+from datetime import datetime, date, timedelta
+
+from pyroostermoney.const import URLS, CHILD_MAX_TRANSACTION_COUNT
+from pyroostermoney.bodies import transfer_body
+from pyroostermoney.api import RoosterSession
+from pyroostermoney.events import EventSource, EventType
+from pyroostermoney.enum import Weekdays, PotLedgerTypes
+from pyroostermoney.exceptions import ActionFailed, SESSION_ERRORS
+from pyroostermoney.schema import SCHEMAS
+from pyroostermoney.reconcile import PROFILE
+from pyroostermoney.profiling import span
+from pyroostermoney.diff import (
+    CHILD_FIELDS,
+    POT_FIELDS,
+    JOB_FIELDS,
+    STANDING_ORDER_FIELDS,
+    snapshot,
+    snapshot_collection,
+    snapshot_keys,
+    diff_snapshots,
+    diff_collections,
+    diff_lazy_collections
+)
+from .money_pot import Pot
+from .card import Card
+from .standing_order import StandingOrder
+from .jobs import Job, JobView
+from .transaction import Transaction, TransactionView, DECLINED_TRANSACTION_TYPE
+
+_LOGGER = logging.getLogger(__name__)
+
+# resources of a child in load order, mapped to the method that fetches them
+RESOURCES = {
+    "pots": "get_pocket_money",
+    "card": "get_card_details",
+    "standing_orders": "get_standing_orders",
+    "allowance_period": "get_active_allowance_period",
+    "jobs": "get_current_jobs",
+    "transactions": "get_spend_history"
+}
+
+RESOURCE_DEPENDENCIES = {
+    "jobs": ("allowance_period",)
+}
+
+# profile attribute -> (response key, converter)
+PROFILE_FIELDS = {
+    "interest_rate": ("interestRate", None),
+    "available_pocket_money": ("availablePocketMoney", None),
+    "currency": ("currency", None),
+    "first_name": ("firstName", None),
+    "surname": ("surname", None),
+    "gender": ("gender", lambda x: "male" if x == 1 else "female"),
+    "uses_real_money": ("realMoneyStatus", lambda x: x == 1),
+    "profile_image": ("profileImageUrl", None),
+    "allowance": ("locked", lambda x: not x),
+    "allowance_amount": ("pocketMoneyAmount", None),
+    "allowance_day": ("pocketMoneyDayRaw", lambda x: Weekdays(x+1)),
+    "allowance_last_paid": ("pocketMoneyLastPaid", None)
+}
+
+def _transaction_id(raw: dict):
+    """Returns the id of a raw transaction."""
+    return TransactionView.convert("transaction_id", raw)
+
+def _scheduled_job_id(raw: dict):
+    """Returns the scheduled job id of a raw job."""
+    return JobView.convert("scheduled_job_id", raw)
+
+class ChildAccount:
+    """The child account."""
+
+    def __init__(self, user_id: int,
+                 session: RoosterSession,
+                 exclude_card_pin = False,
+                 lazy = False) -> None:
+        self._exclude_card_pin = exclude_card_pin
+        self._lazy = lazy
+        self._session = session
+        self.user_id = user_id
+        self.interest_rate = None
+        self.available_pocket_money = None
+        self.currency = None
+        self.first_name = None
+        self.surname = None
+        self.gender = None
+        self.allowance = None
+        self.allowance_amount = None
+        self.allowance_day = None
+        self.allowance_last_paid = None
+        self.uses_real_money = -1
+        self.profile_image = ""
+        self.pots: list[Pot] = []
+        self.card: Card = None
+        self.standing_orders: list[StandingOrder] = []
+        self.jobs: Sequence[Job] = []
+        self.active_allowance_period_id: int = None
+        self.transactions: Sequence[Transaction] = []
+        self.declined_transactions: Sequence[Transaction] = []
+        self.latest_transaction: Transaction = None
+        self._hydrated: set[str] = set()
+        self._loaded: set[str] = set()
+        # resource -> last successful refresh, last error and when it failed
+        self.resource_status: dict[str, dict] = {}
+
+    def __eq__(self, obj):
+        if not isinstance(obj, ChildAccount):
+            return NotImplemented
+
+        return (self.available_pocket_money == obj.available_pocket_money
+        ) and (self.jobs == obj.jobs) and (self.pots == obj.pots) and (
+            self.active_allowance_period_id == obj.active_allowance_period_id
+        )
+
+    @classmethod
+    async def create(cls,
+                     user_id: int,
+                     session: RoosterSession,
+                     exclude_card_pin = True) -> 'ChildAccount':
+        """Inits and creates a child account object."""
+        self = cls(user_id, session, exclude_card_pin)
+        await self.update()
+        return self
+
+    @classmethod
+    def from_profile(cls,
+                     profile: dict,
+                     session: RoosterSession,
+                     exclude_card_pin = True) -> 'ChildAccount':
+        """Creates a lazily hydrated child from a child profile (such as account_info children).
+        No requests are made, resources are fetched with ensure_loaded or hydrate."""
+        self = cls(profile.get("userId"), session, exclude_card_pin, lazy=True)
+        self._parse_response(profile, partial=True)
+        return self
+
+    async def update(self) -> dict[str, Exception]:
+        """Updates the cached data for this child.
+        Lazy children only refresh the resources that have already been loaded.
+        Each resource is refreshed on its own, a resource that fails keeps its last good
+        data and the errors are returned by resource. Session errors are raised."""
+        _LOGGER.debug("Update ChildAccount")
+        errors = {}
+        p_profile = snapshot(self, CHILD_FIELDS)
+        try:
+            await self._load_profile()
+        except SESSION_ERRORS:
+            raise
+        except Exception as exc: # pylint: disable=broad-exception-caught
+            errors[PROFILE] = exc
+        for resource in RESOURCES:
+            if self._lazy and resource not in self._loaded:
+                continue
+            failed = [x for x in RESOURCE_DEPENDENCIES.get(resource, ()) if x in errors]
+            if len(failed) > 0:
+                errors[resource] = LookupError(f"Not refreshed, {failed[0]} failed")
+                self._record(resource, errors[resource])
+                continue
+            try:
+                await self.load_resource(resource)
+            except SESSION_ERRORS:
+                raise
+            except Exception as exc: # pylint: disable=broad-exception-caught
+                errors[resource] = exc
+        for resource, error in errors.items():
+            _LOGGER.warning("Unable to refresh %s of child %s: %s", resource, self.user_id, error)
+        self._fire_changes(EventSource.CHILD, "profile",
+                           diff_snapshots(p_profile, snapshot(self, CHILD_FIELDS)))
+        return errors
+
+    async def refresh_profile(self):
+        """Refreshes only the child profile."""
+        self._session.reconciler.discard(self.user_id, PROFILE)
+        p_profile = snapshot(self, CHILD_FIELDS)
+        await self._load_profile()
+        self._fire_changes(EventSource.CHILD, "profile",
+                           diff_snapshots(p_profile, snapshot(self, CHILD_FIELDS)))
+
+    async def _load_profile(self):
+        """Fetches the child profile."""
+        with span(PROFILE):
+            try:
+                self._parse_response(await self._session.request_handler(
+                    url=URLS.get("get_child").format(user_id=self.user_id)))
+            except Exception as exc:
+                self._record(PROFILE, exc)
+                raise
+        self._record(PROFILE)
+
+    async def load_resource(self, resource: str):
+        """Fetches (or refreshes) a single resource."""
+        self._session.reconciler.discard(self.user_id, resource)
+        with span(resource):
+            try:
+                await getattr(self, RESOURCES[resource])()
+            except Exception as exc:
+                self._record(resource, exc)
+                raise
+        self._loaded.add(resource)
+        self._record(resource)
+
+    def _record(self, resource: str, error: Exception | None = None):
+        """Records the outcome of a refresh of a resource."""
+        status = self.resource_status.setdefault(resource,
+                                                 {"updated": None, "error": None, "failed": None})
+        if error is None:
+            status["updated"] = datetime.now()
+            status["error"] = None
+        else:
+            status["error"] = error
+            status["failed"] = datetime.now()
+
+    def is_stale(self, resource: str) -> bool:
+        """Returns True if the last refresh of a resource failed."""
+        return self.resource_status.get(resource, {}).get("error") is not None
+
+    def is_loaded(self, resource: str) -> bool:
+        """Returns True if the resource has been fetched."""
+        return resource in self._loaded
+
+    async def ensure_loaded(self, *resources: str) -> 'ChildAccount':
+        """Fetches the given resources (and what they depend on) if not already loaded.
+        Usage: await child.ensure_loaded("pots", "jobs"); child.pots"""
+        for resource in resources:
+            if resource not in RESOURCES:
+                raise KeyError(f"Unknown resource {resource}")
+            for dependency in RESOURCE_DEPENDENCIES.get(resource, ()):
+                if dependency not in self._loaded:
+                    await self.load_resource(dependency)
+            if resource not in self._loaded:
+                await self.load_resource(resource)
+        return self
+
+    async def hydrate(self) -> 'ChildAccount':
+        """Fetches every resource not already loaded."""
+        return await self.ensure_loaded(*RESOURCES)
+
+    def _fire_changes(self, source: EventSource, resource: str, changes: dict, **metadata):
+        """Fires an update event carrying the field level changes of a resource.
+        Nothing is fired the first time a resource is loaded."""
+        if resource in self._hydrated and len(changes) > 0:
+            self._session.events.fire_event(source, EventType.UPDATED, {
+                "user_id": self.user_id,
+                "resource": resource,
+                "changes": changes,
+                **metadata
+            })
+        self._hydrated.add(resource)
+
+    def _parse_response(self, raw_response:dict, partial: bool = False):
+        """Parses the raw_response into this object.
+        If partial is set, fields missing from the response are left untouched."""
+        if "response" in raw_response:
+            raw_response = raw_response["response"]
+        for field, (key, converter) in PROFILE_FIELDS.items():
+            if partial and key not in raw_response:
+                continue
+            value = raw_response[key]
+            if converter is not None:
+                value = converter(value) # pylint: disable=not-callable
+            setattr(self, field, value)
+
+    async def get_active_allowance_period(self):
+        """Returns the current active allowance period."""
+        allowance_periods = await self._session.request_handler(
+            url=URLS.get("get_child_allowance_periods").format(user_id=self.user_id))
+        allowance_periods = allowance_periods["response"]
+        search_date = datetime.now()
+        while True:
+            active_periods = [p for p in allowance_periods
+                            if datetime.strptime(p["startDate"], "%Y-%m-%d").date() <=
+                            search_date.date() <=
+                            datetime.strptime(p["endDate"], "%Y-%m-%d").date()]
+            if len(allowance_periods) > 1:
+                if len(active_periods) != 1 and search_date.date() < date.today():
+                    raise LookupError("No allowance period found")
+                # run again but minus 7 days to address pyroostermoney/17
+                if len(active_periods) != 1:
+                    search_date = search_date - timedelta(days=7)
+                else:
+                    break
+            else:
+                return None
+
+        active_periods = active_periods[0]
+        self.active_allowance_period_id = int(active_periods.get("allowancePeriodId"))
+
+        return active_periods
+
+    async def _update_spend_history(self, count=10):
+        """Internal update handler for the spend history"""
+        url = URLS.get("get_child_spend_history").format(
+            user_id=self.user_id,
+            count=count
+        )
+        response = await self._session.request_handler(
+            url=url, schema=SCHEMAS["get_child_spend_history"])
+        p_transactions = self.transaction_keys()
+        # declined transaction should be ignored as it did not complete
+        # therefore it doesn't count towards the "spend history"
+        self.declined_transactions = Transaction.parse_response(
+            [x for x in response["response"] if x.get("type") == DECLINED_TRANSACTION_TYPE])
+        self.transactions = Transaction.parse_response(
+            [x for x in response["response"] if x.get("type") != DECLINED_TRANSACTION_TYPE])
+        p_transaction = self.latest_transaction
+        self.latest_transaction = self.transactions[-1] if len(self.transactions) > 0 else None
+        if (p_transaction is not None and self.latest_transaction is not None
+            and self.latest_transaction.transaction_id != p_transaction.transaction_id):
+            changes = diff_collections(p_transactions, self.transaction_keys())
+            self._session.events.fire_event(EventSource.TRANSACTIONS, EventType.UPDATED, {
+                "user_id": self.user_id,
+                "old_transaction_id": p_transaction.transaction_id,
+                "new_transaction_id": self.latest_transaction.transaction_id,
+                "declined": self.latest_transaction.declined,
+                "declined_reason": self.latest_transaction.declined_reason,
+                "changes": changes
+            })
+
+    def transaction_keys(self) -> dict:
+        """Returns the ids of the completed and declined transactions as a snapshot
+        collection, read from the raw payloads."""
+        return {**snapshot_keys(self.transactions, "transaction_id", _transaction_id),
+                **snapshot_keys(self.declined_transactions, "transaction_id", _transaction_id)}
+
+    async def get_spend_history(self, count=10) -> Sequence[Transaction]:
+        """Gets the spend history"""
+        await self._update_spend_history(count)
+        required = count
+        # increase count dynamically to ignore declines
+        while len(self.transactions) < required:
+            _LOGGER.debug("ChildAccount get_spend_history returned only %s events",
+                          len(self.transactions))
+            count += 1
+            await self._update_spend_history(count)
+            if count == CHILD_MAX_TRANSACTION_COUNT:
+                break
+
+        return self.transactions
+
+    async def get_current_jobs(self) -> Sequence[Job]:
+        """Gets jobs for the current allowance period."""
+        p_jobs = self.jobs
+        self.jobs = await self.get_allowance_period_jobs(self.active_allowance_period_id)
+        self._fire_changes(EventSource.JOBS, "jobs", diff_lazy_collections(
+            p_jobs, self.jobs, "scheduled_job_id",
+            _scheduled_job_id, JOB_FIELDS),
+                           job_length=[len(self.jobs)])
+        return self.jobs
+
+    async def get_allowance_period_jobs(self, allowance_period_id):
+        """Gets jobs for a given allowance period"""
+        url = URLS.get("get_child_allowance_period_jobs").format(
+            user_id=self.user_id,
+            allowance_period_id=allowance_period_id
+        )
+        response = await self._session.request_handler(
+            url, schema=SCHEMAS["get_child_allowance_period_jobs"])
+
+        return Job.convert_response(response, self._session)
+
+    async def get_pocket_money(self):
+        """Gets pocket money"""
+        url = URLS.get("get_child_pocket_money").format(
+            user_id=self.user_id
+        )
+        response = await self._session.request_handler(
+            url, schema=SCHEMAS["get_child_pocket_money"])
+        p_pots = snapshot_collection(self.pots, "pot_id", POT_FIELDS)
+        self.pots: list[Pot] = Pot.convert_response(response["response"], self._session, self)
+        self._fire_changes(EventSource.CHILD, "pots", diff_collections(
+            p_pots, snapshot_collection(self.pots, "pot_id", POT_FIELDS)))
+
+        return self.pots
+
+    async def special_get_pocket_money(self):
+        """Same as get_pocket_money yet parses the response and provides a basic dict."""
+        pocket_money = await self.get_pocket_money()
+
+        return {
+            "total": pocket_money["walletTotal"],
+            "available": pocket_money["availablePocketMoney"],
+            "spend": pocket_money["pocketMoneyAmount"],
+            "save": pocket_money["safeTotal"],
+            "give": pocket_money["giveAmount"]
+        }
+
+    async def get_card_details(self):
+        """Returns the card details for the child."""
+        if self.card is not None:
+            await self.card.update() # Only run the updater if already set
+            return self.card
+
+        card_details = await self._session.request_handler(
+            URLS.get("get_child_card_details").format(
+                user_id=self.user_id
+            )
+        )
+
+        self.card = Card.parse_response(card_details["response"], self.user_id, self._session)
+        if self._exclude_card_pin is True:
+            return self.card
+
+        await self.card.init_card_pin()
+        return self.card
+
+    async def get_standing_orders(self) -> list[StandingOrder]:
+        """Returns a list of standing orders for the child."""
+        standing_orders = await self._session.request_handler(
+            URLS.get("get_child_standing_orders").format(
+                user_id=self.user_id
+            )
+        )
+        p_standing_orders = self.standing_orders
+        p_snapshot = snapshot_collection(p_standing_orders, "regular_id", STANDING_ORDER_FIELDS)
+        self.standing_orders = StandingOrder.convert_response(standing_orders)
+        self._fire_changes(EventSource.STANDING_ORDER, "standing_orders", diff_collections(
+            p_snapshot,
+            snapshot_collection(self.standing_orders, "regular_id", STANDING_ORDER_FIELDS)),
+            new_regular_id=(self.standing_orders[len(self.standing_orders)-1].regular_id
+                            if len(self.standing_orders) > 0 else None),
+            old_regular_id=(p_standing_orders[len(p_standing_orders)-1].regular_id
+                            if len(p_standing_orders) > 0 else None))
+
+        return self.standing_orders
+
+    async def create_standing_order(self, standing_order: StandingOrder, refresh: bool = True):
+        """Create a standing order.
+        If refresh is set, the standing orders are fetched again afterwards."""
+        output = await self._session.request_handler(
+            URLS.get("create_child_standing_order").format(
+                user_id=self.user_id
+            ),
+            standing_order.__dict__(),
+            method="POST"
+        )
+
+        if refresh:
+            await self.get_standing_orders()
+
+        return bool(output.get("status") == 200)
+
+    async def delete_standing_order(self, standing_order: StandingOrder, refresh: bool = True):
+        """Delete a standing order.
+        If refresh is set, the standing orders are fetched again afterwards."""
+        output = await self._session.request_handler(
+            URLS.get("delete_child_standing_order").format(
+                user_id=self.user_id,
+                standing_order_id=standing_order.regular_id
+            ),
+            method="DELETE"
+        )
+
+        if refresh:
+            await self.get_standing_orders()
+
+        return bool(output.get("status") == 200)
+
+    async def update_allowance(self,
+                               paused: bool = False,
+                               amount: float = 0.0,
+                               refresh: bool = True):
+        """Updates the allowance for the child.
+        If refresh is set, the child profile is fetched again afterwards."""
+        data = {
+            "locked": paused,
+            "pocketMoneyAmount": amount if amount != 0.0 else self.allowance_amount,
+            "stripData": True,
+            "userId": self.user_id
+        }
+
+        await self._session.request_handler(URLS.get("get_child").format(user_id=self.user_id),
+                                            body=data,
+                                            method="PUT")
+        if refresh:
+            await self.refresh_profile()
+
+    async def pot_money_transfer(
+            self,
+            source: PotLedgerTypes,
+            destination: PotLedgerTypes,
+            amount: float,
+            to_custom_pot_id: str | None = None,
+            from_custom_pot_id: str | None = None,
+            refresh: bool = True):
+        """Transfers money between two pots.
+        Much like pot money management, the amount is in GBP, so passing 1.5 will move £1.50.
+        The pots are updated straight away and, if refresh is set, refetched in the
+        background to confirm the transfer.
+        """
+        # handle custom pots
+        if source == PotLedgerTypes.CUSTOM and from_custom_pot_id is None:
+            raise ValueError("Missing argument for 'from_custom_pot_id")
+        if destination == PotLedgerTypes.CUSTOM and to_custom_pot_id is None:
+            raise ValueError("Missing argument for 'to_custom_pot_id")
+        body = transfer_body(
+            user_id=self.user_id,
+            family_id=self._session.family_id,
+            source=str(source),
+            destination=str(destination),
+            amount=amount,
+            to_custom_pot_id=to_custom_pot_id if destination == PotLedgerTypes.CUSTOM else None,
+            from_custom_pot_id=from_custom_pot_id if source == PotLedgerTypes.CUSTOM else None)
+
+        response = await self._session.request_handler(
+            URLS.get("pot_money_transfer").format(
+                family_id=self._session.family_id,
+                user_id=self.user_id
+            ),
+            body=body,
+            method="PUT"
+        )
+        if response["status"] != 200:
+            raise ActionFailed("HTTP Response Error", response)
+        self._apply_transfer(source, destination, amount, to_custom_pot_id, from_custom_pot_id,
+                             refresh)
+
+    def _find_pot(self, ledger_type: PotLedgerTypes, custom_pot_id: str | None) -> Pot | None:
+        """Returns the pot of a ledger type (and custom pot ID)."""
+        for pot in self.pots:
+            if pot.ledger_type == ledger_type and (
+                ledger_type != PotLedgerTypes.CUSTOM or pot.pot_id == custom_pot_id):
+                return pot
+        return None
+
+    def _apply_transfer(self,
+                        source: PotLedgerTypes,
+                        destination: PotLedgerTypes,
+                        amount: float,
+                        to_custom_pot_id: str | None,
+                        from_custom_pot_id: str | None,
+                        schedule: bool):
+        """Optimistically moves the amount between the local pots."""
+        p_pots = snapshot_collection(self.pots, "pot_id", POT_FIELDS)
+        source_pot = self._find_pot(source, from_custom_pot_id)
+        destination_pot = self._find_pot(destination, to_custom_pot_id)
+        if source_pot is not None:
+            source_pot.value = round(source_pot.value - amount, 2)
+        if destination_pot is not None:
+            destination_pot.value = round(destination_pot.value + amount, 2)
+        changes = diff_collections(p_pots, snapshot_collection(self.pots, "pot_id", POT_FIELDS))
+        self._session.reconciler.apply(EventSource.CHILD, self.user_id, "pots", changes,
+                                       schedule=schedule)
@@ -5,10 +5,32 @@
 from pyroostermoney.api import RoosterSession
 from pyroostermoney.const import URLS
 from pyroostermoney.events import EventSource, EventType
+from pyroostermoney.diff import CARD_FIELDS, snapshot, diff_snapshots
+from pyroostermoney.exceptions import ActionFailed
 
 class Card:
     """A card."""
 
+    __slots__ = (
+        "masked_card_number",
+        "expiry_date",
+        "name",
+        "image",
+        "title",
+        "description",
+        "category",
+        "status",
+        "user_id",
+        "pin",
+        "card_id",
+        "contactless_limit",
+        "contactless_count",
+        "spend_limit",
+        "total_spend",
+        "_card_options",
+        "_session"
+    )
+
     def __init__(self,
                  masked_card_number: str,
                  expiry_date: str,
@@ -57,19 +79,34 @@ class Card:
         response: dict = response["response"]
         self.pin = response.get("pin", None)
 
-    async def update_family_card_entry(self):
-        """Requests an update for the internal card entry"""
+    async def update(self):
+        """Refreshes the card status from the card details, and the family card entry."""
+        response = await self._session.request_handler(
+            url=URLS.get("get_child_card_details").format(user_id=self.user_id)
+        )
+        if response["status"] != 200:
+            raise ActionFailed(response["status"])
+        p_card = snapshot(self, CARD_FIELDS)
+        self.status = response["response"]["status"]
+        await self.update_family_card_entry(p_card)
+
+    async def update_family_card_entry(self, p_card: dict | None = None):
+        """Requests an update for the internal card entry.
+        p_card is the snapshot to report changes against, taken now if not set."""
         response = await self._session.request_handler(
             url=URLS.get("get_family_account_cards")
         )
 
-        if response["status"] == 200:
-            # get the card for the current user_id
-            for card in response["response"]:
-                if card["childId"] == self.user_id:
-                    response = card
-                    break
+        if response["status"] != 200:
+            raise ActionFailed(response["status"])
+        # get the card for the current user_id
+        response = next((card for card in response["response"]
+                         if card.get("childId") == self.user_id), None)
+        if response is None:
+            raise LookupError(f"No family card entry found for child {self.user_id}")
 
+        if p_card is None:
+            p_card = snapshot(self, CARD_FIELDS)
         self._card_options = response
         self.card_id = response.get("cardId", None)
         self.contactless_limit = response.get("sca", {}).get("countLimit", 5)
@@ -86,21 +123,37 @@ class Card:
                 "card_event": "CONTACTLESS_LIMIT"
             })
 
+        changes = diff_snapshots(p_card, snapshot(self, CARD_FIELDS))
+        if previous_count is not None and len(changes) > 0:
+            self._session.events.fire_event(EventSource.CARD, EventType.UPDATED, {
+                "card_id": self.card_id,
+                "user_id": self.user_id,
+                "resource": "card",
+                "changes": changes
+            })
+
     async def set_card_status(self, active: bool=True):
-        """Freezes/Unfreezes the current card."""
+        """Freezes/Unfreezes the current card.
+        The status is updated straight away and the card reconciled in the background."""
         body = {
             "cardStatus": "active" if active else "lost",
             "reason": "Unfreeze card" if active else "Freeze card"
         }
 
-        await self._session.request_handler(
+        response = await self._session.request_handler(
             url=URLS.get("freeze_child_card").format(
                 user_id=self.user_id,
                 card_id=self.card_id
             ),
             body=body,
             method="POST")
-        await self.update_family_card_entry()
+        if not 200 <= response["status"] < 300:
+            raise ActionFailed("HTTP Response Error", response)
+        p_card = snapshot(self, CARD_FIELDS)
+        self.status = body["cardStatus"].upper()
+        self._session.reconciler.apply(EventSource.CARD, self.user_id, "card",
+                                       diff_snapshots(p_card, snapshot(self, CARD_FIELDS)),
+                                       card_id=self.card_id)
 
     @staticmethod
     def parse_response(raw: dict, user_id: str, session: RoosterSession) -> 'Card':
@@ -6,6 +6,10 @@ from datetime import datetime
 
 from pyroostermoney.api import RoosterSession
 from pyroostermoney.const import CURRENCY, URLS
+from pyroostermoney.lazy import LazyView, LazySequence
+from pyroostermoney.exceptions import ActionFailed
+from pyroostermoney.events import EventSource
+from pyroostermoney.diff import diff_collections
 from pyroostermoney.enum import (
     JobActions,
     JobScheduleTypes,
@@ -17,6 +21,30 @@ from pyroostermoney.enum import (
 class Job:
     """A job."""
 
+    __slots__ = (
+        "allowance_period_id",
+        "currency",
+        "description",
+        "due_any_day",
+        "due_date",
+        "expiry_processed",
+        "final_reward_amount",
+        "image_url",
+        "locked",
+        "master_job_id",
+        "reopened",
+        "reward_amount",
+        "scheduled_job_id",
+        "state",
+        "time_of_day",
+        "weekdays",
+        "schedule_type",
+        "title",
+        "type",
+        "user_id_list",
+        "_session"
+    )
+
     def __init__(self,
                  allowance_period_id,
                  currency,
@@ -67,75 +95,31 @@ class Job:
     @staticmethod
     def from_dict(obj: dict, session) -> 'Job':
         """Converts to a job from a dict."""
-        if "scheduleInfo" in obj:
-            # Move nested scheduleInfo into main
-            for info in obj.get("scheduleInfo").keys():
-                if info == "type":
-                    info = "scheduleType"
-                obj[info] = obj.get("scheduleInfo").get(info)
-            obj["scheduleInfo"] = None
-        if "dueDate" in obj:
-            _due_date = datetime.strptime(obj.get("dueDate"), "%Y-%m-%d")
-        else:
-            _due_date = None
-
-        # parse weekdays
-        raw_weekdays = obj.get("daysOfTheWeek", None)
-        weekdays=raw_weekdays
-        if raw_weekdays is not None:
-            weekdays=[]
-            for day in raw_weekdays:
-                weekdays.append(Weekdays(day))
-
-        # handle master job list correctly
-        if not bool(obj.get("dueAnyDay", False)) and int(obj.get("scheduledJobId", 0)) == 0:
-            obj["scheduleType"] = JobScheduleTypes.REPEATING
-        if bool(obj.get("dueAnyDay", False)) and int(obj.get("scheduledJobId", 0)) == 0:
-            obj["scheduleType"] = JobScheduleTypes.ANYTIME
-
-        return Job(
-            allowance_period_id=int(obj.get("allowancePeriodId", -1)),
-            currency=str(obj.get("currency", CURRENCY)),
-            description=str(obj.get("description", "")),
-            due_any_day=bool(obj.get("dueAnyDay", False)),
-            due_date=_due_date,
-            expiry_processed=bool(obj.get("expiryProcessed", False)),
-            final_reward_amount=float(obj.get("finalRewardAmount", 0)),
-            image_url=str(obj.get("imageUrl", "")),
-            locked=bool(obj.get("locked", False)),
-            master_job_id=int(obj.get("masterJobId", 0)),
-            reopened=bool(obj.get("reopened", False)),
-            reward_amount=float(obj.get("rewardAmount", 0)),
-            scheduled_job_id=int(obj.get("scheduledJobId", 0)),
-            state=JobState(obj.get("state", 0)),
-            time_of_day=int(obj.get("timeOfDay", 0)),
-            title=str(obj.get("title", "")),
-            job_type=int(obj.get("type", 0)),
-            session=session,
-            user_id_list=obj.get("childUserIds", None),
-            schedule_type=obj.get("scheduleType"),
-            weekday=weekdays
-        )
+        return JobView(obj, session).resolve()
 
     @staticmethod
-    def convert_response(raw_response: dict, session: RoosterSession) -> list['Job']:
-        """Converts a raw response."""
+    def convert_response(raw_response: dict, session: RoosterSession) -> LazySequence:
+        """Converts a raw response.
+        Jobs are only built, and their fields only converted, when accessed."""
         if "response" in raw_response:
             raw_response=raw_response["response"]
 
-        output: list[Job] = []
-
-        for state in raw_response:
-            for job in raw_response.get(state, []):
-                output.append(Job.from_dict(job, session))
-        return sorted(output, key=lambda job: (job.due_date, job.time_of_day), reverse=True)
+        raw_jobs = [job for state in raw_response for job in raw_response.get(state, [])]
+        # ISO dates sort the same as the parsed dates
+        raw_jobs.sort(key=lambda job: (_value(job, "dueDate") or "",
+                                       int(_value(job, "timeOfDay", 0))),
+                      reverse=True)
+        return LazySequence(raw_jobs, lambda job: JobView(job, session))
 
     async def job_action(self, action: JobActions, message: str = ""):
-        """Performs the given action on a scheduled job."""
+        """Performs the given action on a scheduled job.
+        Raises ActionFailed if the action is not accepted. An approved job is marked
+        as approved straight away and the jobs and pots of its child are reconciled
+        in the background."""
         if self.scheduled_job_id is None:
             raise NotImplementedError("This function is only available on scheduled jobs.")
 
-        await self._session.request_handler(
+        response = await self._session.request_handler(
             url=URLS.get("scheduled_job_action").format(
                 schedule_id=self.scheduled_job_id,
                 action=str(action)
@@ -145,3 +129,89 @@ class Job:
             },
             method="POST"
         )
+        if not 200 <= response["status"] < 300:
+            raise ActionFailed("HTTP Response Error", response)
+        if action == JobActions.APPROVE:
+            reconciler = self._session.reconciler
+            user_id = reconciler.job_owner(self.scheduled_job_id)
+            old = self.state
+            self.state = JobState.APPROVED
+            reconciler.apply(EventSource.JOBS, user_id, "jobs", diff_collections(
+                {self.scheduled_job_id: {"state": old}},
+                {self.scheduled_job_id: {"state": self.state}}))
+            reconciler.schedule(user_id, "pots")
+        return response
+
+
+def _value(obj: dict, key: str, default=None):
+    """Reads a value from a job dict, preferring the nested scheduleInfo."""
+    schedule_info = obj.get("scheduleInfo")
+    if schedule_info is not None and key != "type" and key in schedule_info:
+        return schedule_info[key]
+    return obj.get(key, default)
+
+def _parse_due_date(obj: dict) -> datetime | None:
+    """Parses the due date of a job dict."""
+    due_date = _value(obj, "dueDate")
+    if due_date is None:
+        return None
+    return datetime.strptime(due_date, "%Y-%m-%d")
+
+def _parse_weekdays(obj: dict) -> list[Weekdays] | None:
+    """Parses the weekdays of a job dict."""
+    raw_weekdays = _value(obj, "daysOfTheWeek")
+    if raw_weekdays is None:
+        return None
+    return [Weekdays(day) for day in raw_weekdays]
+
+def _parse_schedule_type(obj: dict) -> JobScheduleTypes:
+    """Parses the schedule type of a job dict."""
+    # handle master job list correctly
+    if int(_value(obj, "scheduledJobId", 0)) == 0:
+        if bool(_value(obj, "dueAnyDay", False)):
+            return JobScheduleTypes.ANYTIME
+        return JobScheduleTypes.REPEATING
+    schedule_type = _value(obj, "scheduleType")
+    if schedule_type is None:
+        return JobScheduleTypes.UNKNOWN
+    return JobScheduleTypes(schedule_type)
+
+def _parse_user_id_list(obj: dict) -> list:
+    """Parses the child user IDs of a master job dict."""
+    user_id_list = _value(obj, "childUserIds")
+    if user_id_list is None:
+        raise AttributeError("user_id_list")
+    return user_id_list
+
+class JobView(LazyView, Job):
+    """A job that converts its fields from the raw response on first access."""
+
+    __slots__ = ("_raw",)
+
+    _converters = {
+        "allowance_period_id": lambda obj: int(_value(obj, "allowancePeriodId", -1)),
+        "currency": lambda obj: str(_value(obj, "currency", CURRENCY)),
+        "description": lambda obj: str(_value(obj, "description", "")),
+        "due_any_day": lambda obj: bool(_value(obj, "dueAnyDay", False)),
+        "due_date": _parse_due_date,
+        "expiry_processed": lambda obj: bool(_value(obj, "expiryProcessed", False)),
+        "final_reward_amount": lambda obj: float(_value(obj, "finalRewardAmount", 0)),
+        "image_url": lambda obj: str(_value(obj, "imageUrl", "")),
+        "locked": lambda obj: bool(_value(obj, "locked", False)),
+        "master_job_id": lambda obj: int(_value(obj, "masterJobId", 0)),
+        "reopened": lambda obj: bool(_value(obj, "reopened", False)),
+        "reward_amount": lambda obj: float(_value(obj, "rewardAmount", 0)),
+        "scheduled_job_id": lambda obj: int(_value(obj, "scheduledJobId", 0)),
+        "state": lambda obj: JobState(_value(obj, "state", 0)),
+        "time_of_day": lambda obj: JobTime(int(_value(obj, "timeOfDay", 0))),
+        "weekdays": _parse_weekdays,
+        "schedule_type": _parse_schedule_type,
+        "title": lambda obj: str(_value(obj, "title", "")),
+        "type": lambda obj: int(_value(obj, "type", 0)),
+        "user_id_list": _parse_user_id_list
+    }
+
+    # pylint: disable=super-init-not-called
+    def __init__(self, raw: dict, session: RoosterSession) -> None:
+        self._raw = raw
+        self._session = session
@@ -9,20 +9,34 @@ from pyroostermoney.const import (
     SAVINGS_POT_ID,
     GIVE_POT_ID,
     GOAL_POT_ID,
-    BOOST_BODY,
     URLS)
 from pyroostermoney.enum import (
     EventSource,
-    EventType,
     PotMoneyActions,
     PotLedgerTypes
 )
 from pyroostermoney.exceptions import NotEnoughFunds, ActionFailed
 from pyroostermoney.api import RoosterSession
+from pyroostermoney.diff import diff_collections
+from pyroostermoney.bodies import boost_body
 
 class Pot:
     """A money pot."""
 
+    __slots__ = (
+        "name",
+        "ledger",
+        "pot_id",
+        "image",
+        "enabled",
+        "value",
+        "target",
+        "last_updated",
+        "ledger_type",
+        "_session",
+        "_user_id"
+    )
+
     def __init__(self,
                  name: str,
                  ledger: dict | None,
@@ -47,6 +61,11 @@ class Pot:
         self._user_id = child.user_id
         self.ledger_type = ledger_type
 
+    @property
+    def user_id(self) -> int:
+        """The user ID of the child owning the pot."""
+        return self._user_id
+
     async def add_to_pot(self, value: float, reason: str = "") -> None:
         """Add money to the pot.
         Value is in GBP, so providing 1.5 will add £1.50 (or 150p)
@@ -54,7 +73,6 @@ class Pot:
         if value > self._session.family_balance:
             raise NotEnoughFunds("family account")
         await self._pot_money_action(PotMoneyActions.BOOST, value, reason)
-        self.value += value
 
     async def remove_from_pot(self, value: float, reason: str = "") -> None:
         """Remove money from the pot.
@@ -63,16 +81,14 @@ class Pot:
         if value > self.value:
             raise NotEnoughFunds(self.pot_id)
         await self._pot_money_action(PotMoneyActions.REMOVE, value, reason)
-        self.value -= value
 
     async def _pot_money_action(self,
                                 action: PotMoneyActions,
                                 value: float,
                                 reason: str = "") -> None:
-        """Internal pot money action handler."""
-        body = BOOST_BODY
-        body["amount"]["amount"] = int(value*100)
-        body["reason"] = reason
+        """Internal pot money action handler.
+        The pot value and family balance are updated straight away and reconciled
+        in the background."""
         response = await self._session.request_handler(
             URLS.get("pot_money_action").format(
                 user_id=self._user_id,
@@ -80,16 +96,20 @@ class Pot:
                 family_id=self._session.family_id,
                 action=action
             ),
-            body=body,
+            body=boost_body(value, reason),
             method="PUT"
         )
-        if response["status"] == 200:
-            self._session.events.fire_event(EventSource.CHILD, EventType.UPDATED, {
-                "pot": self.pot_id,
-                "reason": reason
-            })
-        else:
+        if response["status"] != 200:
             raise ActionFailed("HTTP Response Error", response)
+        delta = value if action == PotMoneyActions.BOOST else -value
+        old = self.value
+        self.value = round(self.value + delta, 2)
+        self._session.reconciler.apply(EventSource.CHILD, self._user_id, "pots",
+                                       diff_collections({self.pot_id: {"value": old}},
+                                                        {self.pot_id: {"value": self.value}}),
+                                       pot=self.pot_id,
+                                       reason=reason)
+        self._session.adjust_family_balance(-delta)
 
     @staticmethod
     def convert_response(raw: dict, session: RoosterSession, child) -> list['Pot']:
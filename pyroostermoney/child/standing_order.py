@@ -4,6 +4,8 @@
 class StandingOrder:
     """A standing order."""
 
+    __slots__ = ("amount", "day", "frequency", "regular_id", "active", "tag", "title")
+
     def __init__(self,
                  amount: float,
                  day: str,
@@ -5,11 +5,32 @@
 from datetime import datetime
 
 from pyroostermoney.const import CURRENCY
+from pyroostermoney.lazy import LazyView, LazySequence
 
+DECLINED_TRANSACTION_TYPE = "CARD_DECLINE"
 
 class Transaction:
     """Defines a single transaction."""
 
+    __slots__ = (
+        "action_user",
+        "amount",
+        "new_balance",
+        "description",
+        "extended_description",
+        "guardian_profile_image",
+        "transaction_id",
+        "message",
+        "resource_image",
+        "transaction_timestamp",
+        "source",
+        "transaction_type",
+        "user_id",
+        "currency",
+        "declined",
+        "declined_reason"
+    )
+
     def __init__(self,
                  action_user: int,
                  amount: float,
@@ -39,7 +60,7 @@ class Transaction:
         self.transaction_type = transaction_type
         self.user_id = user_id
         self.currency = currency
-        self.declined = self.transaction_type == "CARD_DECLINE"
+        self.declined = self.transaction_type == DECLINED_TRANSACTION_TYPE
         self.declined_reason = []
 
     @staticmethod
@@ -67,9 +88,37 @@ class Transaction:
         return transaction
 
     @staticmethod
-    def parse_response(obj: list) -> list['Transaction']:
-        """Parses the raw response"""
-        output = []
-        for action in obj:
-            output.append(Transaction.from_dict(action))
-        return output
+    def parse_response(obj: list) -> LazySequence:
+        """Parses the raw response.
+        Items are only built, and their fields only converted, when accessed."""
+        return LazySequence(obj, TransactionView)
+
+class TransactionView(LazyView, Transaction):
+    """A transaction that converts its fields from the raw response on first access."""
+
+    __slots__ = ("_raw",)
+
+    _converters = {
+        "action_user": lambda raw: raw.get("actionUserId"),
+        "amount": lambda raw: raw.get("amount"),
+        "new_balance": lambda raw: raw.get("balance"),
+        "currency": lambda raw: raw.get("currency"),
+        "description": lambda raw: raw.get("description"),
+        "extended_description": lambda raw: raw.get("descriptionExtension"),
+        "guardian_profile_image": lambda raw: raw.get("guardianProfileImage"),
+        "transaction_id": lambda raw: raw.get("id"),
+        "message": lambda raw: raw.get("message"),
+        "resource_image": lambda raw: raw.get("resourceImageURL"),
+        "transaction_timestamp": lambda raw: raw.get("time"),
+        "source": lambda raw: raw.get("transactionSource"),
+        "transaction_type": lambda raw: raw.get("type"),
+        "user_id": lambda raw: raw.get("userId"),
+        "declined": lambda raw: raw.get("type") == DECLINED_TRANSACTION_TYPE,
+        "declined_reason": lambda raw: (raw.get("declines")
+                                        if raw.get("type") == DECLINED_TRANSACTION_TYPE
+                                        else [])
+    }
+
+    # pylint: disable=super-init-not-called
+    def __init__(self, raw: dict) -> None:
+        self._raw = raw
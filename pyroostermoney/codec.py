@@ -0,0 +1,87 @@
+"""Pluggable JSON codecs for the transport.
+
+The fastest installed decoder is used by default: msgspec, then orjson,
+then the standard library json module. Only the msgspec codec supports
+typed schema decoding, the other codecs ignore the schema argument.
+"""
+# pylint: disable=import-outside-toplevel
+# pylint: disable=no-member
+import json
+import logging
+from typing import Any
+
+_LOGGER = logging.getLogger(__name__)
+
+class JsonCodec:
+    """Standard library JSON codec."""
+
+    name = "json"
+
+    def decode(self, data: bytes, schema: Any = None) -> Any:
+        """Decodes raw response bytes."""
+        # pylint: disable=unused-argument
+        return json.loads(data)
+
+    def encode(self, obj: Any) -> bytes:
+        """Encodes a request body."""
+        return json.dumps(obj).encode("utf-8")
+
+class OrjsonCodec(JsonCodec):
+    """orjson codec."""
+
+    name = "orjson"
+
+    def __init__(self) -> None:
+        import orjson
+        self._orjson = orjson
+
+    def decode(self, data: bytes, schema: Any = None) -> Any:
+        return self._orjson.loads(data)
+
+    def encode(self, obj: Any) -> bytes:
+        return self._orjson.dumps(obj)
+
+class MsgspecCodec(JsonCodec):
+    """msgspec codec with typed schema decoding."""
+
+    name = "msgspec"
+
+    def __init__(self) -> None:
+        import msgspec
+        self._msgspec = msgspec
+        self._decoder = msgspec.json.Decoder()
+        self._encoder = msgspec.json.Encoder()
+        self._typed_decoders: dict[Any, Any] = {}
+
+    def decode(self, data: bytes, schema: Any = None) -> Any:
+        if schema is None:
+            return self._decoder.decode(data)
+        decoder = self._typed_decoders.get(schema)
+        if decoder is None:
+            decoder = self._msgspec.json.Decoder(schema)
+            self._typed_decoders[schema] = decoder
+        try:
+            return decoder.decode(data)
+        except self._msgspec.ValidationError as exc:
+            _LOGGER.debug("Response did not match schema, decoding untyped: %s", exc)
+            return self._decoder.decode(data)
+
+    def encode(self, obj: Any) -> bytes:
+        return self._encoder.encode(obj)
+
+CODECS = {
+    MsgspecCodec.name: MsgspecCodec,
+    OrjsonCodec.name: OrjsonCodec,
+    JsonCodec.name: JsonCodec
+}
+
+def get_codec(name: str | None = None) -> JsonCodec:
+    """Returns the named codec, or the fastest installed codec if name is None."""
+    if name is not None:
+        return CODECS[name]()
+    for codec in CODECS.values():
+        try:
+            return codec()
+        except ImportError:
+            continue
+    return JsonCodec()
@@ -41,13 +41,13 @@ URLS = {
     "get_family_account_cards": "api/parent/family/cards", # GET
     "get_child_standing_orders": "api/parent/child/{user_id}/standingorder", # GET
     "create_child_standing_order": "api/parent/child/{user_id}/standingorder/", # POST
-    "delete_child_standing_order": "api/parent/child/{user_id}/standingorder/{delete_child_standing_order}", # DELETE
+    "delete_child_standing_order": "api/parent/child/{user_id}/standingorder/{standing_order_id}", # DELETE
     "get_master_job_list": "api/parent/master-jobs", # GET
     "pot_money_action": "api/v1/families/{family_id}/children/{user_id}/pots/{pot_id}/{action}", # PUT
-    "scheduled_job_action": "/api/parent/scheduled-jobs/{schedule_id}/{action}", # POST
-    "freeze_child_card": "/api/parent/child/{user_id}/cards/{card_id}/freeze", # POST
-    "get_boost_reasons": "/api/parent/boost/reasons", # GET
-    "pot_money_transfer": "/api/v1/families/{family_id}/children/{user_id}/potTransfer" # PUT
+    "scheduled_job_action": "api/parent/scheduled-jobs/{schedule_id}/{action}", # POST
+    "freeze_child_card": "api/parent/child/{user_id}/cards/{card_id}/freeze", # POST
+    "get_boost_reasons": "api/parent/boost/reasons", # GET
+    "pot_money_transfer": "api/v1/families/{family_id}/children/{user_id}/potTransfer" # PUT
 }
 
 HEADERS = {
@@ -0,0 +1,140 @@
+"""Field-level diff engine for the RoosterMoney models."""
+
+from typing import Any, Callable, Iterable
+
+from .lazy import LazySequence
+
+CHILD_FIELDS = (
+    "available_pocket_money",
+    "interest_rate",
+    "currency",
+    "first_name",
+    "surname",
+    "allowance",
+    "allowance_amount",
+    "allowance_day",
+    "allowance_last_paid",
+    "uses_real_money",
+    "profile_image",
+    "active_allowance_period_id"
+)
+
+POT_FIELDS = ("name", "enabled", "value", "target", "last_updated")
+
+JOB_FIELDS = (
+    "state",
+    "title",
+    "description",
+    "reward_amount",
+    "final_reward_amount",
+    "locked",
+    "reopened",
+    "expiry_processed"
+)
+
+CARD_FIELDS = (
+    "card_id",
+    "status",
+    "contactless_limit",
+    "contactless_count",
+    "spend_limit",
+    "total_spend"
+)
+
+STANDING_ORDER_FIELDS = ("amount", "day", "frequency", "active", "tag", "title")
+
+FAMILY_ACCOUNT_FIELDS = (
+    "balance",
+    "currency",
+    "account_number",
+    "sort_code",
+    "suggested_monthly_transfer"
+)
+
+def snapshot(obj: Any, fields: Iterable[str]) -> dict:
+    """Captures the current value of the given fields of a model."""
+    if obj is None:
+        return {}
+    return {field: getattr(obj, field, None) for field in fields}
+
+def snapshot_collection(items: Iterable[Any], key: str, fields: Iterable[str]) -> dict:
+    """Captures a snapshot of each item in a collection, keyed by the given attribute."""
+    fields = tuple(fields)
+    return {getattr(item, key): snapshot(item, fields) for item in items}
+
+def snapshot_keys(items: Iterable[Any], key: str, raw_key: Callable[[dict], Any]) -> dict:
+    """Same as snapshot_collection without fields, the keys of a LazySequence are read
+    from its raw payloads (raw_key) so no item is built."""
+    if isinstance(items, LazySequence):
+        return {raw_key(raw): {} for raw in items.raw}
+    return snapshot_collection(items, key, ())
+
+def _entries(items: Iterable[Any] | None, key: str, raw_key: Callable[[dict], Any]) -> dict:
+    """Maps the key of each item to its raw payload (None for items that are not backed by
+    an unbuilt payload) and a function returning the item."""
+    if items is None:
+        return {}
+    if not isinstance(items, LazySequence):
+        return {getattr(item, key): (None, lambda item=item: item) for item in items}
+    return {raw_key(raw): (raw if items.built(index) is None else None,
+                           lambda index=index: items[index])
+            for index, raw in enumerate(items.raw)}
+
+def diff_snapshots(old: dict, new: dict) -> dict:
+    """Returns {field: {"old": x, "new": y}} for every field that differs."""
+    changes = {}
+    for field in new.keys() | old.keys():
+        if old.get(field) != new.get(field):
+            changes[field] = {
+                "old": old.get(field),
+                "new": new.get(field)
+            }
+    return changes
+
+def diff_collections(old: dict, new: dict) -> dict:
+    """Compares two collection snapshots.
+    Returns an empty dict if nothing changed, otherwise a dict with the keys of
+    added and removed entities and the field changes of modified entities."""
+    changed = {}
+    for k in new:
+        if k in old:
+            changes = diff_snapshots(old[k], new[k])
+            if len(changes) > 0:
+                changed[k] = changes
+    return _collection_changes(old, new, changed)
+
+def _collection_changes(old: dict, new: dict, changed: dict) -> dict:
+    """Returns the changes of a collection from its old and new keys and changed entities."""
+    added = [k for k in new if k not in old]
+    removed = [k for k in old if k not in new]
+    if len(added) == 0 and len(removed) == 0 and len(changed) == 0:
+        return {}
+    return {
+        "added": added,
+        "removed": removed,
+        "changed": changed
+    }
+
+def diff_lazy_collections(old: Iterable[Any] | None,
+                          new: Iterable[Any] | None,
+                          key: str,
+                          raw_key: Callable[[dict], Any],
+                          fields: Iterable[str]) -> dict:
+    """Same as diff_collections over snapshot_collection of old and new, but only builds
+    the items of a LazySequence whose raw payload changed. Items of old that were already
+    built are always compared by their fields, as they may hold local (optimistic) changes
+    their payload does not."""
+    fields = tuple(fields)
+    old_entries = _entries(old, key, raw_key)
+    new_entries = _entries(new, key, raw_key)
+    changed = {}
+    for k, (new_raw, new_item) in new_entries.items():
+        if k not in old_entries:
+            continue
+        old_raw, old_item = old_entries[k]
+        if old_raw is not None and old_raw == new_raw:
+            continue
+        changes = diff_snapshots(snapshot(old_item(), fields), snapshot(new_item(), fields))
+        if len(changes) > 0:
+            changed[k] = changes
+    return _collection_changes(old_entries, new_entries, changed)
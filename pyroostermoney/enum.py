@@ -91,3 +91,32 @@ class PotLedgerTypes(Enum):
 
     def __str__(self) -> str:
         return self.name.lower()
+
+class OutboxStatus(Enum):
+    """Status of an operation in the outbox."""
+    PENDING = 0
+    RUNNING = 1
+    DONE = 2
+    FAILED = 3
+    UNCERTAIN = 4
+
+    def __str__(self) -> str:
+        return self.name
+
+class BreakerState(Enum):
+    """State of a circuit breaker."""
+    CLOSED = 0
+    OPEN = 1
+    HALF_OPEN = 2
+
+    def __str__(self) -> str:
+        return self.name
+
+class RequestPriority(IntEnum):
+    """Priority class of a request, lower values are more urgent."""
+    INTERACTIVE_WRITE = 0
+    INTERACTIVE_READ = 1
+    BACKGROUND = 2
+
+    def __str__(self) -> str:
+        return self.name
@@ -1,18 +1,150 @@
 """Events publisher"""
 
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from collections import deque
+from datetime import datetime
 from typing import Any
 from .enum import EventSource, EventType
+from .exceptions import EventsMissed
+from .profiling import record_events
 
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_JOURNAL_SIZE = 1000
 
 class Events():
-    """Events for 3rd party services to attach to."""
+    """Events for 3rd party services to attach to.
+
+    Every fired event is given a monotonically increasing sequence number and
+    is kept in a bounded in-memory journal so consumers can replay what they
+    missed. If journal_path is set the journal is also appended to disk (one
+    JSON object per line) and reloaded on start so sequence numbers survive
+    restarts. Entries are written by a background thread holding the file open,
+    the file is compacted to the last journal_size entries when loaded and
+    whenever it grows to twice that. close() writes out the pending entries.
+    """
 
-    def __init__(self) -> None:
+    def __init__(self,
+                 journal_size: int = DEFAULT_JOURNAL_SIZE,
+                 journal_path: str | None = None) -> None:
         self._subscriptions: dict[str, dict] = {}
+        self._sequence = 0
+        self._journal: deque[dict] = deque(maxlen=journal_size)
+        self._journal_path = journal_path
+        self._queue: queue.Queue = queue.Queue()
+        self._writer: threading.Thread = None
+        # lines in the on-disk journal, only used by the writer once it runs
+        self._journal_lines = 0
+        if journal_path is not None:
+            self._load_journal()
+
+    @property
+    def sequence(self) -> int:
+        """The sequence number of the most recently fired event."""
+        return self._sequence
+
+    @property
+    def oldest_sequence(self) -> int:
+        """The oldest sequence number that can still be replayed."""
+        if len(self._journal) == 0:
+            return self._sequence + 1
+        return self._journal[0]["seq"]
+
+    def _load_journal(self):
+        """Restores the in-memory journal from the on-disk append log."""
+        if not os.path.exists(self._journal_path):
+            return
+        with open(self._journal_path, "r", encoding="utf-8") as journal:
+            for line in journal:
+                self._journal_lines += 1
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    _LOGGER.warning("Skipping corrupt event journal entry")
+                    continue
+                self._journal.append(entry)
+                self._sequence = max(self._sequence, entry["seq"])
+        if self._journal_lines > self._journal.maxlen:
+            try:
+                self._compact_journal()
+            except OSError as exc:
+                _LOGGER.warning("Unable to compact event journal: %s", exc)
+
+    def _compact_journal(self):
+        """Atomically rewrites the on-disk journal with its last journal_size lines."""
+        with open(self._journal_path, "r", encoding="utf-8") as journal:
+            lines = deque(journal, maxlen=self._journal.maxlen)
+        temp_path = f"{self._journal_path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as journal:
+            journal.writelines(lines)
+        os.replace(temp_path, self._journal_path)
+        self._journal_lines = len(lines)
+
+    def _append_journal(self, entry: dict):
+        """Queues an entry for the on-disk journal."""
+        if self._writer is None:
+            self._writer = threading.Thread(target=self._write_journal,
+                                            name="pyroostermoney-events",
+                                            daemon=True)
+            self._writer.start()
+        self._queue.put(entry)
 
-    def subscribe(self, func: Any, source: EventSource, event_type: EventType, event_id: str):
-        """Add an event subscription"""
+    def _write_journal(self):
+        """Writes queued entries to the on-disk journal until close()."""
+        journal = None
+        while True:
+            entry = self._queue.get()
+            try:
+                if entry is None:
+                    break
+                if journal is None:
+                    journal = open(self._journal_path, "a", # pylint: disable=consider-using-with
+                                   encoding="utf-8")
+                journal.write(json.dumps(entry, default=str) + "\n")
+                self._journal_lines += 1
+                if self._journal_lines >= 2 * self._journal.maxlen:
+                    journal.close()
+                    journal = None
+                    self._compact_journal()
+                elif self._queue.empty():
+                    journal.flush()
+            except OSError as exc:
+                _LOGGER.warning("Unable to write event journal: %s", exc)
+            finally:
+                self._queue.task_done()
+        if journal is not None:
+            journal.close()
+
+    def flush(self):
+        """Waits until every fired event was written to the on-disk journal."""
+        if self._writer is not None:
+            self._queue.join()
+
+    def close(self):
+        """Writes out the pending events and stops the journal writer."""
+        if self._writer is not None:
+            self._queue.put(None)
+            self._writer.join()
+            self._writer = None
+
+    def subscribe(self,
+                  func: Any,
+                  source: EventSource,
+                  event_type: EventType,
+                  event_id: str,
+                  since_seq: int | None = None):
+        """Add an event subscription.
+        If since_seq is provided, events after that sequence number are replayed into func
+        before the subscription becomes active."""
         if event_id not in self._subscriptions:
+            if since_seq is not None:
+                for entry in self.replay(since_seq, source, event_type):
+                    func(self.build_metadata(entry))
             self._subscriptions[event_id] = {
                 "func": func,
                 "source": source,
@@ -32,8 +164,43 @@ class Events():
         else:
             raise KeyError("ID not subscribed")
 
+    def replay(self,
+               since_seq: int,
+               source: EventSource = EventSource.ALL,
+               event_type: EventType = EventType.ALL) -> list[dict]:
+        """Returns all journaled events with a sequence number greater than since_seq.
+        Raises EventsMissed if the journal no longer holds all of the requested events."""
+        if since_seq + 1 < self.oldest_sequence:
+            raise EventsMissed(since_seq, self.oldest_sequence)
+        return [x for x in self._journal
+                if x["seq"] > since_seq and
+                (source == EventSource.ALL or x["source"] == str(source)) and
+                (event_type == EventType.ALL or x["type"] == str(event_type))]
+
+    @staticmethod
+    def build_metadata(entry: dict) -> dict:
+        """Builds the metadata passed to subscribers from a journal entry."""
+        metadata = dict(entry["metadata"])
+        metadata["source"] = entry["source"]
+        metadata["type"] = entry["type"]
+        metadata["seq"] = entry["seq"]
+        return metadata
+
     def fire_event(self, source: EventSource, event_type: EventType, metadata: dict = None):
         """Fires an event using the stored function"""
+        started = time.perf_counter()
+        self._sequence += 1
+        entry = {
+            "seq": self._sequence,
+            "time": datetime.now().isoformat(),
+            "source": str(source),
+            "type": str(event_type),
+            "metadata": dict(metadata) if metadata is not None else {}
+        }
+        self._journal.append(entry)
+        if self._journal_path is not None:
+            self._append_journal(entry)
+
         subscribes = [x for x in self._subscriptions
                       if (self._subscriptions.get(x).get("source") == source or
                           self._subscriptions.get(x).get("source") == EventSource.ALL) and
@@ -42,7 +209,6 @@ class Events():
         if len(subscribes) > 0:
             for subscribed in subscribes:
                 subscribed = self._subscriptions.get(subscribed)
-                metadata["source"] = str(source)
-                metadata["type"] = str(event_type)
                 func = subscribed.get("func")
-                func(metadata)
+                func(self.build_metadata(entry))
+        record_events(time.perf_counter() - started)
@@ -29,3 +29,29 @@ class ActionFailed(Exception):
     """A given action failed because on an unspecified error."""
     def __init__(self, *args: object) -> None:
         super().__init__("Action failed due to an unspecified error.", *args)
+
+class EventsMissed(LookupError):
+    """Requested events are no longer held in the event journal."""
+    def __init__(self, since_seq: int, oldest_seq: int) -> None:
+        self.since_seq = since_seq
+        self.oldest_seq = oldest_seq
+        super().__init__(
+            f"Events after {since_seq} requested but journal starts at {oldest_seq}.")
+
+class CircuitOpen(ConnectionError):
+    """The circuit breaker of an endpoint is open."""
+    def __init__(self, endpoint: str, retry_after: float) -> None:
+        self.endpoint = endpoint
+        self.retry_after = retry_after
+        super().__init__(
+            f"Requests to {endpoint} are paused for {retry_after:.1f}s after repeated failures.")
+
+class DeadlineExceeded(TimeoutError):
+    """The deadline of the current operation has passed.
+    sent is False if the deadline had passed before the request was sent."""
+    def __init__(self, sent: bool = True) -> None:
+        self.sent = sent
+        super().__init__("Deadline exceeded.")
+
+# errors that affect every request of a session, these are never isolated to one resource
+SESSION_ERRORS = (InvalidAuthError, NotLoggedIn, AuthenticationExpired, PermissionError)
@@ -7,8 +7,12 @@ import logging
 from datetime import date
 
 from .api import RoosterSession
-from .const import URLS, DEFAULT_BANK_NAME, DEFAULT_BANK_TYPE, CREATE_PAYMENT_BODY, CURRENCY
+from .const import URLS, DEFAULT_BANK_NAME, DEFAULT_BANK_TYPE, CURRENCY
+from .bodies import payment_body
 from .events import EventType, EventSource
+from .schema import SCHEMAS
+from .diff import FAMILY_ACCOUNT_FIELDS, snapshot, diff_snapshots
+from .reconcile import FAMILY_ACCOUNT
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -72,7 +76,8 @@ class FamilyAccount:
             url=URLS.get("get_family_account_statement").format(
                 month=search_date.month,
                 year=search_date.year
-            )
+            ),
+            schema=SCHEMAS["get_family_account_statement"]
         )
         if search_date == date.today():
             self.current_month_transactions = self._parse_transaction_history(history)
@@ -85,18 +90,22 @@ class FamilyAccount:
 
     async def update(self):
         """Updates the FamilyAccount object data."""
+        self._session.reconciler.discard(None, FAMILY_ACCOUNT)
         family_account = await self._session.request_handler(
             url=URLS.get("get_family_account"))
         account = await self._session.request_handler(
             url=URLS.get("get_account_info")
         )
-        p_account = self.__dict__
+        p_account = snapshot(self, FAMILY_ACCOUNT_FIELDS + ("latest_transaction",))
         self._parse_response(raw_response=family_account, account_info=account)
         await self.get_transaction_history()
-        if p_account is not self.__dict__:
+        changes = diff_snapshots(
+            p_account, snapshot(self, FAMILY_ACCOUNT_FIELDS + ("latest_transaction",)))
+        if len(changes) > 0:
             self._session.events.fire_event(EventSource.FAMILY_ACCOUNT, EventType.UPDATED,
                                             {
-                                                "user_id": self.account_number
+                                                "user_id": self.account_number,
+                                                "changes": changes
                                             })
 
     @property
@@ -117,13 +126,12 @@ class FamilyAccount:
                              security_code,
                              holder_name):
         """Creates a payment to allow topping up the family account."""
-        request_body = CREATE_PAYMENT_BODY
-        request_body["amount"]["value"] = value*100
-        request_body["paymentMethod"]["encryptedCardNumber"] = card_number
-        request_body["paymentMethod"]["encryptedExpiryMonth"] = expiry_month
-        request_body["paymentMethod"]["encryptedExpiryYear"] = expiry_year
-        request_body["paymentMethod"]["encryptedSecurityCode"] = security_code
-        request_body["paymentMethod"]["holderName"] = holder_name
+        request_body = payment_body(value,
+                                    card_number,
+                                    expiry_month,
+                                    expiry_year,
+                                    security_code,
+                                    holder_name)
         ## TODO request_body["shopperEmail"] = self.account_info.email
 
         response = await self._session.request_handler(
@@ -0,0 +1,76 @@
+"""Hedged GET requests.
+
+The latency of every GET is tracked per endpoint (URL template). Once an
+endpoint has enough samples, a GET still running after the given
+percentile of its latency gets a second copy, the first copy to succeed is
+used and the other one cancelled. Hedges are paid for from a budget that
+grows by budget for every GET, so at most that fraction of requests is
+sent twice, and a hedge is only sent if its priority class has a free slot.
+"""
+# pylint: disable=too-many-arguments
+# pylint: disable=too-many-instance-attributes
+from collections import deque
+
+DEFAULT_PERCENTILE = 95.0
+DEFAULT_MIN_SAMPLES = 20
+DEFAULT_WINDOW = 200
+DEFAULT_BUDGET = 0.05
+DEFAULT_MAX_TOKENS = 10.0
+
+class HedgingPolicy:
+    """When to hedge a GET, and how often hedging fired and won."""
+
+    def __init__(self,
+                 percentile: float = DEFAULT_PERCENTILE,
+                 min_samples: int = DEFAULT_MIN_SAMPLES,
+                 window: int = DEFAULT_WINDOW,
+                 budget: float = DEFAULT_BUDGET,
+                 max_tokens: float = DEFAULT_MAX_TOKENS) -> None:
+        if not 0 < percentile < 100:
+            raise ValueError("percentile must be between 0 and 100")
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.window = window
+        self.budget = budget
+        self.max_tokens = max_tokens
+        self._latencies: dict[str, deque] = {}
+        self._tokens = 0.0
+        self.requests = 0
+        self.hedged = 0
+        self.won = 0
+
+    def record(self, endpoint: str, seconds: float):
+        """Records the latency of a completed request."""
+        latencies = self._latencies.get(endpoint)
+        if latencies is None:
+            latencies = self._latencies[endpoint] = deque(maxlen=self.window)
+        latencies.append(seconds)
+
+    def delay(self, endpoint: str) -> float | None:
+        """Counts a GET and returns how long to wait before hedging it,
+        None if the endpoint does not have enough samples yet."""
+        self.requests += 1
+        self._tokens = min(self.max_tokens, self._tokens + self.budget)
+        latencies = self._latencies.get(endpoint)
+        if latencies is None or len(latencies) < self.min_samples:
+            return None
+        ordered = sorted(latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * self.percentile / 100))]
+
+    def take(self) -> bool:
+        """Spends the budget of a hedge, returns False if there is not enough left."""
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        self.hedged += 1
+        return True
+
+    def stats(self) -> dict:
+        """Returns how often hedging fired and how often the hedge won."""
+        return {
+            "requests": self.requests,
+            "hedged": self.hedged,
+            "won": self.won,
+            "hedge_rate": self.hedged / self.requests if self.requests > 0 else 0.0,
+            "win_rate": self.won / self.hedged if self.hedged > 0 else 0.0
+        }
@@ -0,0 +1,106 @@
+"""Lazy views over raw API payloads and lazy module attributes."""
+
+import importlib
+from collections.abc import Sequence
+from typing import Any, Callable
+
+def lazy_exports(package: str, exports: dict[str, str]) -> tuple[Callable, Callable]:
+    """Returns the PEP 562 __getattr__ and __dir__ functions for a package.
+    exports maps each public name to the relative module that defines it."""
+    namespace = importlib.import_module(package).__dict__
+
+    def __getattr__(name: str) -> Any:
+        module = exports.get(name)
+        if module is None:
+            raise AttributeError(f"module {package!r} has no attribute {name!r}")
+        value = getattr(importlib.import_module(module, package), name)
+        namespace[name] = value
+        return value
+
+    def __dir__() -> list[str]:
+        return sorted(set(namespace) | set(exports))
+
+    return __getattr__, __dir__
+
+class LazyView:
+    """Mixin for slotted models backed by a raw decoded dict.
+
+    Subclasses define a _raw slot and a _converters mapping of attribute name
+    to a function of the raw dict. An attribute is converted the first time
+    it is read and then stored in its slot, so later reads cost nothing.
+    """
+
+    __slots__ = ()
+    _converters: dict[str, Callable[[dict], Any]] = {}
+
+    def __getattr__(self, name: str) -> Any:
+        converter = type(self)._converters.get(name)
+        if converter is None:
+            raise AttributeError(name)
+        value = converter(self._raw)
+        setattr(self, name, value)
+        return value
+
+    @property
+    def raw(self) -> dict:
+        """The raw payload backing this view."""
+        return self._raw
+
+    @classmethod
+    def convert(cls, name: str, raw: dict) -> Any:
+        """Converts a single attribute of a raw payload without building a view."""
+        return cls._converters[name](raw)
+
+    def resolve(self):
+        """Converts every field now."""
+        for name in self._converters:
+            getattr(self, name, None)
+        return self
+
+class LazySequence(Sequence):
+    """A read only sequence that builds its items from raw payloads on first access."""
+
+    __slots__ = ("_raw", "_factory", "_items")
+
+    def __init__(self, raw: list, factory: Callable[[dict], Any]) -> None:
+        self._raw = raw if isinstance(raw, list) else list(raw)
+        self._factory = factory
+        self._items: list = [None] * len(self._raw)
+
+    @property
+    def raw(self) -> list:
+        """The raw payloads backing this sequence."""
+        return self._raw
+
+    def built(self, index: int):
+        """Returns the item at index if it was already built, None otherwise."""
+        return self._items[index]
+
+    def __len__(self) -> int:
+        return len(self._raw)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        item = self._items[index]
+        if item is None:
+            item = self._factory(self._raw[index])
+            self._items[index] = item
+        return item
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Sequence) or isinstance(other, str):
+            return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+    __hash__ = None
+
+    def __add__(self, other) -> list:
+        return list(self) + list(other)
+
+    def __repr__(self) -> str:
+        return f"LazySequence({len(self)} items)"
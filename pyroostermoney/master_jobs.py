@@ -4,11 +4,16 @@
 
 from datetime import datetime
 
-from .child import Job, ChildAccount
+from .child.account import ChildAccount
+from .child.jobs import Job, JobView
 from .enum import JobTime, Weekdays, JobScheduleTypes
-from .const import URLS, DEFAULT_JOB_IMAGE_URL, CREATE_MASTER_JOB_BODY
+from .const import URLS, DEFAULT_JOB_IMAGE_URL
+from .bodies import master_job_body
 from .api import RoosterSession
 from .events import EventSource, EventType
+from .diff import JOB_FIELDS, snapshot_collection, diff_collections, diff_lazy_collections
+from .reconcile import MASTER_JOBS
+from .tasks import gather_limited, DEFAULT_MAX_CONCURRENCY
 
 class MasterJobs:
     """A collection of handlers for master jobs."""
@@ -19,26 +24,33 @@ class MasterJobs:
 
     async def update(self):
         """Performs an async update"""
+        self._session.reconciler.discard(None, MASTER_JOBS)
+        p_jobs = self.jobs
         await self.get_master_job_list()
+        changes = diff_lazy_collections(
+            p_jobs, self.jobs, "master_job_id",
+            lambda raw: JobView.convert("master_job_id", raw), JOB_FIELDS)
+        if len(p_jobs) > 0 and len(changes) > 0:
+            self._session.events.fire_event(EventSource.JOBS, EventType.UPDATED, {
+                "resource": "master_jobs",
+                "changes": changes
+            })
 
-    async def create_master_job(self,
-                                children: list[ChildAccount],
-                                description: str,
-                                title: str,
-                                image: str = DEFAULT_JOB_IMAGE_URL,
-                                reward_amount: float = 1,
-                                starting_date: datetime = datetime.now(),
-                                anytime: bool = True,
-                                after_last_done: bool = False,
-                                job_time: JobTime = JobTime.MORNING,
-                                repeat: list[Weekdays] = None,
-                                job_type: JobScheduleTypes = JobScheduleTypes.ANYTIME):
-        """Creates a master job"""
-        data = CREATE_MASTER_JOB_BODY
-        data["masterJob"]["createdByGuardianId"] = self._session.account_info.get("userId")
-        data["masterJob"]["description"] = description
-        data["masterJob"]["imageUrl"] = image
-        data["masterJob"]["rewardAmount"] = reward_amount
+    async def _post_master_job(self,
+                               children: list[ChildAccount],
+                               description: str,
+                               title: str,
+                               image: str = DEFAULT_JOB_IMAGE_URL,
+                               reward_amount: float = 1,
+                               starting_date: datetime | None = None,
+                               anytime: bool = True,
+                               after_last_done: bool = False,
+                               job_time: JobTime = JobTime.MORNING,
+                               repeat: list[Weekdays] = None,
+                               job_type: JobScheduleTypes = JobScheduleTypes.ANYTIME):
+        """Sends a master job creation, returns the created job."""
+        if starting_date is None:
+            starting_date = datetime.now()
         schedule_info = {
                     "afterLastDone": after_last_done,
                     "dueAnyDay": anytime,
@@ -49,7 +61,7 @@ class MasterJobs:
                         "year": starting_date.date().year
                     },
                     "timeOfDay": int(job_time),
-                    "type": int(job_type)
+                    "type": job_type.value
                 }
 
         if job_type == JobScheduleTypes.REPEATING and repeat is not None:
@@ -57,11 +69,13 @@ class MasterJobs:
             for day in repeat:
                 schedule_info["daysOfTheWeek"].append(int(day))
 
-        data["masterJob"]["scheduleInfo"] = schedule_info
-        data["masterJob"]["title"] = title
-
-        for child in children:
-            data["childUserIds"].append(child.user_id)
+        data = master_job_body(user_ids=[child.user_id for child in children],
+                               guardian_id=self._session.account_info.get("userId"),
+                               description=description,
+                               title=title,
+                               image=image,
+                               reward_amount=reward_amount,
+                               schedule_info=schedule_info)
 
         response = await self._session.request_handler(
             url=URLS.get("get_master_jobs"),
@@ -72,11 +86,83 @@ class MasterJobs:
         if response["status"] != 200:
             raise SystemError(response["status"])
 
-        await self.update()
+        return response.get("response")
+
+    async def create_master_job(self,
+                                children: list[ChildAccount],
+                                description: str,
+                                title: str,
+                                image: str = DEFAULT_JOB_IMAGE_URL,
+                                reward_amount: float = 1,
+                                starting_date: datetime | None = None,
+                                anytime: bool = True,
+                                after_last_done: bool = False,
+                                job_time: JobTime = JobTime.MORNING,
+                                repeat: list[Weekdays] = None,
+                                job_type: JobScheduleTypes = JobScheduleTypes.ANYTIME):
+        """Creates a master job.
+        The created job is added to the local list straight away, the master jobs and
+        the jobs of the children are reconciled in the background."""
+        created = await self._post_master_job(children=children,
+                                              description=description,
+                                              title=title,
+                                              image=image,
+                                              reward_amount=reward_amount,
+                                              starting_date=starting_date,
+                                              anytime=anytime,
+                                              after_last_done=after_last_done,
+                                              job_time=job_time,
+                                              repeat=repeat,
+                                              job_type=job_type)
+
+        if isinstance(created, dict) and created.get("masterJobId") is not None:
+            p_jobs = snapshot_collection(self.jobs, "master_job_id", JOB_FIELDS)
+            self.jobs = [*self.jobs, JobView(created, self._session)]
+            self._session.reconciler.apply(EventSource.JOBS, None, MASTER_JOBS, diff_collections(
+                p_jobs, snapshot_collection(self.jobs, "master_job_id", JOB_FIELDS)))
+        else:
+            self._session.reconciler.schedule(None, MASTER_JOBS)
+        for child in children:
+            self._session.reconciler.schedule(child.user_id, "jobs")
 
         self._session.events.fire_event(EventSource.JOBS,
                                         EventType.CREATED,
-                                        response.get("response"))
+                                        created)
+
+    async def create_master_jobs(self,
+                                 specs: list[dict],
+                                 max_concurrency: int = DEFAULT_MAX_CONCURRENCY) -> list[dict]:
+        """Creates many master jobs, at most max_concurrency at a time.
+        Each spec holds the arguments of create_master_job (children, description, title,
+        reward_amount, repeat...), a failed job does not stop the others.
+        The master job list is refreshed once at the end and a single CREATED event
+        lists every created job. Returns a result dict per spec."""
+        async def _create(spec: dict):
+            return await self._post_master_job(**spec)
+
+        responses = await gather_limited([_create(spec) for spec in specs], max_concurrency)
+        results = []
+        created = []
+        for spec, response in zip(specs, responses):
+            success = not isinstance(response, Exception)
+            if success:
+                created.append(response)
+                for child in spec.get("children", []):
+                    self._session.reconciler.schedule(child.user_id, "jobs")
+            results.append({
+                "title": spec.get("title"),
+                "success": success,
+                "error": None if success else response,
+                "job": response if success else None
+            })
+
+        if len(created) > 0:
+            await self.update()
+            self._session.events.fire_event(EventSource.JOBS, EventType.CREATED, {
+                "resource": "master_jobs",
+                "jobs": created
+            })
+        return results
 
     async def get_master_job_list(self) -> list[Job]:
         """Gets master job list (/parent/master-jobs)"""
@@ -0,0 +1,501 @@
+"""Durable write-ahead outbox for mutations.
+
+Mutations submitted to the outbox are written to a SQLite journal before
+anything is sent, so the caller returns straight away and nothing is lost if
+the process dies. A worker drains the journal concurrently, retrying
+transient failures with exponential backoff.
+
+When the outcome of a request is unknown (a timeout or dropped connection
+after sending, or a process that died mid request) the server state is
+checked before sending again where possible:
+- job approvals are done if the job is approved,
+- standing orders are created if a matching one exists, deleted if missing,
+- card status changes are idempotent and simply sent again.
+Pot boosts and transfers cannot be checked, they are marked UNCERTAIN and
+only sent again through Outbox.retry.
+
+Operations run concurrently and are not ordered.
+
+Usage:
+    outbox = Outbox(rooster, "outbox.db")
+    await outbox.start()
+    operation_id = await outbox.add_to_pot(child.pots[0], 1.0, "Weekly boost")
+    await outbox.wait(operation_id)
+"""
+# pylint: disable=too-many-arguments
+# pylint: disable=too-many-instance-attributes
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from collections.abc import Awaitable, Callable
+
+from .api import _aiohttp
+from .bodies import boost_body, transfer_body
+from .child.card import Card
+from .child.account import ChildAccount
+from .child.jobs import Job
+from .child.money_pot import Pot
+from .child.standing_order import StandingOrder
+from .const import URLS
+from .enum import EventSource, EventType, JobActions, JobState, OutboxStatus
+from .enum import PotLedgerTypes, PotMoneyActions
+from .exceptions import CircuitOpen, DeadlineExceeded
+from .reconcile import FAMILY_ACCOUNT
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_RETRY_DELAY = 1.0
+
+TERMINAL_STATUSES = (OutboxStatus.DONE, OutboxStatus.FAILED, OutboxStatus.UNCERTAIN)
+
+# statuses retried as the server rejected the request without applying it
+RETRY_STATUSES = (408, 429, 503)
+# statuses where the request may have been applied upstream, a 500 can come from a
+# server that applied the change and then failed
+UNKNOWN_STATUSES = (500, 502, 504)
+
+def _not_sent_errors() -> tuple:
+    """Errors raised before the request was sent, CircuitOpen is a ConnectionError so it
+    has to be matched before _unknown_errors."""
+    return (_aiohttp().ClientConnectorError, CircuitOpen)
+
+def _unknown_errors() -> tuple:
+    """Errors raised once the request may have been sent."""
+    return (asyncio.TimeoutError, _aiohttp().ClientError, ConnectionError)
+
+class _UnknownOutcome(Exception):
+    """The request may or may not have been applied."""
+
+class _Retry(Exception):
+    """The request was not applied and can be sent again."""
+
+async def _check_job_approved(session, operation: dict) -> bool:
+    """Returns True if the job was approved."""
+    child: ChildAccount = session.get_child_account(operation["user_id"])
+    await child.ensure_loaded("allowance_period")
+    await child.load_resource("jobs")
+    key = operation["key"]
+    return any(job.scheduled_job_id == key["scheduled_job_id"] and
+               job.state == JobState.APPROVED for job in child.jobs)
+
+async def _check_standing_order_created(session, operation: dict) -> bool:
+    """Returns True if a matching standing order exists."""
+    child: ChildAccount = session.get_child_account(operation["user_id"])
+    await child.load_resource("standing_orders")
+    key = operation["key"]
+    return any(order.title == key["title"] and order.amount == key["amount"] and
+               order.day == key["day"] and order.frequency == key["frequency"]
+               for order in child.standing_orders)
+
+async def _check_standing_order_deleted(session, operation: dict) -> bool:
+    """Returns True if the standing order no longer exists."""
+    child: ChildAccount = session.get_child_account(operation["user_id"])
+    await child.load_resource("standing_orders")
+    return all(order.regular_id != operation["key"]["regular_id"]
+               for order in child.standing_orders)
+
+async def _check_idempotent(session, operation: dict) -> bool:
+    """Idempotent operations are always sent again."""
+    # pylint: disable=unused-argument
+    return False
+
+# operation -> (resources reconciled once done, check of the server state)
+OPERATIONS: dict[str, tuple[tuple[str, ...], Callable[..., Awaitable[bool]] | None]] = {
+    "pot_money_action": (("pots", FAMILY_ACCOUNT), None),
+    "pot_money_transfer": (("pots",), None),
+    "scheduled_job_action": (("jobs", "pots"), _check_job_approved),
+    "create_standing_order": (("standing_orders",), _check_standing_order_created),
+    "delete_standing_order": (("standing_orders",), _check_standing_order_deleted),
+    "freeze_child_card": (("card",), _check_idempotent)
+}
+
+class _Journal:
+    """The SQLite journal, accessed from worker threads."""
+
+    def __init__(self, path: str) -> None:
+        self._path = path
+        self._lock = threading.Lock()
+        self._connection: sqlite3.Connection = None
+        self.open()
+
+    @property
+    def closed(self) -> bool:
+        """True once the database was closed."""
+        return self._connection is None
+
+    def open(self):
+        """Opens the database, creating the table if needed."""
+        self._connection = sqlite3.connect(self._path, check_same_thread=False)
+        self._connection.row_factory = sqlite3.Row
+        self.execute("""CREATE TABLE IF NOT EXISTS operations (
+            id TEXT PRIMARY KEY,
+            operation TEXT NOT NULL,
+            user_id INTEGER,
+            request TEXT NOT NULL,
+            key TEXT NOT NULL,
+            status TEXT NOT NULL,
+            verify INTEGER NOT NULL DEFAULT 0,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt REAL NOT NULL,
+            error TEXT,
+            created REAL NOT NULL,
+            updated REAL NOT NULL)""")
+
+    def execute(self, sql: str, params: tuple = ()) -> list[sqlite3.Row]:
+        """Executes a statement in its own transaction, returning every row."""
+        with self._lock, self._connection:
+            return self._connection.execute(sql, params).fetchall()
+
+    def close(self):
+        """Closes the database."""
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+def _to_dict(row: sqlite3.Row) -> dict:
+    """Converts a journal row to an operation dict."""
+    output = dict(row)
+    output["request"] = json.loads(output["request"])
+    output["key"] = json.loads(output["key"])
+    output["status"] = OutboxStatus[output["status"]]
+    output["verify"] = bool(output["verify"])
+    return output
+
+class Outbox:
+    """Journals mutations and sends them in the background."""
+
+    def __init__(self,
+                 session,
+                 path: str,
+                 max_concurrency: int = 5,
+                 max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+                 retry_delay: float = DEFAULT_RETRY_DELAY) -> None:
+        self._session = session
+        self._journal = _Journal(path)
+        self._max_concurrency = max_concurrency
+        self._max_attempts = max_attempts
+        self._retry_delay = retry_delay
+        self._running: set[asyncio.Task] = set()
+        self._worker: asyncio.Task = None
+        self._wakeup = asyncio.Event()
+        self._changed = asyncio.Condition()
+
+    async def _execute(self, sql: str, params: tuple = ()) -> list[sqlite3.Row]:
+        return await asyncio.to_thread(self._journal.execute, sql, params)
+
+    async def start(self):
+        """Starts draining the journal.
+        Operations left running by a previous process are checked before being sent again.
+        An outbox can be started again after stop()."""
+        if self._journal.closed:
+            await asyncio.to_thread(self._journal.open)
+        await self._execute(
+            "UPDATE operations SET status = ?, verify = 1 WHERE status = ?",
+            (str(OutboxStatus.PENDING), str(OutboxStatus.RUNNING)))
+        if self._worker is None:
+            self._worker = asyncio.create_task(self._drain())
+
+    async def stop(self):
+        """Stops the worker, operations in flight are resumed by the next start."""
+        if self._worker is not None:
+            self._worker.cancel()
+            self._worker = None
+        for task in list(self._running):
+            task.cancel()
+        await asyncio.gather(*self._running, return_exceptions=True)
+        await asyncio.to_thread(self._journal.close)
+
+    async def submit(self,
+                     operation: str,
+                     user_id: int | None,
+                     url: str,
+                     method: str,
+                     body: dict | None = None,
+                     add_security_token: bool = False,
+                     key: dict | None = None) -> str:
+        """Journals a request and returns its operation ID.
+        key holds what the server state check of the operation needs."""
+        if operation not in OPERATIONS:
+            raise KeyError(f"Unknown operation {operation}")
+        operation_id = uuid.uuid4().hex
+        now = time.time()
+        await self._execute(
+            "INSERT INTO operations (id, operation, user_id, request, key, status, next_attempt,"
+            " created, updated) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (operation_id, operation, user_id, json.dumps({
+                "url": url,
+                "method": method,
+                "body": body,
+                "add_security_token": add_security_token
+            }), json.dumps(key or {}), str(OutboxStatus.PENDING), now, now, now))
+        self._wakeup.set()
+        return operation_id
+
+    async def add_to_pot(self, pot: Pot, value: float, reason: str = "") -> str:
+        """Journals adding money to a pot."""
+        return await self._pot_money_action(pot, PotMoneyActions.BOOST, value, reason)
+
+    async def remove_from_pot(self, pot: Pot, value: float, reason: str = "") -> str:
+        """Journals removing money from a pot."""
+        return await self._pot_money_action(pot, PotMoneyActions.REMOVE, value, reason)
+
+    async def _pot_money_action(self,
+                                pot: Pot,
+                                action: PotMoneyActions,
+                                value: float,
+                                reason: str) -> str:
+        return await self.submit("pot_money_action", pot.user_id,
+                                 URLS.get("pot_money_action").format(
+                                     user_id=pot.user_id,
+                                     pot_id=pot.pot_id,
+                                     family_id=self._session.family_id,
+                                     action=action
+                                 ), "PUT", boost_body(value, reason))
+
+    async def pot_money_transfer(self,
+                                 child: ChildAccount,
+                                 source: PotLedgerTypes,
+                                 destination: PotLedgerTypes,
+                                 amount: float,
+                                 to_custom_pot_id: str | None = None,
+                                 from_custom_pot_id: str | None = None) -> str:
+        """Journals a transfer between two pots of a child."""
+        return await self.submit("pot_money_transfer", child.user_id,
+                                 URLS.get("pot_money_transfer").format(
+                                     family_id=self._session.family_id,
+                                     user_id=child.user_id
+                                 ), "PUT", transfer_body(
+                                     user_id=child.user_id,
+                                     family_id=self._session.family_id,
+                                     source=str(source),
+                                     destination=str(destination),
+                                     amount=amount,
+                                     to_custom_pot_id=to_custom_pot_id,
+                                     from_custom_pot_id=from_custom_pot_id))
+
+    async def approve_job(self, job: Job, message: str = "") -> str:
+        """Journals approving a scheduled job."""
+        return await self.submit("scheduled_job_action",
+                                 self._session.reconciler.job_owner(job.scheduled_job_id),
+                                 URLS.get("scheduled_job_action").format(
+                                     schedule_id=job.scheduled_job_id,
+                                     action=str(JobActions.APPROVE)
+                                 ), "POST", {"message": message},
+                                 key={"scheduled_job_id": job.scheduled_job_id})
+
+    async def create_standing_order(self,
+                                    child: ChildAccount,
+                                    standing_order: StandingOrder) -> str:
+        """Journals creating a standing order."""
+        return await self.submit("create_standing_order", child.user_id,
+                                 URLS.get("create_child_standing_order").format(
+                                     user_id=child.user_id
+                                 ), "POST", standing_order.__dict__(),
+                                 key={"title": standing_order.title,
+                                      "amount": standing_order.amount,
+                                      "day": standing_order.day,
+                                      "frequency": standing_order.frequency})
+
+    async def delete_standing_order(self,
+                                    child: ChildAccount,
+                                    standing_order: StandingOrder) -> str:
+        """Journals deleting a standing order."""
+        return await self.submit("delete_standing_order", child.user_id,
+                                 URLS.get("delete_child_standing_order").format(
+                                     user_id=child.user_id,
+                                     standing_order_id=standing_order.regular_id
+                                 ), "DELETE", key={"regular_id": standing_order.regular_id})
+
+    async def set_card_status(self, card: Card, active: bool = True) -> str:
+        """Journals freezing or unfreezing a card."""
+        return await self.submit("freeze_child_card", card.user_id,
+                                 URLS.get("freeze_child_card").format(
+                                     user_id=card.user_id,
+                                     card_id=card.card_id
+                                 ), "POST", {
+                                     "cardStatus": "active" if active else "lost",
+                                     "reason": "Unfreeze card" if active else "Freeze card"
+                                 })
+
+    async def status(self, operation_id: str) -> dict | None:
+        """Returns an operation, or None if it is not in the journal."""
+        rows = await self._execute("SELECT * FROM operations WHERE id = ?", (operation_id,))
+        return _to_dict(rows[0]) if len(rows) > 0 else None
+
+    async def operations(self, status: OutboxStatus | None = None) -> list[dict]:
+        """Returns every operation, optionally only those with the given status."""
+        if status is None:
+            rows = await self._execute("SELECT * FROM operations ORDER BY created")
+        else:
+            rows = await self._execute(
+                "SELECT * FROM operations WHERE status = ? ORDER BY created", (str(status),))
+        return [_to_dict(row) for row in rows]
+
+    async def retry(self, operation_id: str):
+        """Sends a failed or uncertain operation again."""
+        await self._execute(
+            "UPDATE operations SET status = ?, verify = 0, attempts = 0, next_attempt = ?"
+            " WHERE id = ? AND status IN (?, ?)",
+            (str(OutboxStatus.PENDING), time.time(), operation_id,
+             str(OutboxStatus.FAILED), str(OutboxStatus.UNCERTAIN)))
+        self._wakeup.set()
+
+    async def purge(self):
+        """Removes every completed operation from the journal."""
+        await self._execute("DELETE FROM operations WHERE status = ?", (str(OutboxStatus.DONE),))
+
+    async def wait(self, operation_id: str) -> dict:
+        """Waits until an operation is done, failed or uncertain."""
+        async with self._changed:
+            while True:
+                operation = await self.status(operation_id)
+                if operation is None or operation["status"] in TERMINAL_STATUSES:
+                    return operation
+                await self._changed.wait()
+
+    async def drain(self):
+        """Waits until no operation is pending or running."""
+        async with self._changed:
+            while len(await self._execute(
+                    "SELECT id FROM operations WHERE status IN (?, ?)",
+                    (str(OutboxStatus.PENDING), str(OutboxStatus.RUNNING)))) > 0:
+                await self._changed.wait()
+
+    async def _drain(self):
+        """Claims due operations and runs them, at most max_concurrency at a time."""
+        while True:
+            self._wakeup.clear()
+            free = self._max_concurrency - len(self._running)
+            due = []
+            if free > 0:
+                due = await self._execute(
+                    "SELECT * FROM operations WHERE status = ? AND next_attempt <= ?"
+                    " ORDER BY next_attempt LIMIT ?",
+                    (str(OutboxStatus.PENDING), time.time(), free))
+            for row in due:
+                operation = _to_dict(row)
+                await self._set_status(operation, OutboxStatus.RUNNING)
+                task = asyncio.create_task(self._run(operation))
+                self._running.add(task)
+                task.add_done_callback(self._done)
+            if due and len(due) == free:
+                continue
+            if free <= 0:
+                await self._wakeup.wait()
+                continue
+            delay = await self._next_due()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+    def _done(self, task: asyncio.Task):
+        self._running.discard(task)
+        self._wakeup.set()
+
+    async def _next_due(self) -> float | None:
+        """Returns the seconds until the next retry, None if nothing is waiting."""
+        rows = await self._execute("SELECT MIN(next_attempt) FROM operations WHERE status = ?",
+                                   (str(OutboxStatus.PENDING),))
+        if rows[0][0] is None:
+            return None
+        return max(rows[0][0] - time.time(), 0)
+
+    async def _set_status(self,
+                          operation: dict,
+                          status: OutboxStatus,
+                          error: str | None = None,
+                          verify: bool = False,
+                          attempts: int | None = None,
+                          next_attempt: float | None = None):
+        """Updates an operation in the journal and wakes anything waiting on it."""
+        operation["status"] = status
+        await self._execute(
+            "UPDATE operations SET status = ?, error = ?, verify = ?, attempts = ?,"
+            " next_attempt = ?, updated = ? WHERE id = ?",
+            (str(status), error, int(verify),
+             operation["attempts"] if attempts is None else attempts,
+             operation["next_attempt"] if next_attempt is None else next_attempt,
+             time.time(), operation["id"]))
+        if status in TERMINAL_STATUSES:
+            self._session.events.fire_event(EventSource.INTERNAL, EventType.UPDATED, {
+                "outbox": operation["id"],
+                "operation": operation["operation"],
+                "user_id": operation["user_id"],
+                "status": str(status),
+                "error": error
+            })
+        async with self._changed:
+            self._changed.notify_all()
+
+    async def _send(self, operation: dict):
+        """Sends the request of an operation."""
+        request = operation["request"]
+        try:
+            response = await self._session.request_handler(
+                url=request["url"],
+                body=request["body"],
+                method=request["method"],
+                add_security_token=request["add_security_token"])
+        except _not_sent_errors() as exc:
+            raise _Retry(str(exc)) from exc
+        except DeadlineExceeded as exc:
+            if not exc.sent:
+                raise _Retry(str(exc)) from exc
+            raise _UnknownOutcome(str(exc)) from exc
+        except _unknown_errors() as exc:
+            raise _UnknownOutcome(str(exc)) from exc
+        if response["status"] in RETRY_STATUSES:
+            raise _Retry(f"HTTP {response['status']}")
+        if response["status"] in UNKNOWN_STATUSES:
+            raise _UnknownOutcome(f"HTTP {response['status']}")
+        if not 200 <= response["status"] < 300:
+            raise ValueError(f"HTTP {response['status']}")
+
+    async def _run(self, operation: dict):
+        """Runs a single attempt of an operation."""
+        resources, check = OPERATIONS[operation["operation"]]
+        attempts = operation["attempts"] + 1
+        try:
+            if operation["verify"]:
+                if check is None:
+                    await self._set_status(operation, OutboxStatus.UNCERTAIN,
+                                           error=operation["error"], attempts=attempts)
+                    return
+                try:
+                    applied = await check(self._session, operation)
+                except Exception as exc: # pylint: disable=broad-exception-caught
+                    raise _UnknownOutcome(f"Unable to check the server state: {exc}") from exc
+                if not applied:
+                    await self._send(operation)
+            else:
+                await self._send(operation)
+        except (_Retry, _UnknownOutcome) as exc:
+            verify = isinstance(exc, _UnknownOutcome) or operation["verify"]
+            if attempts >= self._max_attempts:
+                await self._set_status(operation,
+                                       OutboxStatus.UNCERTAIN if verify else OutboxStatus.FAILED,
+                                       error=str(exc), verify=verify, attempts=attempts)
+                return
+            _LOGGER.debug("Outbox operation %s failed, retrying: %s", operation["id"], exc)
+            await self._set_status(operation, OutboxStatus.PENDING, error=str(exc),
+                                   verify=verify, attempts=attempts,
+                                   next_attempt=time.time() +
+                                   self._retry_delay * 2 ** (attempts - 1))
+            return
+        except Exception as exc: # pylint: disable=broad-exception-caught
+            await self._set_status(operation, OutboxStatus.FAILED, error=str(exc),
+                                   attempts=attempts)
+            return
+        await self._set_status(operation, OutboxStatus.DONE, attempts=attempts)
+        for resource in resources:
+            if resource == FAMILY_ACCOUNT:
+                self._session.reconciler.schedule(None, resource)
+            else:
+                self._session.reconciler.schedule(operation["user_id"], resource)
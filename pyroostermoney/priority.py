@@ -0,0 +1,98 @@
+"""Priority request scheduling.
+
+Requests are sorted into priority classes: interactive writes (anything but
+a GET), interactive reads (GET) and background refreshes (anything sent
+inside background_requests, such as update() and the pollers). Each class
+has its own concurrency share, so a large refresh wave can only fill the
+background share while approving a job or freezing a card still gets a
+free slot straight away.
+"""
+import asyncio
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+
+from .enum import RequestPriority
+
+DEFAULT_SHARES = {
+    RequestPriority.INTERACTIVE_WRITE: 4,
+    RequestPriority.INTERACTIVE_READ: 4,
+    RequestPriority.BACKGROUND: 4
+}
+
+_PRIORITY: ContextVar[RequestPriority | None] = ContextVar("pyroostermoney_priority",
+                                                           default=None)
+
+@contextmanager
+def request_priority(priority: RequestPriority):
+    """Sends every request made inside the block (including tasks it starts) with priority."""
+    token = _PRIORITY.set(priority)
+    try:
+        yield
+    finally:
+        _PRIORITY.reset(token)
+
+def background_requests():
+    """Marks every request made inside the block as a background refresh."""
+    return request_priority(RequestPriority.BACKGROUND)
+
+class RequestScheduler:
+    """Limits the requests in flight per priority class.
+    shares maps each RequestPriority to the requests it may have in flight at once."""
+
+    def __init__(self, shares: dict[RequestPriority, int] | None = None) -> None:
+        self.shares = {**DEFAULT_SHARES, **(shares or {})}
+        if any(share < 1 for share in self.shares.values()):
+            raise ValueError("Every share must be at least 1")
+        self._semaphores: dict[RequestPriority, asyncio.Semaphore] = {}
+        self._loop = None
+        self._stats = {priority: {"in_flight": 0, "waiting": 0, "requests": 0, "wait_time": 0.0}
+                       for priority in self.shares}
+
+    @staticmethod
+    def priority_for(method: str) -> RequestPriority:
+        """Returns the priority of a request sent now."""
+        priority = _PRIORITY.get()
+        if priority is not None:
+            return priority
+        if method.upper() == "GET":
+            return RequestPriority.INTERACTIVE_READ
+        return RequestPriority.INTERACTIVE_WRITE
+
+    def _semaphore(self, priority: RequestPriority) -> asyncio.Semaphore:
+        """Returns the semaphore of a class, new ones are made for a new event loop."""
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._semaphores = {p: asyncio.Semaphore(share) for p, share in self.shares.items()}
+        return self._semaphores[priority]
+
+    def has_capacity(self, method: str) -> bool:
+        """Returns True if the class of a request sent now has a free slot."""
+        return not self._semaphore(self.priority_for(method)).locked()
+
+    @asynccontextmanager
+    async def slot(self, method: str):
+        """Waits for a free slot in the class of the request."""
+        priority = self.priority_for(method)
+        stats = self._stats[priority]
+        semaphore = self._semaphore(priority)
+        start = time.perf_counter()
+        stats["waiting"] += 1
+        try:
+            await semaphore.acquire()
+        finally:
+            stats["waiting"] -= 1
+        stats["wait_time"] += time.perf_counter() - start
+        stats["requests"] += 1
+        stats["in_flight"] += 1
+        try:
+            yield priority
+        finally:
+            stats["in_flight"] -= 1
+            semaphore.release()
+
+    def stats(self) -> dict[RequestPriority, dict]:
+        """Returns the requests in flight, waiting and sent so far, and the total time spent
+        waiting for a slot, per class."""
+        return {priority: dict(stats) for priority, stats in self._stats.items()}
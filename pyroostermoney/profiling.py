@@ -0,0 +1,151 @@
+"""Update profiling.
+
+A profile is a tree of spans (update, then phase, then child, then
+resource) held in a contextvar, so requests and events are charged to the
+span they were made in, including from tasks started inside it. Requests
+record their network time, decode time and size, and events record their
+dispatch time. Time spent waiting (for a priority slot, before retrying a
+reset connection or before hedging) is recorded as wait. Only the copy of a
+hedged request that won is charged. Outside a profile every hook is a single
+contextvar lookup.
+"""
+# pylint: disable=too-many-instance-attributes
+import json
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+_SPAN: ContextVar['Span | None'] = ContextVar("pyroostermoney_span", default=None)
+
+class Span:
+    """A timed phase of a profile."""
+
+    __slots__ = ("name", "children", "start", "end", "network", "decode", "events",
+                 "wait", "requests", "bytes")
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.children: list[Span] = []
+        self.start = time.perf_counter()
+        self.end: float | None = None
+        self.network = 0.0
+        self.decode = 0.0
+        self.events = 0.0
+        self.wait = 0.0
+        self.requests = 0
+        self.bytes = 0
+
+    @property
+    def duration(self) -> float:
+        """Seconds the span took (so far if still open)."""
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+    def as_dict(self) -> dict:
+        """Returns the span and its children, with the times of the children included.
+        parse is the time not spent on the network, dispatching events or waiting,
+        which is mostly decoding and building the models."""
+        children = [child.as_dict() for child in self.children]
+        totals = {key: getattr(self, key) + sum(child[key] for child in children)
+                  for key in ("network", "decode", "events", "wait", "requests", "bytes")}
+        duration = self.duration
+        return {
+            "name": self.name,
+            "duration": duration,
+            "network": totals["network"],
+            "parse": max(0.0, duration - totals["network"] - totals["events"] - totals["wait"]),
+            "decode": totals["decode"],
+            "events": totals["events"],
+            "wait": totals["wait"],
+            "requests": totals["requests"],
+            "bytes": totals["bytes"],
+            "children": children
+        }
+
+class UpdateReport:
+    """The timing tree of a profiled update."""
+
+    def __init__(self, root: Span) -> None:
+        self.root = root
+
+    def __repr__(self) -> str:
+        return f"UpdateReport({self.root.name}, duration={self.root.duration:.3f}s)"
+
+    def as_dict(self) -> dict:
+        """Returns the timing tree."""
+        return self.root.as_dict()
+
+    def to_json(self) -> str:
+        """Returns the timing tree as JSON."""
+        return json.dumps(self.as_dict())
+
+@contextmanager
+def profile(name: str):
+    """Profiles the block, yielding its UpdateReport."""
+    root = Span(name)
+    token = _SPAN.set(root)
+    try:
+        yield UpdateReport(root)
+    finally:
+        root.end = time.perf_counter()
+        _SPAN.reset(token)
+
+@contextmanager
+def span(name: str):
+    """Times the block as a child of the current span, does nothing outside a profile."""
+    parent = _SPAN.get()
+    if parent is None:
+        yield None
+        return
+    child = Span(name)
+    parent.children.append(child)
+    token = _SPAN.set(child)
+    try:
+        yield child
+    finally:
+        child.end = time.perf_counter()
+        _SPAN.reset(token)
+
+def record_request(network: float, decode: float, size: int):
+    """Charges a request to the current span."""
+    current = _SPAN.get()
+    if current is not None:
+        current.requests += 1
+        current.network += network
+        current.decode += decode
+        current.bytes += size
+
+@contextmanager
+def capture():
+    """Records what happens inside the block in a detached span instead of the current
+    one, yielding it (None outside a profile) so it can be charged later with merge()."""
+    if _SPAN.get() is None:
+        yield None
+        return
+    captured = Span("captured")
+    token = _SPAN.set(captured)
+    try:
+        yield captured
+    finally:
+        captured.end = time.perf_counter()
+        _SPAN.reset(token)
+
+def merge(captured: Span | None):
+    """Charges a span recorded by capture() to the current span."""
+    current = _SPAN.get()
+    if current is None or captured is None:
+        return
+    for key in ("network", "decode", "events", "wait", "requests", "bytes"):
+        setattr(current, key, getattr(current, key) + getattr(captured, key))
+    current.children.extend(captured.children)
+
+def record_wait(seconds: float):
+    """Charges time spent waiting to the current span."""
+    current = _SPAN.get()
+    if current is not None:
+        current.wait += seconds
+
+def record_events(seconds: float):
+    """Charges event dispatch time to the current span."""
+    current = _SPAN.get()
+    if current is not None:
+        current.events += seconds
@@ -0,0 +1,156 @@
+"""Optimistic updates and background reconciliation.
+
+Mutations apply their effect to the in-memory models as soon as the server
+accepts them and fire an event flagged as optimistic. The touched resources
+are then refetched in the background after a short delay, coalescing
+several writes to the same resource into a single request. The refetch
+either confirms the optimistic state or replaces it, in which case the
+usual change events fire for the corrected fields.
+"""
+import asyncio
+import logging
+
+from .diff import (
+    CARD_FIELDS,
+    CHILD_FIELDS,
+    FAMILY_ACCOUNT_FIELDS,
+    JOB_FIELDS,
+    POT_FIELDS,
+    STANDING_ORDER_FIELDS,
+    snapshot,
+    snapshot_collection
+)
+from .events import EventSource, EventType
+from .priority import background_requests
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_RECONCILE_DELAY = 5.0
+
+# resources that are not child resources
+PROFILE = "profile"
+ACCOUNT_INFO = "account_info"
+FAMILY_ACCOUNT = "family_account"
+MASTER_JOBS = "master_jobs"
+
+# resource -> snapshot used to tell if a refetch confirmed the optimistic state
+SNAPSHOTS = {
+    PROFILE: lambda session, child: snapshot(child, CHILD_FIELDS),
+    FAMILY_ACCOUNT: lambda session, child: snapshot(session.family_account,
+                                                    FAMILY_ACCOUNT_FIELDS),
+    MASTER_JOBS: lambda session, child: snapshot_collection(session.master_jobs.jobs,
+                                                            "master_job_id", JOB_FIELDS),
+    "pots": lambda session, child: snapshot_collection(child.pots, "pot_id", POT_FIELDS),
+    "jobs": lambda session, child: snapshot_collection(child.jobs, "scheduled_job_id",
+                                                       JOB_FIELDS),
+    "card": lambda session, child: snapshot(child.card, CARD_FIELDS),
+    "standing_orders": lambda session, child: snapshot_collection(
+        child.standing_orders, "regular_id", STANDING_ORDER_FIELDS)
+}
+
+async def refresh_resource(session, child, resource: str):
+    """Refetches a single resource of a child, or a family wide resource."""
+    if resource == FAMILY_ACCOUNT:
+        await session.family_account.update()
+        session.family_balance = session.family_account.balance
+    elif resource == MASTER_JOBS:
+        await session.master_jobs.update()
+        session.master_job_list = session.master_jobs.jobs
+    elif resource == ACCOUNT_INFO:
+        await session.update_children()
+    elif resource == PROFILE:
+        await child.refresh_profile()
+    else:
+        await child.load_resource(resource)
+
+class Reconciler:
+    """Applies optimistic changes and schedules their background reconciliation.
+    A delay of None disables the background refetch."""
+
+    def __init__(self, session, delay: float | None = DEFAULT_RECONCILE_DELAY) -> None:
+        self._session = session
+        self.delay = delay
+        self._pending: dict[tuple, asyncio.Task] = {}
+
+    @property
+    def pending(self) -> list[tuple]:
+        """The (user_id, resource) pairs waiting to be reconciled."""
+        return list(self._pending)
+
+    def apply(self,
+              source: EventSource,
+              user_id: int | None,
+              resource: str,
+              changes: dict,
+              schedule: bool = True,
+              **metadata):
+        """Fires an optimistic update event and, if schedule is set, schedules the
+        resource for reconciliation."""
+        if len(changes) > 0:
+            self._session.events.fire_event(source, EventType.UPDATED, {
+                "user_id": user_id,
+                "resource": resource,
+                "changes": changes,
+                "optimistic": True,
+                **metadata
+            })
+        if schedule:
+            self.schedule(user_id, resource)
+
+    def schedule(self, user_id: int | None, *resources: str):
+        """Schedules resources to be refetched, restarting the delay if already scheduled."""
+        if self.delay is None:
+            return
+        for resource in resources:
+            self.discard(user_id, resource)
+            self._pending[(user_id, resource)] = asyncio.create_task(
+                self._reconcile(user_id, resource))
+
+    def discard(self, user_id: int | None, resource: str):
+        """Cancels a scheduled reconciliation, used when the resource was just refetched."""
+        task = self._pending.pop((user_id, resource), None)
+        if task is not None and task is not asyncio.current_task():
+            task.cancel()
+
+    def cancel(self):
+        """Cancels every scheduled reconciliation."""
+        for key in list(self._pending):
+            self.discard(*key)
+
+    def job_owner(self, scheduled_job_id: int) -> int | None:
+        """Returns the user ID of the child holding a scheduled job."""
+        for child in getattr(self._session, "children", []):
+            if any(job.scheduled_job_id == scheduled_job_id for job in child.jobs):
+                return child.user_id
+        return None
+
+    async def flush(self):
+        """Reconciles every scheduled resource now."""
+        pending = list(self._pending)
+        for key in pending:
+            self.discard(*key)
+        await asyncio.gather(*[self._reconcile(*key, delay=0) for key in pending],
+                             return_exceptions=True)
+
+    async def _reconcile(self, user_id: int | None, resource: str, delay: float | None = None):
+        """Refetches a resource once the delay has passed."""
+        await asyncio.sleep(self.delay if delay is None else delay)
+        self._pending.pop((user_id, resource), None)
+        child = self._session.get_child_account(user_id) if user_id is not None else None
+        if user_id is not None and child is None:
+            _LOGGER.debug("Not reconciling %s of removed child %s", resource, user_id)
+            return
+        take_snapshot = SNAPSHOTS.get(resource, lambda session, child: {})
+        try:
+            optimistic = take_snapshot(self._session, child)
+            with background_requests():
+                await refresh_resource(self._session, child, resource)
+        except Exception as exc: # pylint: disable=broad-exception-caught
+            _LOGGER.error("Unable to reconcile %s of %s: %s", resource, user_id, exc)
+            return
+        self._session.events.fire_event(EventSource.INTERNAL, EventType.UPDATED, {
+            "update_state": "reconciled",
+            "user_id": user_id,
+            "resource": resource,
+            "confirmed": optimistic == take_snapshot(self._session, child)
+        })
@@ -0,0 +1,55 @@
+"""Refresh results."""
+from datetime import datetime
+
+from .profiling import UpdateReport
+
+class UpdateResult:
+    """Summary of a refresh.
+    errors maps (user_id, resource) to the error that resource failed with, user_id is
+    None for family wide resources. Failed resources keep their last good data.
+    stale lists the URLs that were served from their last good response.
+    report is the UpdateReport of a profiled update."""
+
+    def __init__(self,
+                 started: datetime,
+                 finished: datetime,
+                 errors: dict[tuple, Exception],
+                 stale: list[str],
+                 report: UpdateReport | None = None) -> None:
+        self.started = started
+        self.finished = finished
+        self.errors = errors
+        self.stale = stale
+        self.report = report
+
+    def __repr__(self) -> str:
+        return (f"UpdateResult(success={self.success}, failed={self.failed}, "
+                f"stale={len(self.stale)}, duration={self.duration:.2f}s)")
+
+    @property
+    def success(self) -> bool:
+        """True if every resource was refreshed."""
+        return len(self.errors) == 0
+
+    @property
+    def failed(self) -> list[tuple]:
+        """The (user_id, resource) pairs that failed."""
+        return list(self.errors)
+
+    @property
+    def duration(self) -> float:
+        """Seconds the refresh took."""
+        return (self.finished - self.started).total_seconds()
+
+    def as_dict(self) -> dict:
+        """Returns the result as a dict of plain values."""
+        output = {
+            "success": self.success,
+            "duration": self.duration,
+            "errors": [{"user_id": user_id, "resource": resource, "error": repr(error)}
+                       for (user_id, resource), error in self.errors.items()],
+            "stale": list(self.stale)
+        }
+        if self.report is not None:
+            output["report"] = self.report.as_dict()
+        return output
@@ -1,15 +1,44 @@
 """The RoosterMoney integration."""
 # pylint: disable=too-many-instance-attributes
 # pylint: disable=too-many-arguments
+# pylint: disable=too-many-locals
 
+import asyncio
+import gzip
 import logging
+import os
+from contextlib import nullcontext
+from datetime import datetime
+from collections.abc import Callable, Iterable
 
 from .const import URLS
-from .child import ChildAccount, Job
+from .child.account import ChildAccount
+from .child.jobs import Job
 from .family_account import FamilyAccount
 from .api import RoosterSession
-from .events import EventSource, EventType
+from .batch import MutationBatch
+from .codec import JsonCodec
+from .token_store import TokenStore
+from .enum import JobActions, JobState
+from .events import EventSource, EventType, DEFAULT_JOURNAL_SIZE
 from .master_jobs import MasterJobs
+from .state import snapshot_state, restore_state
+from .tasks import gather_limited, request_deadline, DEFAULT_MAX_CONCURRENCY
+from .reconcile import DEFAULT_RECONCILE_DELAY, ACCOUNT_INFO, FAMILY_ACCOUNT, MASTER_JOBS
+from .reconcile import refresh_resource
+from .results import UpdateResult
+from .exceptions import SESSION_ERRORS
+from .api import DEFAULT_REQUEST_TIMEOUT
+from .breaker import CircuitBreakers
+from .priority import RequestScheduler, background_requests
+from .hedging import HedgingPolicy
+from .profiling import profile as start_profile, span
+from .scheduler import (
+    AdaptivePoller,
+    DEFAULT_POLL_INTERVAL,
+    DEFAULT_MIN_POLL_INTERVAL,
+    DEFAULT_MAX_POLL_INTERVAL
+)
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -17,8 +46,27 @@ class RoosterMoney(RoosterSession):
     """The RoosterMoney module."""
 
     def __init__(self,
-                 remove_card_information = False) -> None:
-        super().__init__()
+                 remove_card_information = False,
+                 event_journal_size: int = DEFAULT_JOURNAL_SIZE,
+                 event_journal_path: str | None = None,
+                 codec: JsonCodec | str | None = None,
+                 token_store: TokenStore | None = None,
+                 reconcile_delay: float | None = DEFAULT_RECONCILE_DELAY,
+                 request_timeout: float = DEFAULT_REQUEST_TIMEOUT,
+                 update_deadline: float | None = None,
+                 breakers: CircuitBreakers | None = None,
+                 request_scheduler: RequestScheduler | None = None,
+                 hedging: HedgingPolicy | None = None) -> None:
+        super().__init__(event_journal_size=event_journal_size,
+                         event_journal_path=event_journal_path,
+                         codec=codec,
+                         token_store=token_store,
+                         reconcile_delay=reconcile_delay,
+                         request_timeout=request_timeout,
+                         breakers=breakers,
+                         request_scheduler=request_scheduler,
+                         hedging=hedging)
+        self.update_deadline = update_deadline
         self.account_info = None
         self.children: list[ChildAccount] = []
         self.master_job_list: list[Job] = []
@@ -27,49 +75,226 @@ class RoosterMoney(RoosterSession):
         self.family_account: FamilyAccount = None
         self._remove_card_information = remove_card_information
         self._init = True
+        self._revalidate_task: asyncio.Task = None
+        self._lazy = False
+        self._prefetch_task: asyncio.Task = None
+        self.last_update: UpdateResult = None
+        self.profile_updates = False
 
     @classmethod
     async def create(cls,
                  username: str,
                  password: str,
-                 remove_card_information = False):
-        """Starts a online session with Rooster Money"""
-        self = cls(remove_card_information=remove_card_information)
+                 remove_card_information = False,
+                 event_journal_size: int = DEFAULT_JOURNAL_SIZE,
+                 event_journal_path: str | None = None,
+                 codec: JsonCodec | str | None = None,
+                 snapshot: str | None = None,
+                 token_store: TokenStore | None = None,
+                 lazy: bool = False,
+                 prefetch: bool = False,
+                 reconcile_delay: float | None = DEFAULT_RECONCILE_DELAY,
+                 request_timeout: float = DEFAULT_REQUEST_TIMEOUT,
+                 update_deadline: float | None = None,
+                 breakers: CircuitBreakers | None = None,
+                 request_scheduler: RequestScheduler | None = None,
+                 hedging: HedgingPolicy | None = None):
+        """Starts a online session with Rooster Money.
+        If snapshot is the path of a file written by RoosterMoney.snapshot, the state is
+        restored from it and returned immediately while it is revalidated in the background.
+        If lazy is set, children are created from the account info with only their profile,
+        their other resources are fetched by ChildAccount.ensure_loaded / hydrate, or in the
+        background if prefetch is also set.
+        Writes are applied to the local state straight away and refetched after
+        reconcile_delay seconds (None disables the refetch).
+        Requests time out after request_timeout seconds and update() is bounded to
+        update_deadline seconds, endpoints that keep failing are served from their last
+        known data (see RoosterSession.request_handler). request_scheduler sets the
+        concurrency share of interactive and background requests, hedging enables hedged
+        GETs."""
+        self = cls(remove_card_information=remove_card_information,
+                   event_journal_size=event_journal_size,
+                   event_journal_path=event_journal_path,
+                   codec=codec,
+                   token_store=token_store,
+                   reconcile_delay=reconcile_delay,
+                   request_timeout=request_timeout,
+                   update_deadline=update_deadline,
+                   breakers=breakers,
+                   request_scheduler=request_scheduler,
+                   hedging=hedging)
+        self._lazy = lazy
+        if snapshot is not None and os.path.exists(snapshot):
+            try:
+                self._load_snapshot(snapshot)
+            except (OSError, ValueError, KeyError, TypeError) as exc:
+                _LOGGER.warning("Unable to restore snapshot %s: %s", snapshot, exc)
+                self = cls(remove_card_information=remove_card_information,
+                           event_journal_size=event_journal_size,
+                           event_journal_path=event_journal_path,
+                           codec=codec,
+                           token_store=token_store,
+                           reconcile_delay=reconcile_delay,
+                           request_timeout=request_timeout,
+                           update_deadline=update_deadline,
+                           breakers=breakers,
+                           request_scheduler=request_scheduler,
+                           hedging=hedging)
+                self._lazy = lazy
+            else:
+                self._username = username
+                self._password = password
+                self._init = False
+                self._revalidate_task = asyncio.create_task(self._revalidate())
+                return self
         await self._session_start(username, password)
         await self.get_family_account()
         self.family_id = self.family_account.family_id
         self.family_balance = self.family_account.balance
         self.master_jobs = MasterJobs(self)
+        if lazy:
+            # account info was fetched with the family account, reuse it
+            await self.update_children(self.account_info)
+            self._init = False
+            if prefetch:
+                self._prefetch_task = asyncio.create_task(self._prefetch())
+            return self
         await self.update()
         self._init = False
         return self
 
-    async def update(self):
-        """Perform an update of all root types"""
+    async def _prefetch(self):
+        """Hydrates every child and fetches the master jobs in the background."""
+        with background_requests():
+            results = await asyncio.gather(self.master_jobs.update(),
+                                           *[child.hydrate() for child in self.children],
+                                           return_exceptions=True)
+        self.master_job_list = self.master_jobs.jobs
+        for result in results:
+            if isinstance(result, Exception):
+                _LOGGER.error("Background prefetch failed: %s", result)
+        self.events.fire_event(EventSource.INTERNAL,
+                               EventType.UPDATED,
+                               {"update_state": "prefetched"})
+
+    def snapshot(self, path: str | None = None) -> dict:
+        """Captures the full model state, optionally writing it to a gzip compressed file.
+        The file holds the session token so it is only readable by the current user."""
+        state = snapshot_state(self)
+        if path is not None:
+            data = gzip.compress(self.codec.encode(state))
+            temp_path = f"{path}.tmp"
+            with open(os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600),
+                      "wb") as file:
+                file.write(data)
+            os.replace(temp_path, path)
+        return state
+
+    def _load_snapshot(self, path: str):
+        """Restores the model state from a snapshot file."""
+        with open(path, "rb") as file:
+            restore_state(self, self.codec.decode(gzip.decompress(file.read())))
+        self.events.fire_event(EventSource.INTERNAL,
+                               EventType.UPDATED,
+                               {"update_state": "restored"})
+
+    async def _revalidate(self):
+        """Refreshes a restored state, firing change events for anything that changed."""
+        try:
+            if self._session is None:
+                await self._session_start(self._username, self._password)
+            await self.update()
+            with background_requests():
+                if self._remove_card_information is False:
+                    for child in self.children:
+                        if child.card is not None and child.card.pin is None:
+                            await child.card.init_card_pin()
+        except Exception as exc: # pylint: disable=broad-exception-caught
+            _LOGGER.error("Unable to revalidate restored state: %s", exc)
+            return
+        self.events.fire_event(EventSource.INTERNAL,
+                               EventType.UPDATED,
+                               {"update_state": "revalidated"})
+
+    async def update(self,
+                     deadline: float | None = None,
+                     profile: bool | None = None) -> UpdateResult:
+        """Perform an update of all root types.
+        Requests still running after deadline seconds (update_deadline if not set) are cut
+        short and served from their last known data, listed in stale.
+        Every child and resource is refreshed on its own, one that fails keeps its last
+        good data and is listed in the returned result (also kept in last_update).
+        If profile is set (profile_updates if not set), the result carries an UpdateReport
+        timing each phase, child and resource, which is also sent with the finished event."""
         self.events.fire_event(EventSource.INTERNAL,
                                EventType.UPDATED,
                                {"update_state": "started"})
-        await self._update_children()
-        await self.master_jobs.update()
-        self.master_job_list = self.master_jobs.jobs
-        await self.family_account.update()
-        self.family_balance = self.family_account.balance
-        if self._init is False:
-            for child in self.children:
-                await child.update()
+        started = datetime.now()
+        errors = {}
+        profile = self.profile_updates if profile is None else profile
+        with (start_profile("update") if profile else nullcontext()) as report, \
+             background_requests(), \
+             request_deadline(self.update_deadline if deadline is None else deadline):
+            await self._isolate(errors, None, ACCOUNT_INFO, self.update_children())
+            await self._isolate(errors, None, MASTER_JOBS, self.master_jobs.update())
+            self.master_job_list = self.master_jobs.jobs
+            await self._isolate(errors, None, FAMILY_ACCOUNT, self.family_account.update())
+            self.family_balance = self.family_account.balance
+            if self._init is False:
+                with span("children"):
+                    for child in self.children:
+                        with span(f"child {child.user_id}"):
+                            for resource, error in (await child.update()).items():
+                                errors[(child.user_id, resource)] = error
+        self.last_update = UpdateResult(started, datetime.now(), errors, list(self.stale),
+                                        report)
         self.events.fire_event(EventSource.INTERNAL,
                                EventType.UPDATED,
-                               {"update_state": "finished"})
+                               {"update_state": "finished", **self.last_update.as_dict()})
+        return self.last_update
+
+    async def refresh_failed(self, result: UpdateResult | None = None) -> UpdateResult:
+        """Refreshes only the resources that failed in result (last_update if not set)."""
+        result = result or self.last_update
+        started = datetime.now()
+        errors = {}
+        with background_requests():
+            for (user_id, resource) in (result.failed if result is not None else []):
+                child = self.get_child_account(user_id) if user_id is not None else None
+                if user_id is not None and child is None:
+                    continue
+                await self._isolate(errors, user_id, resource,
+                                    refresh_resource(self, child, resource))
+        return UpdateResult(started, datetime.now(), errors, list(self.stale))
 
-    async def _update_children(self):
-        """Updates the list of available children."""
-        account_info = await self.get_account_info()
+    @staticmethod
+    async def _isolate(errors: dict, user_id: int | None, resource: str, awaitable):
+        """Awaits a refresh, recording its error instead of raising it.
+        Session errors are raised as they affect every resource."""
+        try:
+            with span(resource):
+                await awaitable
+        except SESSION_ERRORS:
+            raise
+        except Exception as exc: # pylint: disable=broad-exception-caught
+            _LOGGER.warning("Unable to refresh %s of %s: %s", resource, user_id, exc)
+            errors[(user_id, resource)] = exc
+
+    async def update_children(self, account_info: dict | None = None):
+        """Updates the list of available children (from the account info)."""
+        if account_info is None:
+            account_info = await self.get_account_info()
         children = account_info["children"]
         for child in children:
             if child.get("userId") not in self._discovered_children:
-                child = await ChildAccount.create(child.get("userId"),
-                                                self,
-                                                self._remove_card_information)
+                if self._lazy:
+                    child = ChildAccount.from_profile(child,
+                                                      self,
+                                                      self._remove_card_information)
+                else:
+                    child = await ChildAccount.create(child.get("userId"),
+                                                      self,
+                                                      self._remove_card_information)
                 self._discovered_children.append(child.user_id)
                 self.children.append(child)
                 self.events.fire_event(EventSource.CHILD, EventType.CREATED, {
@@ -99,9 +324,84 @@ class RoosterMoney(RoosterSession):
         self.account_info = self.account_info["response"]
         return self.account_info
 
-    def get_child_account(self, user_id) -> ChildAccount:
-        """Fetches and returns a given child account details."""
-        return [x for x in self.children if x.user_id == user_id][0]
+    def get_child_account(self, user_id) -> ChildAccount | None:
+        """Fetches and returns a given child account details, None if there is no such child."""
+        return next((x for x in self.children if x.user_id == user_id), None)
+
+    async def _find_jobs(self,
+                         jobs: Iterable[Job] | Callable[[Job], bool] | None
+                         ) -> list[tuple[ChildAccount | None, Job]]:
+        """Returns (child, job) for the given jobs or for the jobs matching a filter."""
+        if jobs is None or callable(jobs):
+            job_filter = jobs or (lambda job: job.state == JobState.AWAITING_APPROVAL)
+            output = []
+            for child in self.children:
+                await child.ensure_loaded("jobs")
+                output.extend((child, job) for job in child.jobs if job_filter(job))
+            return output
+        owners = {job.scheduled_job_id: child for child in self.children for job in child.jobs}
+        return [(owners.get(job.scheduled_job_id), job) for job in jobs]
+
+    async def approve_jobs(self,
+                           jobs: Iterable[Job] | Callable[[Job], bool] | None = None,
+                           message: str = "",
+                           max_concurrency: int = DEFAULT_MAX_CONCURRENCY) -> list[dict]:
+        """Approves jobs concurrently, at most max_concurrency at a time.
+        jobs is a list of jobs or a filter called with every job of every child,
+        by default all jobs awaiting approval are approved. A failed approval does not
+        stop the others. The jobs and pots of the affected children are refreshed once
+        at the end. Returns a result dict per job."""
+        found = await self._find_jobs(jobs)
+        responses = await gather_limited(
+            [job.job_action(JobActions.APPROVE, message) for _, job in found],
+            max_concurrency)
+        results = []
+        affected: list[ChildAccount] = []
+        for (child, job), response in zip(found, responses):
+            success = not isinstance(response, Exception)
+            if not success:
+                _LOGGER.warning("Unable to approve job %s: %s", job.scheduled_job_id, response)
+            elif child is not None and child not in affected:
+                affected.append(child)
+            results.append({
+                "scheduled_job_id": job.scheduled_job_id,
+                "user_id": child.user_id if child is not None else None,
+                "title": job.title,
+                "success": success,
+                "error": None if success else response
+            })
+        refreshed = await gather_limited(
+            [child.load_resource(resource) for child in affected for resource in ("jobs", "pots")],
+            max_concurrency)
+        for result in refreshed:
+            if isinstance(result, Exception):
+                _LOGGER.error("Unable to refresh after approving jobs: %s", result)
+        return results
+
+    async def close(self):
+        """Stops the background revalidation and prefetch, then closes the session."""
+        for task in (self._revalidate_task, self._prefetch_task):
+            if task is not None and not task.done():
+                task.cancel()
+        await super().close()
+
+    def adjust_family_balance(self, delta: float):
+        if self.family_account is not None and self.family_balance is not None:
+            self.family_account.balance = round(self.family_balance + delta, 2)
+        super().adjust_family_balance(delta)
+
+    def batch(self, max_concurrency: int = DEFAULT_MAX_CONCURRENCY) -> MutationBatch:
+        """Returns a batch that queues writes and sends them concurrently when the
+        async with block exits, refreshing only the touched resources once."""
+        return MutationBatch(self, max_concurrency)
+
+    def poller(self,
+               interval: float = DEFAULT_POLL_INTERVAL,
+               min_interval: float = DEFAULT_MIN_POLL_INTERVAL,
+               max_interval: float = DEFAULT_MAX_POLL_INTERVAL) -> AdaptivePoller:
+        """Returns a poller that refreshes each resource on an interval adapted to its
+        recent activity, call start() to begin polling."""
+        return AdaptivePoller(self, interval, min_interval, max_interval)
 
     async def get_family_account(self) -> FamilyAccount:
         """Gets family account details (/parent/family/account)"""
@@ -0,0 +1,199 @@
+"""Activity adaptive polling.
+
+Every child resource (and the family wide resources) gets its own poll
+interval. A poll that finds a change drops the interval of that resource,
+and of the resources a change usually spills into, to min_interval. Idle
+polls grow the interval exponentially until it reaches max_interval, the
+slowest poll rate. Resources that are waiting on the parent, like a job
+awaiting approval, stay at min_interval.
+"""
+# pylint: disable=too-many-arguments
+# pylint: disable=too-many-instance-attributes
+import asyncio
+import logging
+
+from .child.account import RESOURCES
+from .enum import JobState
+from .reconcile import SNAPSHOTS, PROFILE, FAMILY_ACCOUNT, MASTER_JOBS, refresh_resource
+from .tasks import gather_limited, cancel_task, DEFAULT_MAX_CONCURRENCY
+from .priority import background_requests
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_POLL_INTERVAL = 60.0
+DEFAULT_MIN_POLL_INTERVAL = 15.0
+DEFAULT_MAX_POLL_INTERVAL = 900.0
+DEFAULT_BACKOFF = 2.0
+
+# resource -> snapshot compared before and after a poll to detect activity
+ACTIVITY_SNAPSHOTS = {
+    **SNAPSHOTS,
+    "transactions": lambda session, child: child.transaction_keys(),
+    "allowance_period": lambda session, child: {"id": child.active_allowance_period_id}
+}
+
+# a change to a resource also speeds up the polling of these resources
+LINKED_RESOURCES = {
+    "transactions": ("card", "pots", PROFILE),
+    "card": ("transactions",),
+    "jobs": ("pots", PROFILE),
+    PROFILE: ("pots",)
+}
+
+# resource -> check that keeps the resource at min_interval while it holds
+HOT = {
+    "jobs": lambda session, child: any(job.state == JobState.AWAITING_APPROVAL
+                                       for job in child.jobs)
+}
+
+class AdaptivePoller:
+    """Polls each resource on its own activity driven interval.
+    interval is the starting interval and the fixed polling rate the savings are
+    measured against. Every poll is counted as one request."""
+
+    def __init__(self,
+                 session,
+                 interval: float = DEFAULT_POLL_INTERVAL,
+                 min_interval: float = DEFAULT_MIN_POLL_INTERVAL,
+                 max_interval: float = DEFAULT_MAX_POLL_INTERVAL,
+                 backoff: float = DEFAULT_BACKOFF,
+                 max_concurrency: int = DEFAULT_MAX_CONCURRENCY) -> None:
+        if not 0 < min_interval <= interval <= max_interval:
+            raise ValueError("Expected 0 < min_interval <= interval <= max_interval")
+        if backoff <= 1:
+            raise ValueError("backoff must be greater than 1")
+        self._session = session
+        self.interval = interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.max_concurrency = max_concurrency
+        self._state: dict[tuple, dict] = {}
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task = None
+
+    @property
+    def running(self) -> bool:
+        """True while the poller is running."""
+        return self._task is not None and not self._task.done()
+
+    def intervals(self) -> dict[tuple, float]:
+        """Returns the current interval of each (user_id, resource)."""
+        return {key: state["interval"] for key, state in self._state.items()}
+
+    def start(self):
+        """Starts polling in the background."""
+        if self.running:
+            return
+        self._sync()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stops polling."""
+        await cancel_task(self._task)
+        self._task = None
+
+    def notify(self, user_id: int | None, *resources: str):
+        """Reports activity seen elsewhere (such as a push notification),
+        the resources are polled at min_interval again."""
+        now = asyncio.get_running_loop().time()
+        for resource in resources:
+            self._speed_up((user_id, resource), now)
+        self._wakeup.set()
+
+    def report(self) -> dict:
+        """Returns the requests sent so far and the requests fixed polling at
+        interval would have sent over the same time."""
+        now = asyncio.get_running_loop().time()
+        requests = sum(state["polls"] for state in self._state.values())
+        fixed = sum(int((now - state["added"]) // self.interval)
+                    for state in self._state.values())
+        return {
+            "resources": len(self._state),
+            "requests": requests,
+            "changes": sum(state["changes"] for state in self._state.values()),
+            "fixed_requests": fixed,
+            "saved": fixed - requests,
+            "intervals": self.intervals()
+        }
+
+    def _keys(self) -> list[tuple]:
+        """Returns the resources to poll, only resources a lazy child has loaded."""
+        keys = [(None, FAMILY_ACCOUNT), (None, MASTER_JOBS)]
+        for child in self._session.children:
+            keys.append((child.user_id, PROFILE))
+            keys.extend((child.user_id, resource) for resource in RESOURCES
+                        if child.is_loaded(resource))
+        return keys
+
+    def _sync(self):
+        """Adds new children and resources, and drops those that are gone."""
+        now = asyncio.get_running_loop().time()
+        keys = self._keys()
+        for key in keys:
+            if key not in self._state:
+                self._state[key] = {
+                    "interval": self.interval,
+                    "due": now + self.interval,
+                    "added": now,
+                    "polls": 0,
+                    "changes": 0
+                }
+        for key in set(self._state) - set(keys):
+            self._state.pop(key)
+
+    def _speed_up(self, key: tuple, now: float):
+        """Drops the interval of a resource to min_interval."""
+        state = self._state.get(key)
+        if state is None:
+            return
+        state["interval"] = self.min_interval
+        state["due"] = min(state["due"], now + self.min_interval)
+
+    async def _poll(self, key: tuple):
+        """Polls a resource and adapts its interval to what it found."""
+        user_id, resource = key
+        child = self._session.get_child_account(user_id) if user_id is not None else None
+        if user_id is not None and child is None:
+            # the child was removed, _sync drops its resources
+            return
+        take_snapshot = ACTIVITY_SNAPSHOTS.get(resource, lambda session, child: {})
+        state = self._state[key]
+        changed = False
+        try:
+            before = take_snapshot(self._session, child)
+            with background_requests():
+                await refresh_resource(self._session, child, resource)
+            changed = before != take_snapshot(self._session, child)
+        except Exception as exc: # pylint: disable=broad-exception-caught
+            _LOGGER.error("Unable to poll %s of %s: %s", resource, user_id, exc)
+        state["polls"] += 1
+        now = asyncio.get_running_loop().time()
+        hot = resource in HOT and child is not None and HOT[resource](self._session, child)
+        if changed or hot:
+            state["changes"] += int(changed)
+            state["interval"] = self.min_interval
+        else:
+            state["interval"] = min(self.max_interval, state["interval"] * self.backoff)
+        state["due"] = now + state["interval"]
+        if changed:
+            for linked in LINKED_RESOURCES.get(resource, ()):
+                self._speed_up((user_id, linked), now)
+
+    async def _run(self):
+        """Polls every resource once it is due."""
+        loop = asyncio.get_running_loop()
+        while True:
+            self._sync()
+            now = loop.time()
+            due = [key for key, state in self._state.items() if state["due"] <= now]
+            if len(due) > 0:
+                await gather_limited([self._poll(key) for key in due], self.max_concurrency)
+                continue
+            delay = min((state["due"] for state in self._state.values()),
+                        default=now + self.max_interval) - now
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
@@ -0,0 +1,75 @@
+"""Typed schemas for the hot API endpoints.
+
+Used by codecs that support typed decoding (msgspec) to decode responses
+straight into dicts holding only the fields the models read. Unknown fields
+are dropped during decoding rather than allocated and thrown away.
+"""
+from typing import Any, TypedDict
+
+class SpendHistoryEntry(TypedDict, total=False):
+    """An entry of api/parent/child/{user_id}/spendHistory."""
+    actionUserId: Any
+    amount: float
+    balance: float
+    currency: str
+    description: str
+    descriptionExtension: Any
+    guardianProfileImage: Any
+    id: Any
+    message: Any
+    resourceImageURL: Any
+    time: Any
+    transactionSource: Any
+    type: str
+    userId: int
+    declines: Any
+
+class JobEntry(TypedDict, total=False):
+    """A job of api/parent/child/{user_id}/allowance-periods/{id}/jobs."""
+    allowancePeriodId: int
+    currency: str
+    description: str
+    dueAnyDay: bool
+    dueDate: str
+    expiryProcessed: bool
+    finalRewardAmount: float
+    imageUrl: str
+    locked: bool
+    masterJobId: int
+    reopened: bool
+    rewardAmount: float
+    scheduledJobId: int
+    state: int
+    timeOfDay: int
+    title: str
+    type: int
+    childUserIds: list[int]
+    daysOfTheWeek: list[int]
+    scheduleType: Any
+    scheduleInfo: dict[str, Any]
+
+class PocketMoney(TypedDict, total=False):
+    """The response of api/parent/child/{user_id}/pocketmoney."""
+    potSettings: dict[str, Any]
+    safeTotal: float
+    saveGoalAmount: Any
+    allocatedToGoals: float
+    walletTotal: float
+    giveAmount: float
+    availablePocketMoney: float
+    pocketMoneyAmount: float
+    customPots: list[dict[str, Any]]
+
+class StatementEntry(TypedDict, total=False):
+    """An entry of api/parent/family/statement/{year}/{month}."""
+    reason: Any
+    transactionType: Any
+    creditAmount: dict[str, Any]
+    debitAmount: dict[str, Any]
+
+SCHEMAS = {
+    "get_child_spend_history": list[SpendHistoryEntry],
+    "get_child_allowance_period_jobs": dict[str, list[JobEntry]],
+    "get_child_pocket_money": PocketMoney,
+    "get_family_account_statement": list[StatementEntry]
+}
@@ -0,0 +1,263 @@
+"""Local push gateway.
+
+Runs a single RoosterMoney poller per family and streams its events to any
+number of WebSocket or Server-Sent Events clients. Every client receives a
+state snapshot when it connects, or the events it missed if it resumes with
+a sequence number that is still held in the event journal.
+
+Routes:
+    GET /families/{family}/state   current state snapshot
+    GET /families/{family}/ws      WebSocket stream (?since=<seq> to resume)
+    GET /families/{family}/events  SSE stream (Last-Event-ID or ?since=<seq> to resume)
+"""
+# pylint: disable=too-many-arguments
+# pylint: disable=too-many-instance-attributes
+# pylint: disable=too-few-public-methods
+import asyncio
+import json
+import logging
+
+from aiohttp import web, WSMsgType
+
+from .roostermoney import RoosterMoney
+from .events import EventSource, EventType
+from .exceptions import EventsMissed
+from .state import export_state
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_POLL_INTERVAL = 60
+DEFAULT_CLIENT_QUEUE_SIZE = 1000
+
+def _encode(message: dict) -> str:
+    """Encodes a message sent to clients."""
+    return json.dumps(message, default=str)
+
+class _Client:
+    """A connected client and its pending messages."""
+
+    def __init__(self, queue_size: int) -> None:
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.overflowed = False
+
+    def push(self, metadata: dict):
+        """Queues an event, flagging the client for a resync if it falls behind."""
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(metadata)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+class FamilyFeed:
+    """A single family poller shared by all of its clients."""
+
+    def __init__(self,
+                 name: str,
+                 username: str,
+                 password: str,
+                 poll_interval: int = DEFAULT_POLL_INTERVAL,
+                 client_queue_size: int = DEFAULT_CLIENT_QUEUE_SIZE,
+                 **create_kwargs) -> None:
+        self.name = name
+        self.rooster: RoosterMoney = None
+        self._username = username
+        self._password = password
+        self._poll_interval = poll_interval
+        self._client_queue_size = client_queue_size
+        self._create_kwargs = create_kwargs
+        self._clients: list[_Client] = []
+        self._poll_task: asyncio.Task = None
+
+    async def start(self):
+        """Logs in and starts the poll loop."""
+        self.rooster = await RoosterMoney.create(self._username,
+                                                 self._password,
+                                                 **self._create_kwargs)
+        self.rooster.events.subscribe(self._on_event,
+                                      EventSource.ALL,
+                                      EventType.ALL,
+                                      f"push_gateway_{self.name}")
+        self._poll_task = asyncio.create_task(self._poll())
+
+    async def stop(self):
+        """Stops the poll loop and closes the session."""
+        if self._poll_task is not None:
+            self._poll_task.cancel()
+            try:
+                await self._poll_task
+            except asyncio.CancelledError:
+                pass
+            self._poll_task = None
+        if self.rooster is not None:
+            await self.rooster.close()
+
+    async def _poll(self):
+        """Periodically updates the family."""
+        while True:
+            await asyncio.sleep(self._poll_interval)
+            try:
+                await self.rooster.update()
+            except Exception as exc: # pylint: disable=broad-exception-caught
+                _LOGGER.error("Update of family %s failed: %s", self.name, exc)
+
+    def _on_event(self, metadata: dict):
+        """Fans out an event to every connected client."""
+        for client in self._clients:
+            client.push(metadata)
+
+    def attach(self) -> _Client:
+        """Registers a new client."""
+        client = _Client(self._client_queue_size)
+        self._clients.append(client)
+        return client
+
+    def detach(self, client: _Client):
+        """Removes a client."""
+        if client in self._clients:
+            self._clients.remove(client)
+
+    def initial_messages(self, since_seq: int | None) -> list[dict]:
+        """Returns the messages a client needs when it (re)connects."""
+        if since_seq is not None:
+            try:
+                return [{"kind": "event", "event": self.rooster.events.build_metadata(x)}
+                        for x in self.rooster.events.replay(since_seq)]
+            except EventsMissed:
+                _LOGGER.debug("Client resume point %s no longer journaled", since_seq)
+        return [self.snapshot_message()]
+
+    def snapshot_message(self) -> dict:
+        """Returns a state snapshot message."""
+        return {"kind": "snapshot", "state": export_state(self.rooster)}
+
+    async def next_messages(self, client: _Client) -> list[dict]:
+        """Waits for the next messages for the client."""
+        if client.overflowed:
+            while not client.queue.empty():
+                client.queue.get_nowait()
+            client.overflowed = False
+            return [self.snapshot_message()]
+        return [{"kind": "event", "event": await client.queue.get()}]
+
+class PushGateway:
+    """Serves RoosterMoney change events to many clients over WebSocket and SSE."""
+
+    def __init__(self,
+                 families: dict[str, dict],
+                 poll_interval: int = DEFAULT_POLL_INTERVAL,
+                 client_queue_size: int = DEFAULT_CLIENT_QUEUE_SIZE) -> None:
+        """families maps a family name to the keyword arguments of RoosterMoney.create,
+        at least username and password."""
+        self.feeds: dict[str, FamilyFeed] = {
+            name: FamilyFeed(name,
+                             poll_interval=poll_interval,
+                             client_queue_size=client_queue_size,
+                             **config)
+            for name, config in families.items()
+        }
+        self._runner: web.AppRunner = None
+
+    def build_app(self) -> web.Application:
+        """Builds the aiohttp application."""
+        app = web.Application()
+        app.add_routes([
+            web.get("/families/{family}/state", self._handle_state),
+            web.get("/families/{family}/ws", self._handle_ws),
+            web.get("/families/{family}/events", self._handle_sse)
+        ])
+        return app
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8080):
+        """Starts every family poller and the HTTP server."""
+        await asyncio.gather(*[feed.start() for feed in self.feeds.values()])
+        self._runner = web.AppRunner(self.build_app())
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        _LOGGER.info("Push gateway listening on %s:%s", host, port)
+
+    async def stop(self):
+        """Stops the HTTP server and every family poller."""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+        await asyncio.gather(*[feed.stop() for feed in self.feeds.values()])
+
+    def _get_feed(self, request: web.Request) -> FamilyFeed:
+        """Returns the feed for the requested family."""
+        feed = self.feeds.get(request.match_info["family"])
+        if feed is None or feed.rooster is None:
+            raise web.HTTPNotFound()
+        return feed
+
+    @staticmethod
+    def _since(request: web.Request) -> int | None:
+        """Returns the sequence number a client wants to resume from."""
+        since = request.headers.get("Last-Event-ID", request.query.get("since"))
+        if since is None:
+            return None
+        try:
+            return int(since)
+        except ValueError as exc:
+            raise web.HTTPBadRequest(text="Invalid resume sequence") from exc
+
+    async def _handle_state(self, request: web.Request) -> web.Response:
+        """Returns a state snapshot."""
+        feed = self._get_feed(request)
+        return web.Response(text=_encode(feed.snapshot_message()),
+                            content_type="application/json")
+
+    async def _handle_ws(self, request: web.Request) -> web.WebSocketResponse:
+        """Streams events to a WebSocket client."""
+        feed = self._get_feed(request)
+        since = self._since(request)
+        ws = web.WebSocketResponse(heartbeat=30)
+        await ws.prepare(request)
+        client = feed.attach()
+
+        async def sender():
+            for message in feed.initial_messages(since):
+                await ws.send_str(_encode(message))
+            while True:
+                for message in await feed.next_messages(client):
+                    await ws.send_str(_encode(message))
+
+        send_task = asyncio.create_task(sender())
+        try:
+            async for msg in ws:
+                if msg.type == WSMsgType.ERROR:
+                    break
+        finally:
+            send_task.cancel()
+            feed.detach(client)
+        return ws
+
+    async def _handle_sse(self, request: web.Request) -> web.StreamResponse:
+        """Streams events to a Server-Sent Events client."""
+        feed = self._get_feed(request)
+        since = self._since(request)
+        response = web.StreamResponse(headers={
+            "Content-Type": "text/event-stream",
+            "Cache-Control": "no-cache"
+        })
+        await response.prepare(request)
+        client = feed.attach()
+
+        async def send(message: dict):
+            if message["kind"] == "event":
+                data = f"id: {message['event']['seq']}\ndata: {_encode(message)}\n\n"
+            else:
+                data = f"event: snapshot\ndata: {_encode(message)}\n\n"
+            await response.write(data.encode("utf-8"))
+
+        try:
+            for message in feed.initial_messages(since):
+                await send(message)
+            while True:
+                for message in await feed.next_messages(client):
+                    await send(message)
+        except ConnectionResetError:
+            pass
+        finally:
+            feed.detach(client)
+        return response
@@ -0,0 +1,421 @@
+"""Sharded polling across worker processes.
+
+Families are spread over a pool of worker processes with a consistent hash
+ring. Each worker runs its own event loop holding a RoosterMoney and an
+AdaptivePoller per family, so JSON decoding, model building and event
+dispatch scale across cores. Workers send batches of change events and
+their metrics back over a pipe, encoded as compact JSON. When a worker
+dies its families move to the remaining workers, and to a replacement
+worker if respawn is set. Because of the hash ring, only the families of
+the dead worker are moved.
+"""
+# pylint: disable=too-many-arguments
+# pylint: disable=too-many-instance-attributes
+import asyncio
+import bisect
+import functools
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from multiprocessing.connection import Connection, wait
+from typing import Any
+
+from .events import Events, DEFAULT_JOURNAL_SIZE
+from .enum import EventSource, EventType
+from .tasks import cancel_task
+from .scheduler import DEFAULT_POLL_INTERVAL, DEFAULT_MIN_POLL_INTERVAL, DEFAULT_MAX_POLL_INTERVAL
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_REPLICAS = 100
+DEFAULT_FLUSH_INTERVAL = 0.1
+DEFAULT_METRICS_INTERVAL = 10.0
+
+class HashRing:
+    """Consistent hash ring mapping keys to nodes.
+    Each node is placed on the ring replicas times, adding or removing a node
+    only moves the keys of that node."""
+
+    def __init__(self, nodes=(), replicas: int = DEFAULT_REPLICAS) -> None:
+        self.replicas = replicas
+        self._points: list[int] = []
+        self._nodes: dict[int, Any] = {}
+        for node in nodes:
+            self.add(node)
+
+    @staticmethod
+    def _hash(value: str) -> int:
+        """Returns the ring position of a value."""
+        return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(),
+                              "big")
+
+    @property
+    def nodes(self) -> set:
+        """The nodes on the ring."""
+        return set(self._nodes.values())
+
+    def add(self, node):
+        """Adds a node to the ring."""
+        for replica in range(self.replicas):
+            point = self._hash(f"{node}:{replica}")
+            if point not in self._nodes:
+                bisect.insort(self._points, point)
+            self._nodes[point] = node
+
+    def remove(self, node):
+        """Removes a node from the ring."""
+        for replica in range(self.replicas):
+            point = self._hash(f"{node}:{replica}")
+            if self._nodes.get(point) == node:
+                self._nodes.pop(point)
+                self._points.remove(point)
+
+    def get(self, key):
+        """Returns the node owning a key."""
+        if len(self._points) == 0:
+            raise LookupError("The hash ring is empty")
+        index = bisect.bisect(self._points, self._hash(str(key))) % len(self._points)
+        return self._nodes[self._points[index]]
+
+def _encode(messages: list) -> bytes:
+    """Encodes a batch of messages for the results pipe."""
+    return json.dumps(messages, default=str, separators=(",", ":")).encode("utf-8")
+
+def _worker_main(worker_id: int, commands: Connection, results: Connection, options: dict):
+    """Entry point of a worker process."""
+    asyncio.run(_Worker(worker_id, commands, results, options).run())
+
+class _Worker: # pylint: disable=too-few-public-methods
+    """Polls the families assigned to one worker process."""
+
+    def __init__(self, worker_id: int, commands: Connection, results: Connection,
+                 options: dict) -> None:
+        self._worker_id = worker_id
+        self._commands = commands
+        self._results = results
+        self._options = options
+        self._clients: dict[str, Any] = {}
+        self._pollers: dict[str, Any] = {}
+        self._adding: dict[str, asyncio.Task] = {}
+        self._outgoing: list = []
+        self._events = 0
+
+    def _read(self, loop: asyncio.AbstractEventLoop, queue: asyncio.Queue):
+        """Reads commands from the parent on a thread, stopping when the pipe closes."""
+        while True:
+            try:
+                command = self._commands.recv()
+            except (EOFError, OSError):
+                command = ("stop",)
+            loop.call_soon_threadsafe(queue.put_nowait, command)
+            if command[0] == "stop":
+                return
+
+    async def run(self):
+        """Handles commands until told to stop."""
+        queue = asyncio.Queue()
+        threading.Thread(target=self._read,
+                         args=(asyncio.get_running_loop(), queue),
+                         daemon=True).start()
+        flusher = asyncio.create_task(self._flush_loop())
+        while True:
+            command = await queue.get()
+            if command[0] == "stop":
+                break
+            if command[0] == "add":
+                self._adding[command[1]] = asyncio.create_task(self._add(*command[1:]))
+            elif command[0] == "remove":
+                await self._remove(command[1])
+        for family in [*self._adding, *self._clients]:
+            await self._remove(family)
+        flusher.cancel()
+        self._flush(metrics=True)
+
+    async def _add(self, family: str, password: str):
+        """Logs in and starts polling a family."""
+        from .roostermoney import RoosterMoney # pylint: disable=import-outside-toplevel
+        try:
+            client = await RoosterMoney.create(family, password, **self._options["create"])
+        except Exception as exc: # pylint: disable=broad-exception-caught
+            self._outgoing.append(["error", family, str(exc)])
+            return
+        finally:
+            self._adding.pop(family, None)
+        client.events.subscribe(functools.partial(self._forward, family),
+                                EventSource.ALL, EventType.ALL, "sharding")
+        poller = client.poller(**self._options["poll"])
+        poller.start()
+        self._clients[family] = client
+        self._pollers[family] = poller
+        self._outgoing.append(["added", family])
+
+    async def _remove(self, family: str):
+        """Stops polling a family."""
+        task = self._adding.pop(family, None)
+        if task is not None:
+            task.cancel()
+        poller = self._pollers.pop(family, None)
+        if poller is not None:
+            await poller.stop()
+        client = self._clients.pop(family, None)
+        if client is not None:
+            await client.close()
+
+    def _forward(self, family: str, metadata: dict):
+        """Queues a change event for the parent, internal events stay in the worker."""
+        if metadata.get("source") == str(EventSource.INTERNAL):
+            return
+        self._events += 1
+        self._outgoing.append(["event", family, metadata])
+
+    def _metrics(self) -> dict:
+        """Returns the metrics of this worker."""
+        polls = {}
+        for family, poller in self._pollers.items():
+            report = poller.report()
+            report.pop("intervals")
+            polls[family] = report
+        return {
+            "pid": os.getpid(),
+            "families": len(self._clients),
+            "events": self._events,
+            "cpu_time": time.process_time(),
+            "polls": polls
+        }
+
+    def _flush(self, metrics: bool = False):
+        """Sends the queued messages to the parent as a single batch."""
+        if metrics:
+            self._outgoing.append(["metrics", self._metrics()])
+        if len(self._outgoing) == 0:
+            return
+        messages, self._outgoing = self._outgoing, []
+        try:
+            self._results.send_bytes(_encode(messages))
+        except (OSError, ValueError) as exc:
+            _LOGGER.error("Unable to send results to the parent: %s", exc)
+
+    async def _flush_loop(self):
+        """Flushes queued messages every flush interval and metrics every metrics interval."""
+        loop = asyncio.get_running_loop()
+        next_metrics = loop.time()
+        while True:
+            now = loop.time()
+            send_metrics = now >= next_metrics
+            if send_metrics:
+                next_metrics = now + self._options["metrics_interval"]
+            self._flush(send_metrics)
+            await asyncio.sleep(self._options["flush_interval"])
+
+class ShardedPoller:
+    """Polls many families spread over a pool of worker processes.
+    Change events of every family are fired on events with the family added to their
+    metadata. kwargs are passed to RoosterMoney.create in the workers."""
+
+    def __init__(self,
+                 workers: int | None = None,
+                 replicas: int = DEFAULT_REPLICAS,
+                 interval: float = DEFAULT_POLL_INTERVAL,
+                 min_interval: float = DEFAULT_MIN_POLL_INTERVAL,
+                 max_interval: float = DEFAULT_MAX_POLL_INTERVAL,
+                 flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+                 metrics_interval: float = DEFAULT_METRICS_INTERVAL,
+                 respawn: bool = True,
+                 event_journal_size: int = DEFAULT_JOURNAL_SIZE,
+                 mp_context: str = "spawn",
+                 **kwargs) -> None:
+        self.workers = workers or os.cpu_count() or 1
+        self.respawn = respawn
+        self.events = Events(journal_size=event_journal_size)
+        self.metrics: dict[int, dict] = {}
+        self.errors: dict[str, str] = {}
+        self._context = multiprocessing.get_context(mp_context)
+        self._options = {
+            "create": kwargs,
+            "poll": {
+                "interval": interval,
+                "min_interval": min_interval,
+                "max_interval": max_interval
+            },
+            "flush_interval": flush_interval,
+            "metrics_interval": metrics_interval
+        }
+        self._ring = HashRing(replicas=replicas)
+        self._families: dict[str, str] = {}
+        self._owners: dict[str, int] = {}
+        self._workers: dict[int, dict] = {}
+        self._next_worker_id = 0
+        self._task: asyncio.Task = None
+
+    @property
+    def running(self) -> bool:
+        """True while the workers are running."""
+        return self._task is not None and not self._task.done()
+
+    def assignments(self) -> dict[str, int]:
+        """Returns the worker ID each family is assigned to."""
+        return dict(self._owners)
+
+    def add_family(self, username: str, password: str):
+        """Adds a family, it is polled by the worker the hash ring assigns it to."""
+        self._families[username] = password
+        if self.running:
+            self._assign()
+
+    def remove_family(self, username: str):
+        """Stops polling a family."""
+        self._families.pop(username, None)
+        self.errors.pop(username, None)
+        owner = self._owners.pop(username, None)
+        if owner in self._workers:
+            self._send(owner, ("remove", username))
+
+    async def start(self):
+        """Starts the worker processes and assigns the families to them."""
+        if self.running:
+            return
+        for _ in range(self.workers):
+            self._spawn()
+        self._assign()
+        self._task = asyncio.create_task(self._receive())
+
+    async def stop(self, timeout: float = 10.0):
+        """Stops every worker, terminating those that do not exit within timeout."""
+        await cancel_task(self._task)
+        self._task = None
+        workers, self._workers = self._workers, {}
+        for worker in workers.values():
+            try:
+                worker["commands"].send(("stop",))
+            except (OSError, ValueError):
+                pass
+        for worker_id, worker in workers.items():
+            await asyncio.to_thread(worker["process"].join, timeout)
+            if worker["process"].is_alive():
+                _LOGGER.warning("Worker %s did not stop, terminating it", worker_id)
+                worker["process"].terminate()
+            self._drain(worker_id, worker)
+            worker["commands"].close()
+            worker["results"].close()
+            self._ring.remove(worker_id)
+        self._owners.clear()
+
+    def _spawn(self) -> int:
+        """Starts a worker process and adds it to the hash ring."""
+        worker_id = self._next_worker_id
+        self._next_worker_id += 1
+        commands_reader, commands_writer = self._context.Pipe(duplex=False)
+        results_reader, results_writer = self._context.Pipe(duplex=False)
+        process = self._context.Process(target=_worker_main,
+                                        args=(worker_id, commands_reader, results_writer,
+                                              self._options),
+                                        name=f"pyroostermoney-worker-{worker_id}",
+                                        daemon=True)
+        process.start()
+        commands_reader.close()
+        results_writer.close()
+        self._workers[worker_id] = {
+            "process": process,
+            "commands": commands_writer,
+            "results": results_reader
+        }
+        self._ring.add(worker_id)
+        return worker_id
+
+    def _send(self, worker_id: int, command: tuple):
+        """Sends a command to a worker."""
+        try:
+            self._workers[worker_id]["commands"].send(command)
+        except (OSError, ValueError) as exc:
+            _LOGGER.error("Unable to send %s to worker %s: %s", command[0], worker_id, exc)
+
+    def _assign(self):
+        """Moves every family whose owner changed on the hash ring to its new worker."""
+        for family, password in self._families.items():
+            owner = self._ring.get(family)
+            previous = self._owners.get(family)
+            if owner == previous:
+                continue
+            if previous in self._workers:
+                self._send(previous, ("remove", family))
+            self._owners[family] = owner
+            self._send(owner, ("add", family, password))
+
+    def _worker_died(self, worker_id: int):
+        """Rebalances the families of a worker that exited."""
+        worker = self._workers.pop(worker_id)
+        self._drain(worker_id, worker)
+        worker["commands"].close()
+        worker["results"].close()
+        self._ring.remove(worker_id)
+        self.metrics.pop(worker_id, None)
+        _LOGGER.warning("Worker %s exited with %s, rebalancing its families",
+                        worker_id, worker["process"].exitcode)
+        self.events.fire_event(EventSource.INTERNAL, EventType.UPDATED, {
+            "update_state": "worker_died",
+            "worker": worker_id,
+            "exitcode": worker["process"].exitcode
+        })
+        if self.respawn or len(self._workers) == 0:
+            self._spawn()
+        self._assign()
+
+    def _drain(self, worker_id: int, worker: dict):
+        """Handles whatever a worker sent before it exited."""
+        try:
+            while worker["results"].poll():
+                self._handle(worker_id, worker["results"].recv_bytes())
+        except (EOFError, OSError):
+            pass
+
+    def _handle(self, worker_id: int, data: bytes):
+        """Handles a batch of messages from a worker."""
+        for message in json.loads(data):
+            kind = message[0]
+            if kind == "event":
+                family, metadata = message[1], message[2]
+                try:
+                    source = EventSource[metadata.pop("source")]
+                    event_type = EventType[metadata.pop("type")]
+                except KeyError:
+                    _LOGGER.error("Invalid event from worker %s: %s", worker_id, metadata)
+                    continue
+                metadata.pop("seq", None)
+                metadata["family"] = family
+                self.events.fire_event(source, event_type, metadata)
+            elif kind == "metrics":
+                self.metrics[worker_id] = message[1]
+            elif kind == "added":
+                self.errors.pop(message[1], None)
+            elif kind == "error":
+                _LOGGER.error("Unable to start polling %s: %s", message[1], message[2])
+                self.errors[message[1]] = message[2]
+
+    async def _receive(self):
+        """Receives results from the workers and watches for workers that exit."""
+        while True:
+            waiting = {}
+            for worker_id, worker in self._workers.items():
+                waiting[worker["results"]] = worker_id
+                waiting[worker["process"].sentinel] = worker_id
+            ready = await asyncio.to_thread(wait, list(waiting), 0.5)
+            died = set()
+            for obj in ready:
+                worker_id = waiting[obj]
+                if worker_id in died or worker_id not in self._workers:
+                    continue
+                if isinstance(obj, Connection):
+                    try:
+                        self._handle(worker_id, obj.recv_bytes())
+                        continue
+                    except (EOFError, OSError):
+                        pass
+                elif self._workers[worker_id]["process"].is_alive():
+                    continue
+                died.add(worker_id)
+            for worker_id in died:
+                self._worker_died(worker_id)
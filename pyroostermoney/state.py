@@ -0,0 +1,213 @@
+"""Exports, snapshots and restores the RoosterMoney model state."""
+
+from datetime import date, datetime
+from enum import Enum
+from typing import Any
+
+from .diff import CHILD_FIELDS, FAMILY_ACCOUNT_FIELDS, CARD_FIELDS
+from .enum import PotLedgerTypes, Weekdays
+from .lazy import LazySequence, LazyView
+from .child.account import ChildAccount, RESOURCES
+from .child.card import Card
+from .child.jobs import Job, JobView
+from .child.money_pot import Pot
+from .child.standing_order import StandingOrder
+from .child.transaction import Transaction
+from .family_account import FamilyAccount
+from .master_jobs import MasterJobs
+from .token_store import deserialize_token
+
+def _public_slots(cls, exclude: tuple = ()) -> tuple:
+    """Returns the public attributes of a slotted model."""
+    return tuple(x for x in cls.__slots__ if not x.startswith("_") and x not in exclude)
+
+CHILD_STATE_FIELDS = ("user_id", "gender") + CHILD_FIELDS
+POT_STATE_FIELDS = _public_slots(Pot)
+JOB_STATE_FIELDS = _public_slots(Job)
+CARD_STATE_FIELDS = _public_slots(Card, exclude=("pin",))
+STANDING_ORDER_STATE_FIELDS = _public_slots(StandingOrder)
+TRANSACTION_STATE_FIELDS = _public_slots(Transaction)
+FAMILY_ACCOUNT_STATE_FIELDS = ("family_id",) + FAMILY_ACCOUNT_FIELDS
+
+def to_json_value(value: Any) -> Any:
+    """Converts a model attribute into a JSON compatible value."""
+    if isinstance(value, Enum):
+        return value.name
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (list, tuple)):
+        return [to_json_value(x) for x in value]
+    if isinstance(value, dict):
+        return {k: to_json_value(v) for k, v in value.items()}
+    return value
+
+def export_model(obj: Any, fields: tuple) -> dict | None:
+    """Exports the given fields of a model."""
+    if obj is None:
+        return None
+    return {field: to_json_value(getattr(obj, field, None)) for field in fields}
+
+def export_child(child) -> dict:
+    """Exports a ChildAccount and all of its resources."""
+    output = export_model(child, CHILD_STATE_FIELDS)
+    output["pots"] = [export_model(x, POT_STATE_FIELDS) for x in child.pots]
+    output["card"] = export_model(child.card, CARD_STATE_FIELDS)
+    output["standing_orders"] = [export_model(x, STANDING_ORDER_STATE_FIELDS)
+                                 for x in child.standing_orders]
+    output["jobs"] = [export_model(x, JOB_STATE_FIELDS) for x in child.jobs]
+    output["transactions"] = [export_model(x, TRANSACTION_STATE_FIELDS)
+                              for x in child.transactions]
+    output["declined_transactions"] = [export_model(x, TRANSACTION_STATE_FIELDS)
+                                       for x in child.declined_transactions]
+    return output
+
+def export_state(rooster) -> dict:
+    """Exports the full state of a RoosterMoney instance.
+    Card PINs are never exported."""
+    return {
+        "seq": rooster.events.sequence,
+        "family_id": rooster.family_id,
+        "family_balance": rooster.family_balance,
+        "family_account": export_model(rooster.family_account, FAMILY_ACCOUNT_STATE_FIELDS),
+        "children": [export_child(x) for x in rooster.children],
+        "master_jobs": [export_model(x, JOB_STATE_FIELDS) for x in rooster.master_job_list]
+    }
+
+SNAPSHOT_VERSION = 1
+
+def _raw_items(items) -> list[dict]:
+    """Returns the raw payloads backing a lazily parsed collection."""
+    if isinstance(items, LazySequence):
+        return items.raw
+    return [x.raw for x in items if isinstance(x, LazyView)]
+
+def _enum_member(enum, value):
+    """Converts an exported enum name back to its member."""
+    if value in enum.__members__:
+        return enum[value]
+    return value
+
+def snapshot_child(child) -> dict:
+    """Captures everything needed to restore a ChildAccount without fetching it."""
+    output = export_model(child, CHILD_STATE_FIELDS)
+    output["hydrated"] = sorted(child._hydrated) # pylint: disable=protected-access
+    output["loaded"] = sorted(child._loaded) # pylint: disable=protected-access
+    output["pots"] = [export_model(x, POT_STATE_FIELDS) for x in child.pots]
+    output["card"] = export_model(child.card, CARD_STATE_FIELDS)
+    output["standing_orders"] = [export_model(x, STANDING_ORDER_STATE_FIELDS)
+                                 for x in child.standing_orders]
+    output["jobs"] = _raw_items(child.jobs)
+    output["transactions"] = _raw_items(child.transactions)
+    output["declined_transactions"] = _raw_items(child.declined_transactions)
+    return output
+
+def snapshot_state(rooster) -> dict:
+    """Captures the full model state of a RoosterMoney instance, including the session token.
+    Card PINs are never captured."""
+    # pylint: disable=protected-access
+    token = None
+    if rooster._session is not None:
+        token = to_json_value(rooster._session)
+    family_account = export_model(rooster.family_account, FAMILY_ACCOUNT_STATE_FIELDS)
+    if family_account is not None:
+        family_account["precision"] = rooster.family_account._precision
+        family_account["current_month_transactions"] = (
+            rooster.family_account.current_month_transactions)
+        family_account["latest_transaction"] = rooster.family_account.latest_transaction
+    return {
+        "version": SNAPSHOT_VERSION,
+        "token": token,
+        "account_info": rooster.account_info,
+        "family_id": rooster.family_id,
+        "family_balance": rooster.family_balance,
+        "family_account": family_account,
+        "children": [snapshot_child(x) for x in rooster.children],
+        "master_jobs": (_raw_items(rooster.master_jobs.jobs)
+                        if rooster.master_jobs is not None else [])
+    }
+
+def _restore_child(data: dict, rooster) -> ChildAccount:
+    """Rebuilds a ChildAccount from a snapshot."""
+    # pylint: disable=protected-access
+    child = ChildAccount(data["user_id"],
+                         rooster,
+                         rooster._remove_card_information,
+                         lazy=rooster._lazy)
+    for field in CHILD_STATE_FIELDS:
+        setattr(child, field, data.get(field))
+    child.allowance_day = _enum_member(Weekdays, child.allowance_day)
+    child._hydrated = set(data.get("hydrated", []))
+    child._loaded = set(data.get("loaded", RESOURCES))
+    child.pots = [Pot(name=x["name"],
+                      ledger=x["ledger"],
+                      pot_id=x["pot_id"],
+                      image=x["image"],
+                      enabled=x["enabled"],
+                      value=x["value"],
+                      target=x["target"]*100 if x["target"] is not None else None,
+                      last_updated=x["last_updated"],
+                      ledger_type=_enum_member(PotLedgerTypes, x["ledger_type"]),
+                      session=rooster,
+                      child=child) for x in data["pots"]]
+    if data["card"] is not None:
+        card = data["card"]
+        child.card = Card(masked_card_number=card["masked_card_number"],
+                          expiry_date=card["expiry_date"],
+                          name=card["name"],
+                          image=card["image"],
+                          title=card["title"],
+                          description=card["description"],
+                          category=card["category"],
+                          status=card["status"],
+                          user_id=card["user_id"],
+                          session=rooster)
+        for field in CARD_FIELDS:
+            setattr(child.card, field, card.get(field))
+    child.standing_orders = [StandingOrder(amount=x["amount"],
+                                           day=x["day"],
+                                           frequency=x["frequency"],
+                                           regular_id=x["regular_id"],
+                                           active=x["active"],
+                                           tag=x["tag"],
+                                           title=x["title"])
+                             for x in data["standing_orders"]]
+    child.jobs = LazySequence(data["jobs"], lambda job: JobView(job, rooster))
+    child.transactions = Transaction.parse_response(data["transactions"])
+    child.declined_transactions = Transaction.parse_response(data["declined_transactions"])
+    if len(child.transactions) > 0:
+        child.latest_transaction = child.transactions[len(child.transactions)-1]
+    return child
+
+def _restore_family_account(data: dict, rooster) -> FamilyAccount:
+    """Rebuilds a FamilyAccount from a snapshot."""
+    # pylint: disable=protected-access
+    family_account = FamilyAccount.__new__(FamilyAccount)
+    family_account._session = rooster
+    for field in FAMILY_ACCOUNT_STATE_FIELDS:
+        setattr(family_account, field, data.get(field))
+    family_account._precision = data["precision"]
+    family_account.current_month_transactions = data["current_month_transactions"]
+    family_account.latest_transaction = data["latest_transaction"]
+    return family_account
+
+def restore_state(rooster, data: dict):
+    """Restores a RoosterMoney instance from a snapshot captured by snapshot_state."""
+    # pylint: disable=protected-access
+    if data.get("version") != SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported snapshot version {data.get('version')}")
+    if data["token"] is not None:
+        token = deserialize_token(data["token"])
+        rooster._session = token
+        rooster._logged_in = True
+        rooster._headers["Authorization"] = f"{token['token_type']} {token['access_token']}"
+    rooster.account_info = data["account_info"]
+    rooster.family_id = data["family_id"]
+    rooster.family_balance = data["family_balance"]
+    if data["family_account"] is not None:
+        rooster.family_account = _restore_family_account(data["family_account"], rooster)
+    rooster.children = [_restore_child(x, rooster) for x in data["children"]]
+    rooster._discovered_children = [x.user_id for x in rooster.children]
+    rooster.master_jobs = MasterJobs(rooster)
+    rooster.master_jobs.jobs = LazySequence(data["master_jobs"],
+                                            lambda job: JobView(job, rooster))
+    rooster.master_job_list = rooster.master_jobs.jobs
@@ -0,0 +1,117 @@
+"""Synchronous RoosterMoney facade.
+
+A SyncRoosterMoney owns an event loop running on a dedicated thread and a
+single RoosterMoney living on that loop. Every call is sent to the loop
+with run_coroutine_threadsafe, so any number of threads (Flask workers,
+cron jobs) share one logged in session, its connection pool and its cached
+state instead of starting a new event loop per call.
+"""
+import asyncio
+import functools
+import inspect
+import threading
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from .roostermoney import RoosterMoney
+
+class SyncRoosterMoney:
+    """Blocking, thread-safe access to a RoosterMoney.
+    Public methods of RoosterMoney are available as blocking methods, other attributes
+    are returned as is. Methods of nested models are called with call, for example
+    sync.call(sync.children[0].pots[0].add_to_pot, 1.0).
+    Event callbacks run on the loop thread and must not call back into the facade.
+    kwargs are passed to RoosterMoney.create."""
+
+    def __init__(self, username: str, password: str, timeout: float | None = None, **kwargs):
+        self.timeout = timeout
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever,
+                                        name="pyroostermoney",
+                                        daemon=True)
+        self._thread.start()
+        try:
+            self._client: RoosterMoney = self.run(
+                RoosterMoney.create(username, password, **kwargs))
+        except BaseException:
+            self._stop_loop()
+            raise
+
+    def __enter__(self) -> 'SyncRoosterMoney':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def client(self) -> RoosterMoney:
+        """The RoosterMoney on the loop thread."""
+        return self._client
+
+    @property
+    def closed(self) -> bool:
+        """True once the facade has been closed."""
+        return self._loop.is_closed()
+
+    def run(self, awaitable: Awaitable, timeout: float | None = None) -> Any:
+        """Runs an awaitable on the loop thread and blocks until it completes."""
+        error = None
+        if threading.current_thread() is self._thread:
+            error = "Blocking calls are not allowed from the loop thread"
+        elif self.closed:
+            error = "SyncRoosterMoney is closed"
+        if error is not None:
+            if inspect.iscoroutine(awaitable):
+                awaitable.close()
+            raise RuntimeError(error)
+
+        async def _await():
+            return await awaitable
+
+        future = asyncio.run_coroutine_threadsafe(_await(), self._loop)
+        try:
+            return future.result(self.timeout if timeout is None else timeout)
+        except TimeoutError:
+            future.cancel()
+            raise
+
+    def call(self, func: Callable, *args, **kwargs) -> Any:
+        """Calls func on the loop thread and blocks until it completes,
+        awaiting the result if func is a coroutine function."""
+        async def _call():
+            result = func(*args, **kwargs)
+            if inspect.isawaitable(result):
+                result = await result
+            return result
+
+        return self.run(_call())
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        attr = getattr(self._client, name)
+        if not callable(attr):
+            return attr
+        return functools.wraps(attr)(functools.partial(self.call, attr))
+
+    def close(self):
+        """Closes the session, stops the loop thread and closes the loop."""
+        if self.closed:
+            return
+        try:
+            self.run(self._client.close())
+        finally:
+            self._stop_loop()
+
+    def _stop_loop(self):
+        """Cancels whatever is still running on the loop, then stops and closes it."""
+        async def _cancel():
+            tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        asyncio.run_coroutine_threadsafe(_cancel(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
@@ -0,0 +1,58 @@
+"""Helpers for running requests concurrently."""
+import asyncio
+import time
+from collections.abc import Awaitable, Iterable
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any
+
+DEFAULT_MAX_CONCURRENCY = 5
+
+async def gather_limited(awaitables: Iterable[Awaitable],
+                         max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                         return_exceptions: bool = True) -> list[Any]:
+    """Awaits every awaitable with at most max_concurrency running at once.
+    Results are returned in order, exceptions are returned in place of results
+    unless return_exceptions is False."""
+    if max_concurrency < 1:
+        raise ValueError("max_concurrency must be at least 1")
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def _run(awaitable: Awaitable):
+        async with semaphore:
+            return await awaitable
+
+    return await asyncio.gather(*[_run(a) for a in awaitables],
+                                return_exceptions=return_exceptions)
+
+async def cancel_task(task: asyncio.Task | None):
+    """Cancels a task and waits for it to finish."""
+    if task is None:
+        return
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+
+_DEADLINE: ContextVar[float | None] = ContextVar("pyroostermoney_deadline", default=None)
+
+@contextmanager
+def request_deadline(seconds: float | None):
+    """Bounds every request made inside the block (including tasks it starts) to
+    finish within seconds. Nested deadlines can only shorten the outer one."""
+    if seconds is None:
+        yield
+        return
+    expires = time.monotonic() + seconds
+    current = _DEADLINE.get()
+    token = _DEADLINE.set(expires if current is None else min(current, expires))
+    try:
+        yield
+    finally:
+        _DEADLINE.reset(token)
+
+def remaining_time() -> float | None:
+    """Returns the seconds left until the current deadline, None without a deadline."""
+    expires = _DEADLINE.get()
+    return None if expires is None else expires - time.monotonic()
@@ -0,0 +1,185 @@
+"""Persisted token stores.
+
+A token store lets a RoosterSession reuse the access and refresh tokens of a
+previous run instead of logging in again with the username and password.
+Stores are keyed by a hash of the username. The file and SQLite stores can
+optionally encrypt their contents with a Fernet key (requires the
+cryptography package). Both are created readable only by the current user,
+as the stored session includes the security code derived from the password.
+"""
+# pylint: disable=import-outside-toplevel
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+# errors raised by a store that cannot be read or written, such as a corrupt
+# store or one encrypted with another key
+TOKEN_STORE_ERRORS = (OSError, ValueError, sqlite3.Error)
+
+def token_key(username: str) -> str:
+    """Returns the store key for a username."""
+    return hashlib.sha256(username.encode("utf-8")).hexdigest()
+
+def serialize_token(token: dict) -> dict:
+    """Converts a session token into JSON compatible data."""
+    return {k: v.isoformat() if isinstance(v, datetime) else v for k, v in token.items()}
+
+def deserialize_token(token: dict) -> dict:
+    """Converts stored data back into a session token."""
+    output = dict(token)
+    for field in ("expiry_time", "refresh_expiry_time"):
+        if output.get(field) is not None:
+            output[field] = datetime.fromisoformat(output[field])
+    return output
+
+class TokenStore:
+    """In-memory token store, also the base class for persisted stores."""
+
+    def __init__(self) -> None:
+        self._tokens: dict[str, dict] = {}
+
+    async def load(self, username: str) -> dict | None:
+        """Returns the stored session token for a username."""
+        token = self._tokens.get(token_key(username))
+        return dict(token) if token is not None else None
+
+    async def save(self, username: str, token: dict):
+        """Stores the session token for a username."""
+        self._tokens[token_key(username)] = dict(token)
+
+    async def delete(self, username: str):
+        """Removes the stored session token for a username."""
+        self._tokens.pop(token_key(username), None)
+
+MemoryTokenStore = TokenStore
+
+class _Cipher:
+    """Optional Fernet encryption of stored tokens."""
+
+    def __init__(self, encryption_key: str | bytes | None) -> None:
+        self._fernet = None
+        self._invalid_token = None
+        if encryption_key is not None:
+            try:
+                from cryptography.fernet import Fernet, InvalidToken
+            except ImportError as exc:
+                raise ImportError(
+                    "The cryptography package is required for encrypted token stores.") from exc
+            self._fernet = Fernet(encryption_key)
+            self._invalid_token = InvalidToken
+
+    def encrypt(self, data: bytes) -> bytes:
+        """Encrypts data if a key was provided."""
+        return self._fernet.encrypt(data) if self._fernet is not None else data
+
+    def decrypt(self, data: bytes) -> bytes:
+        """Decrypts data if a key was provided, raises ValueError if it cannot be decrypted."""
+        if self._fernet is None:
+            return data
+        try:
+            return self._fernet.decrypt(data)
+        except self._invalid_token as exc:
+            raise ValueError("Unable to decrypt token store, was the key changed?") from exc
+
+class FileTokenStore(TokenStore):
+    """Stores tokens in a single file, readable only by the current user."""
+
+    def __init__(self, path: str, encryption_key: str | bytes | None = None) -> None:
+        super().__init__()
+        self._path = path
+        self._cipher = _Cipher(encryption_key)
+        self._lock = asyncio.Lock()
+
+    def _read(self) -> dict:
+        """Reads every stored token."""
+        if not os.path.exists(self._path):
+            return {}
+        with open(self._path, "rb") as file:
+            return json.loads(self._cipher.decrypt(file.read()))
+
+    def _write(self, tokens: dict):
+        """Atomically writes every stored token."""
+        temp_path = f"{self._path}.tmp"
+        with open(os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600),
+                  "wb") as file:
+            file.write(self._cipher.encrypt(json.dumps(tokens).encode("utf-8")))
+        os.replace(temp_path, self._path)
+
+    async def load(self, username: str) -> dict | None:
+        async with self._lock:
+            tokens = await asyncio.to_thread(self._read)
+        token = tokens.get(token_key(username))
+        return deserialize_token(token) if token is not None else None
+
+    async def save(self, username: str, token: dict):
+        async with self._lock:
+            tokens = await asyncio.to_thread(self._read)
+            tokens[token_key(username)] = serialize_token(token)
+            await asyncio.to_thread(self._write, tokens)
+
+    async def delete(self, username: str):
+        async with self._lock:
+            try:
+                tokens = await asyncio.to_thread(self._read)
+            except ValueError:
+                # nothing in an unreadable store can be used, start again from an empty one
+                await asyncio.to_thread(self._write, {})
+                return
+            if tokens.pop(token_key(username), None) is not None:
+                await asyncio.to_thread(self._write, tokens)
+
+class SQLiteTokenStore(TokenStore):
+    """Stores tokens in a SQLite database, suited to many families in one store.
+    The database is readable only by the current user. A ":memory:" database is
+    kept on a single connection for the lifetime of the store."""
+
+    def __init__(self, path: str, encryption_key: str | bytes | None = None) -> None:
+        super().__init__()
+        self._path = path
+        self._cipher = _Cipher(encryption_key)
+        self._lock = threading.Lock()
+        self._memory: sqlite3.Connection | None = None
+        if path == ":memory:":
+            # every connection to :memory: opens a new empty database
+            self._memory = sqlite3.connect(path, check_same_thread=False)
+        else:
+            # an empty file is a valid database, SQLite gives its journals the same mode
+            os.close(os.open(path, os.O_WRONLY | os.O_CREAT, 0o600))
+            os.chmod(path, 0o600)
+        self._execute(
+            "CREATE TABLE IF NOT EXISTS tokens (key TEXT PRIMARY KEY, data BLOB NOT NULL)")
+
+    def _execute(self, sql: str, params: tuple = ()) -> tuple | None:
+        """Executes a statement in its own transaction, returning the first row."""
+        if self._memory is not None:
+            with self._lock, self._memory:
+                return self._memory.execute(sql, params).fetchone()
+        connection = sqlite3.connect(self._path)
+        try:
+            with connection:
+                return connection.execute(sql, params).fetchone()
+        finally:
+            connection.close()
+
+    async def load(self, username: str) -> dict | None:
+        row = await asyncio.to_thread(self._execute,
+                                      "SELECT data FROM tokens WHERE key = ?",
+                                      (token_key(username),))
+        if row is None:
+            return None
+        return deserialize_token(json.loads(self._cipher.decrypt(row[0])))
+
+    async def save(self, username: str, token: dict):
+        data = self._cipher.encrypt(json.dumps(serialize_token(token)).encode("utf-8"))
+        await asyncio.to_thread(self._execute,
+                                "INSERT OR REPLACE INTO tokens (key, data) VALUES (?, ?)",
+                                (token_key(username), data))
+
+    async def delete(self, username: str):
+        await asyncio.to_thread(self._execute,
+                                "DELETE FROM tokens WHERE key = ?",
+                                (token_key(username),))
@@ -9,4 +9,9 @@ setup(name="pyroostermoney",
       author="pantherale0",
       author_email="support@system32.uk",
       license='MIT',
-      install_requires="aiohttp")
+      install_requires="aiohttp",
+      extras_require={
+          "fast": ["msgspec"],
+          "analytics": ["numpy"],
+          "encryption": ["cryptography"]
+      })